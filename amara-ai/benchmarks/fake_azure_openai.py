@@ -0,0 +1,326 @@
+"""Local stand-in for the Azure OpenAI chat completions API.
+
+Point the app at it to load test without spending Azure quota:
+
+    python -m benchmarks.fake_azure_openai --port 8900 --latency-ms 400,2500
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8900 uvicorn main:app --workers 4
+
+Replies are canned CrewAI final answers matching the affordability, email
+classification, email response and validation schemas; the email response
+echoes the address, reference and link from the prompt so it passes the
+rule-based validator. Latency is log-normal (from a p50 and p99) plus the
+time to "generate" the completion at --tokens-per-second. --rate-429 and
+--max-rpm inject Azure style rate limit errors.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# z-score of the 99th percentile of a standard normal distribution
+Z_99 = 2.326
+
+AFFORDABILITY_RESULT = {
+    "can_afford": True,
+    "confidence": 0.82,
+    "risk_factors": ["Variable overtime income"],
+    "recommendations": ["Verify the latest payslip against salary deposits"],
+    "metrics": {
+        "monthly_income": 32000.0,
+        "total_monthly_expenses": 14500.0,
+        "monthly_debt_payments": 2100.0,
+        "current_rent_payment": 0.0,
+        "disposable_income": 15400.0,
+        "rent_to_income_ratio": 0.25,
+        "debt_to_income_ratio": 0.07,
+        "savings_rate": 0.05,
+    },
+    "transaction_analysis": {
+        "incoming": {"salary": 32000.0},
+        "outgoing": {"essential_expenses": 11000.0, "debt_payments": 2100.0},
+    },
+}
+VALIDATION_RESULT = {
+    "pass": True,
+    "confidence": 0.9,
+    "details": {
+        "factual_pass": True,
+        "completeness_pass": True,
+        "tone_pass": True,
+        "missing_fields": [],
+    },
+}
+PROMPT_FIELDS = {
+    "address": re.compile(r"1\. Address(?: included)?: (.+)"),
+    "web_reference": re.compile(r"2\. Property reference(?: included)?: (.+)"),
+    "application_link": re.compile(r"3\. Application link(?: included)?: (.+)"),
+    "agent_name": re.compile(r"^Name: (.+)$", re.MULTILINE),
+    "agent_contact": re.compile(r"^Contact: (.+)$", re.MULTILINE),
+    "inquiry_type": re.compile(r"Inquiry Type: (\w+)"),
+}
+
+
+@dataclass
+class FakeSettings:
+    latency_p50_ms: float = 400.0
+    latency_p99_ms: float = 2500.0
+    # Output token generation rate; long answers take longer, as in Azure
+    tokens_per_second: float = 80.0
+    # Probability of answering 429 regardless of load
+    rate_429: float = 0.0
+    # Requests per rolling minute before answering 429 (0 = unlimited)
+    max_rpm: int = 0
+    retry_after_seconds: int = 1
+    # Kind -> canned JSON, overriding the built-in outputs
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+
+def prompt_text(body: Dict[str, Any]) -> str:
+    parts = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(
+                c.get("text", "") for c in content if isinstance(c, dict)
+            )
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+def classify_kind(prompt: str) -> str:
+    if "Classify the type of property inquiry" in prompt:
+        return "classification"
+    if "Validate this email response" in prompt:
+        return "validation"
+    if "Generate a professional" in prompt:
+        return "email_response"
+    return "affordability"
+
+
+def guess_inquiry_type(prompt: str) -> str:
+    content = prompt.split("Content:", 1)[-1].split("Analyze the email", 1)[0]
+    content = content.lower()
+    if "view" in content:
+        return "viewing_request"
+    if "available" in content or "availability" in content:
+        return "availability_check"
+    return "general_info"
+
+
+def canned_output(kind: str, prompt: str, settings: FakeSettings) -> Dict[str, Any]:
+    if kind in settings.outputs:
+        return settings.outputs[kind]
+    if kind == "classification":
+        return {"inquiry_type": guess_inquiry_type(prompt)}
+    if kind == "validation":
+        return VALIDATION_RESULT
+    if kind == "email_response":
+        fields = {}
+        for name, pattern in PROMPT_FIELDS.items():
+            match = pattern.search(prompt)
+            fields[name] = match.group(1).strip() if match else ""
+        return {
+            "response": {
+                "subject": f"Re: Property Inquiry - {fields['web_reference']}",
+                "body": (
+                    f"Hi,\n\nThank you for your interest in the property at "
+                    f"{fields['address']} (Reference: {fields['web_reference']}).\n\n"
+                    "The property is available. You can schedule a viewing or "
+                    f"submit an application here: {fields['application_link']}\n\n"
+                    "Please contact me with any questions.\n\nBest regards,\n"
+                    f"{fields['agent_name']}\n{fields['agent_contact']}"
+                ),
+            }
+        }
+    return AFFORDABILITY_RESULT
+
+
+class FakeAzureOpenAI:
+    """Latency, token and rate limit model behind the fake endpoints"""
+
+    def __init__(self, settings: FakeSettings):
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.recent: Deque[float] = collections.deque()
+        self.stats = collections.Counter()
+
+    def sample_latency(self) -> float:
+        """Seconds before the first token (log-normal from p50/p99)"""
+        p50 = max(self.settings.latency_p50_ms, 0.001)
+        p99 = max(self.settings.latency_p99_ms, p50)
+        sigma = math.log(p99 / p50) / Z_99
+        return self.random.lognormvariate(math.log(p50), sigma) / 1000
+
+    def rate_limited(self) -> bool:
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] > 60:
+            self.recent.popleft()
+        if self.settings.max_rpm and len(self.recent) >= self.settings.max_rpm:
+            return True
+        if self.random.random() < self.settings.rate_429:
+            return True
+        self.recent.append(now)
+        return False
+
+    async def complete(self, deployment: str, body: Dict[str, Any]):
+        self.stats["requests"] += 1
+        if self.rate_limited():
+            self.stats["rate_limited"] += 1
+            retry_after = self.settings.retry_after_seconds
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": str(retry_after)},
+                content={
+                    "error": {
+                        "code": "429",
+                        "message": "Requests to the ChatCompletions_Create "
+                        "Operation have exceeded the rate limit. Please retry "
+                        f"after {retry_after} seconds.",
+                    }
+                },
+            )
+
+        prompt = prompt_text(body)
+        kind = classify_kind(prompt)
+        self.stats[kind] += 1
+        answer = json.dumps(canned_output(kind, prompt, self.settings), indent=2)
+        # CrewAI agents without tools parse a ReAct style final answer
+        content = f"Thought: I now know the final answer\nFinal Answer: {answer}"
+        prompt_tokens = (len(prompt) + 3) // 4
+        completion_tokens = (len(content) + 3) // 4
+        delay = self.sample_latency()
+        if self.settings.tokens_per_second > 0:
+            delay += completion_tokens / self.settings.tokens_per_second
+        await asyncio.sleep(delay)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if body.get("stream"):
+            return StreamingResponse(
+                self._stream(completion_id, created, deployment, content, usage),
+                media_type="text/event-stream",
+            )
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": deployment,
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+            "usage": usage,
+        }
+
+    async def _stream(self, completion_id, created, deployment, content, usage):
+        def chunk(delta, finish_reason=None, **extra):
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": deployment,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+                **extra,
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        yield chunk({"role": "assistant", "content": content})
+        yield chunk({}, "stop", usage=usage)
+        yield "data: [DONE]\n\n"
+
+
+def create_app(settings: Optional[FakeSettings] = None) -> FastAPI:
+    fake = FakeAzureOpenAI(settings or FakeSettings())
+    app = FastAPI(title="Fake Azure OpenAI")
+    app.state.fake = fake
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def azure_chat_completions(deployment: str, request: Request):
+        return await fake.complete(deployment, await request.json())
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def openai_chat_completions(request: Request):
+        body = await request.json()
+        return await fake.complete(body.get("model", "gpt-4o-mini"), body)
+
+    @app.get("/stats")
+    async def stats():
+        return dict(fake.stats)
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument(
+        "--latency-ms",
+        default="400,2500",
+        help="p50,p99 latency before the first token, in milliseconds",
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--max-rpm", type=int, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument(
+        "--outputs",
+        help="JSON file of canned outputs by kind (affordability, "
+        "classification, email_response, validation)",
+    )
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    import uvicorn
+
+    args = parse_args(argv)
+    p50, p99 = (float(v) for v in args.latency_ms.split(","))
+    outputs = {}
+    if args.outputs:
+        with open(args.outputs) as f:
+            outputs = json.load(f)
+    settings = FakeSettings(
+        latency_p50_ms=p50,
+        latency_p99_ms=p99,
+        tokens_per_second=args.tokens_per_second,
+        rate_429=args.rate_429,
+        max_rpm=args.max_rpm,
+        retry_after_seconds=args.retry_after,
+        outputs=outputs,
+        seed=args.seed,
+    )
+    uvicorn.run(
+        create_app(settings), host=args.host, port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
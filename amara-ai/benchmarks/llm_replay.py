@@ -0,0 +1,304 @@
+"""Record and replay Azure OpenAI chat completions for offline runs.
+
+Record every LLM call the crews make against the real deployment:
+
+    python -m benchmarks.llm_replay record \
+        --upstream https://<resource>.openai.azure.com
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8901 uvicorn main:app
+
+then serve the same calls from disk, without Azure and at full speed:
+
+    python -m benchmarks.llm_replay replay --latency none
+
+Fixtures are content addressed: a call is stored under the SHA-256 of its
+deployment and request body (minus transport-only fields), so identical
+prompts map to the same file and fixture directories can be committed and
+shared. Replay answers misses with a 404 (or the fake server's canned
+outputs with --on-miss fake) and can add the recorded or a synthetic
+latency, so framework overhead and model latency can be measured apart.
+"""
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.fake_azure_openai import FakeAzureOpenAI, FakeSettings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURES = os.path.join("benchmarks", "fixtures", "llm")
+# Request fields that change how a response is delivered, not what it says
+TRANSPORT_FIELDS = ("stream", "stream_options", "user")
+
+
+def fixture_key(deployment: str, body: Dict[str, Any]) -> str:
+    request = {k: v for k, v in body.items() if k not in TRANSPORT_FIELDS}
+    canonical = json.dumps(
+        {"deployment": deployment, "request": request},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """Request/response pairs on disk, one JSON file per content hash"""
+
+    def __init__(self, root: str = DEFAULT_FIXTURES):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, fixture: Dict[str, Any]):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        if not os.path.isdir(self.root):
+            return 0
+        return sum(
+            name.endswith(".json")
+            for _, _, names in os.walk(self.root)
+            for name in names
+        )
+
+
+@dataclass
+class ReplaySettings:
+    mode: str = "replay"  # record or replay
+    upstream: Optional[str] = None
+    # none, recorded (the upstream latency at record time) or synthetic
+    latency: str = "none"
+    latency_p50_ms: float = 400.0
+    latency_p99_ms: float = 2500.0
+    # error (404) or fake (canned outputs from the fake server)
+    on_miss: str = "error"
+    # Record: keep an existing fixture instead of calling upstream again
+    reuse: bool = True
+
+
+class LLMReplay:
+    def __init__(self, store: FixtureStore, settings: ReplaySettings):
+        self.store = store
+        self.settings = settings
+        self.stats = collections.Counter()
+        # Samples the synthetic latency and answers misses with --on-miss fake
+        synthetic = settings.latency == "synthetic"
+        self.fake = FakeAzureOpenAI(
+            FakeSettings(
+                latency_p50_ms=settings.latency_p50_ms if synthetic else 0,
+                latency_p99_ms=settings.latency_p99_ms if synthetic else 0,
+                tokens_per_second=0,
+            )
+        )
+        self._client = None
+
+    async def complete(self, request: Request, deployment: str, body: Dict[str, Any]):
+        key = fixture_key(deployment, body)
+        fixture = self.store.get(key)
+        replayable = self.settings.mode == "replay" or self.settings.reuse
+        if fixture is not None and replayable:
+            self.stats["hits"] += 1
+            await self._delay(fixture)
+            return self._respond(body, fixture["response"])
+        if self.settings.mode == "record":
+            return await self._record(request, key, deployment, body)
+
+        self.stats["misses"] += 1
+        logger.warning(f"No fixture for {deployment} request {key}")
+        if self.settings.on_miss == "fake":
+            return await self.fake.complete(deployment, body)
+        return JSONResponse(
+            status_code=404,
+            content={
+                "error": {
+                    "code": "FixtureNotFound",
+                    "message": f"No recorded response for request {key}",
+                }
+            },
+        )
+
+    async def _record(
+        self, request: Request, key: str, deployment: str, body: Dict[str, Any]
+    ):
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=600)
+        headers = {
+            name: value
+            for name, value in request.headers.items()
+            if name in ("api-key", "authorization", "content-type")
+        }
+        # Always fetch the whole completion; streams are replayed from it
+        upstream_body = {k: v for k, v in body.items() if k not in TRANSPORT_FIELDS}
+        start = time.perf_counter()
+        response = await self._client.post(
+            self.settings.upstream.rstrip("/") + request.url.path,
+            params=request.query_params,
+            headers=headers,
+            json=upstream_body,
+        )
+        latency = time.perf_counter() - start
+        if response.status_code != 200:
+            # Errors and rate limits are passed on but never stored
+            self.stats[f"upstream_{response.status_code}"] += 1
+            return JSONResponse(
+                status_code=response.status_code,
+                content=response.json(),
+                headers={
+                    k: v for k, v in response.headers.items() if k == "retry-after"
+                },
+            )
+        self.stats["recorded"] += 1
+        self.store.put(
+            key,
+            {
+                "key": key,
+                "deployment": deployment,
+                "request": upstream_body,
+                "response": response.json(),
+                "latency_s": round(latency, 4),
+                "recorded_at": time.time(),
+            },
+        )
+        return self._respond(body, response.json())
+
+    async def _delay(self, fixture: Dict[str, Any]):
+        if self.settings.latency == "recorded":
+            await asyncio.sleep(fixture.get("latency_s", 0))
+        elif self.settings.latency == "synthetic":
+            await asyncio.sleep(self.fake.sample_latency())
+
+    def _respond(self, body: Dict[str, Any], response: Dict[str, Any]):
+        if not body.get("stream"):
+            return response
+        return StreamingResponse(
+            self._stream(response), media_type="text/event-stream"
+        )
+
+    async def _stream(self, response: Dict[str, Any]):
+        def chunk(choices, **extra):
+            data = {
+                "id": response.get("id"),
+                "object": "chat.completion.chunk",
+                "created": response.get("created"),
+                "model": response.get("model"),
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        for choice in response.get("choices", []):
+            message = choice.get("message") or {}
+            delta = {k: v for k, v in message.items() if v is not None}
+            yield chunk([{"index": choice["index"], "delta": delta}])
+        finish = [
+            {"index": c["index"], "delta": {}, "finish_reason": c.get("finish_reason")}
+            for c in response.get("choices", [])
+        ]
+        yield chunk(finish, usage=response.get("usage"))
+        yield "data: [DONE]\n\n"
+
+
+def create_app(
+    store: Optional[FixtureStore] = None, settings: Optional[ReplaySettings] = None
+) -> FastAPI:
+    settings = settings or ReplaySettings()
+    if settings.mode == "record" and not settings.upstream:
+        raise ValueError("Recording needs an upstream endpoint")
+    replay = LLMReplay(store if store is not None else FixtureStore(), settings)
+    app = FastAPI(title=f"LLM {settings.mode}")
+    app.state.replay = replay
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def azure_chat_completions(deployment: str, request: Request):
+        return await replay.complete(request, deployment, await request.json())
+
+    @app.get("/stats")
+    async def stats():
+        return {**replay.stats, "fixtures": len(replay.store)}
+
+    @app.on_event("shutdown")
+    async def close_client():
+        if replay._client is not None:
+            await replay._client.aclose()
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", choices=("record", "replay"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument(
+        "--upstream",
+        default=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        help="Azure OpenAI endpoint to record from (default AZURE_OPENAI_ENDPOINT)",
+    )
+    parser.add_argument(
+        "--rerecord",
+        action="store_true",
+        help="Call upstream even when a fixture exists, replacing it",
+    )
+    parser.add_argument(
+        "--latency", choices=("none", "recorded", "synthetic"), default="none"
+    )
+    parser.add_argument(
+        "--latency-ms",
+        default="400,2500",
+        help="p50,p99 of the synthetic latency, in milliseconds",
+    )
+    parser.add_argument("--on-miss", choices=("error", "fake"), default="error")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    import uvicorn
+
+    args = parse_args(argv)
+    p50, p99 = (float(v) for v in args.latency_ms.split(","))
+    settings = ReplaySettings(
+        mode=args.mode,
+        upstream=args.upstream,
+        latency=args.latency,
+        latency_p50_ms=p50,
+        latency_p99_ms=p99,
+        on_miss=args.on_miss,
+        reuse=not args.rerecord,
+    )
+    uvicorn.run(
+        create_app(FixtureStore(args.fixtures), settings),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Open-loop load driver for /analyze-affordability and /api/v1/process-email.
+
+Requests are started on a fixed schedule at the target RPS whether or not
+earlier ones have finished, and latency is measured from the scheduled start,
+so a saturated server shows up as growing latency rather than a lower send
+rate. --concurrency caps requests in flight (the client's connection pool).
+
+    python -m benchmarks.load_driver --rps 1,2,5 --duration 60 \\
+        --label "workers=4" -o load.json
+
+Run the app against benchmarks.fake_azure_openai to avoid Azure quota; run
+once per uvicorn --workers setting and compare the labelled reports.
+"""
+
+import argparse
+import asyncio
+import collections
+import datetime
+import itertools
+import json
+import logging
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks import synthetic_data
+from benchmarks.run_benchmarks import percentile
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = {
+    "affordability": "/analyze-affordability",
+    "email": "/api/v1/process-email",
+}
+
+
+class PayloadFactory:
+    """Synthetic request bodies; every email gets a fresh message id"""
+
+    def __init__(self, transactions: int, listings: int, seed: int = 0):
+        self.transactions = synthetic_data.transactions(transactions, seed)
+        for t in self.transactions:
+            # The API takes float amounts; the statement style strings are
+            # for the parsers
+            t["amount"] = float(t["amount"].replace("R", "").replace(" ", ""))
+        self.properties = synthetic_data.properties(listings, seed)
+        self.emails = itertools.cycle(
+            synthetic_data.emails(1000, seed, site_2_share=0, listing_count=listings)
+        )
+
+    def affordability(self) -> Dict[str, Any]:
+        return {
+            "transactions": self.transactions,
+            "target_rent": 8500.0,
+            "payslip_data": {"net_income": 32000.0},
+        }
+
+    def email(self) -> Dict[str, Any]:
+        email = next(self.emails)
+        return {
+            "agent_id": "load-test-agent",
+            "workflow_id": "load-test",
+            "email_content": email["body"],
+            "email_subject": email["subject"],
+            "email_from": email["from"],
+            "email_date": datetime.datetime.utcnow().isoformat(),
+            "agent_properties": self.properties,
+            "workflow_actions": {
+                "agent_name": "Amara Agent",
+                "agent_contact": "021 555 0100",
+            },
+            "message_id": f"<{uuid.uuid4().hex}@load-test>",
+        }
+
+
+async def run_stage(
+    client: httpx.AsyncClient,
+    payloads: PayloadFactory,
+    endpoints: List[str],
+    rps: float,
+    duration: float,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Send `rps` requests per second for `duration` seconds and summarise"""
+    semaphore = asyncio.Semaphore(concurrency)
+    records: List[Dict[str, Any]] = []
+
+    async def send(endpoint: str, scheduled: float):
+        body = getattr(payloads, endpoint)()
+        async with semaphore:
+            status = None
+            try:
+                response = await client.post(ENDPOINTS[endpoint], json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+        records.append(
+            {
+                "endpoint": endpoint,
+                "status": status,
+                "latency": time.perf_counter() - scheduled,
+            }
+        )
+
+    tasks = []
+    start = time.perf_counter()
+    total = max(int(rps * duration), 1)
+    endpoint_cycle = itertools.cycle(endpoints)
+    for i in range(total):
+        scheduled = start + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(next(endpoint_cycle), scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    by_endpoint = collections.defaultdict(list)
+    for record in records:
+        by_endpoint[record["endpoint"]].append(record)
+    return {
+        "target_rps": rps,
+        "duration_s": round(elapsed, 2),
+        "concurrency": concurrency,
+        "overall": summarize(records, elapsed),
+        "endpoints": {
+            name: summarize(items, elapsed) for name, items in by_endpoint.items()
+        },
+    }
+
+
+def summarize(records: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    statuses = collections.Counter(str(r["status"]) for r in records)
+    ok = [r for r in records if r["status"] == 200]
+    latencies = [r["latency"] for r in ok] or [0.0]
+    return {
+        "requests": len(records),
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / len(records), 4) if records else 0.0,
+        "statuses": dict(statuses),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p90": round(percentile(latencies, 90) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1),
+        },
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--endpoints",
+        default="affordability,email",
+        help="Comma separated: affordability, email (sent round robin)",
+    )
+    parser.add_argument(
+        "--rps", default="1", help="Comma separated target RPS, one stage each"
+    )
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--transactions", type=int, default=90)
+    parser.add_argument("--listings", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--label", default="", help="Server settings under test, e.g. workers=4"
+    )
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    return parser.parse_args(argv)
+
+
+async def run(args) -> Dict[str, Any]:
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    payloads = PayloadFactory(args.transactions, args.listings, args.seed)
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    stages = []
+    async with httpx.AsyncClient(
+        base_url=args.base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        for rps in (float(r) for r in args.rps.split(",") if r.strip()):
+            stage = await run_stage(
+                client, payloads, endpoints, rps, args.duration, args.concurrency
+            )
+            overall = stage["overall"]
+            logger.info(
+                f"{rps} rps: {overall['throughput_rps']} ok/s, "
+                f"p50 {overall['latency_ms']['p50']} ms, "
+                f"p99 {overall['latency_ms']['p99']} ms, "
+                f"errors {overall['error_rate']:.1%}"
+            )
+            stages.append(stage)
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "base_url": args.base_url,
+            "label": args.label,
+            "endpoints": endpoints,
+            "transactions": args.transactions,
+            "listings": args.listings,
+        },
+        "stages": stages,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""Benchmarks for the deterministic hot paths, reported as JSON.
+
+Usage (from amara-ai/):
+    python -m benchmarks.run_benchmarks --sizes 10,1000,100000 -o bench.json
+    python -m benchmarks.run_benchmarks --baseline bench.json
+
+Document benchmarks (preprocess_financials, statement and payslip parsers)
+time a whole document of `size` transactions or line items per run. Per-item
+benchmarks (web refs, templates, validation) time each call over `size`
+items, capped by --max-items. No LLM, network or Azure settings are needed.
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import logging
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import synthetic_data
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = "10,1000,100000"
+# Whole-document runs per size: up to MAX_DOCUMENT_RUNS, stopping once the
+# runs have taken DOCUMENT_TIME_BUDGET seconds (but never fewer than 3)
+MAX_DOCUMENT_RUNS = 200
+MIN_DOCUMENT_RUNS = 3
+DOCUMENT_TIME_BUDGET = 2.0
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak Python heap allocated while `fn` runs (tracemalloc, bytes)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(
+    name: str, size: int, items: int, samples: List[float], memory: int
+) -> Dict[str, Any]:
+    """Latency percentiles (ms) per sample and item throughput (per second)"""
+    total = sum(samples)
+    return {
+        "benchmark": name,
+        "size": size,
+        "items": items,
+        "samples": len(samples),
+        "throughput_per_s": round(items / total, 1) if total else None,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "peak_memory_bytes": memory,
+    }
+
+
+def bench_document(name: str, size: int, fn: Callable[[], Any]) -> Dict[str, Any]:
+    """Time `fn` (one whole document of `size` items) over several runs"""
+    fn()  # Warm-up: regex compilation, lru caches, lazy imports
+    samples = []
+    while len(samples) < MAX_DOCUMENT_RUNS and (
+        len(samples) < MIN_DOCUMENT_RUNS or sum(samples) < DOCUMENT_TIME_BUDGET
+    ):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(name, size, size * len(samples), samples, peak_memory(fn))
+
+
+def bench_items(
+    name: str, size: int, items: List[Any], fn: Callable[[Any], Any]
+) -> Dict[str, Any]:
+    """Time `fn` once per item"""
+    for item in items[:10]:
+        fn(item)  # Warm-up
+    samples = []
+    clock = time.perf_counter
+    for item in items:
+        start = clock()
+        fn(item)
+        samples.append(clock() - start)
+    return summarize(
+        name,
+        size,
+        len(items),
+        samples,
+        peak_memory(lambda: [fn(item) for item in items]),
+    )
+
+
+def make_crew():
+    """An affordability crew with no data; benchmarks swap its inputs"""
+    from src.affordability_crew.crew import AffordabilityAnalysisCrew
+
+    # Keep the crew's per-call INFO logging out of the timed loops
+    logging.getLogger("src.affordability_crew.crew").setLevel(logging.WARNING)
+    return AffordabilityAnalysisCrew(target_rent=8000.0)
+
+
+def run_document_benchmarks(crew, size: int, seed: int, selected) -> List[Dict]:
+    from src.utils.transactions import coerce_transactions
+
+    results = []
+    if "preprocess_financials" in selected:
+        records = coerce_transactions(synthetic_data.transactions(size, seed))
+
+        def preprocess():
+            crew.transactions_data = records
+            return crew.preprocess_financials()
+
+        results.append(bench_document("preprocess_financials", size, preprocess))
+    if "statement_parser" in selected:
+        text = synthetic_data.bank_statement_text(size, seed)
+        parsed = crew.parse_transactions_from_bank_statement_text(text)
+        if len(parsed) != size:
+            raise RuntimeError(f"Statement parser found {len(parsed)} of {size}")
+        results.append(
+            bench_document(
+                "statement_parser",
+                size,
+                lambda: crew.parse_transactions_from_bank_statement_text(text),
+            )
+        )
+    if "payslip_parser" in selected:
+        text = synthetic_data.payslip_text(size, seed)
+        results.append(
+            bench_document(
+                "payslip_parser",
+                size,
+                lambda: crew.parse_net_income_from_payslip_text(text),
+            )
+        )
+    return results
+
+
+def run_item_benchmarks(size: int, count: int, seed: int, selected) -> List[Dict]:
+    from src.utils.template_manager import TemplateManager
+    from src.utils.validators import ResponseValidator
+    from src.utils.web_ref_extractor import extract_web_ref
+
+    results = []
+    if "extract_web_ref" in selected:
+        emails = synthetic_data.emails(count, seed)
+        results.append(
+            bench_items(
+                "extract_web_ref",
+                size,
+                emails,
+                lambda e: extract_web_ref(e["subject"], e["body"]),
+            )
+        )
+    if "render_template" in selected:
+        manager = TemplateManager({})
+        template = synthetic_data.REPLY_TEMPLATE
+        results.append(
+            bench_items(
+                "render_template",
+                size,
+                synthetic_data.template_variables(count, seed),
+                lambda variables: manager.render_template(template, variables),
+            )
+        )
+    if "validate" in selected:
+        validator = ResponseValidator()
+        results.append(
+            bench_items(
+                "validate",
+                size,
+                synthetic_data.validation_cases(count, seed),
+                lambda case: validator.validate(*case),
+            )
+        )
+    return results
+
+
+DOCUMENT_BENCHMARKS = ("preprocess_financials", "statement_parser", "payslip_parser")
+ITEM_BENCHMARKS = ("extract_web_ref", "render_template", "validate")
+
+
+def compare(
+    results: List[Dict], baseline: Dict[str, Any], max_regression: float
+) -> List[Dict]:
+    """Annotate results with their p50 change against a baseline report"""
+    previous = {(r["benchmark"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["benchmark"], result["size"]))
+        if not before or not before.get("p50_ms"):
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1
+        result["baseline_p50_ms"] = before["p50_ms"]
+        result["p50_change"] = round(change, 3)
+        if change > max_regression:
+            regressions.append(result)
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help="Comma separated transaction counts (10 to 1000000)",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        default=",".join(DOCUMENT_BENCHMARKS + ITEM_BENCHMARKS),
+        help="Comma separated benchmark names",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--max-items",
+        type=int,
+        default=100_000,
+        help="Cap on items timed by the per-item benchmarks",
+    )
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Previous JSON report to compare with")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Fail when a p50 is this much slower than the baseline (0.2 = 20%%)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    logging.getLogger("src").setLevel(logging.WARNING)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    selected = {b.strip() for b in args.benchmarks.split(",") if b.strip()}
+    unknown = selected - set(DOCUMENT_BENCHMARKS + ITEM_BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    crew = make_crew() if selected & set(DOCUMENT_BENCHMARKS) else None
+    results = []
+    for size in sizes:
+        size_results = []
+        if crew is not None:
+            size_results += run_document_benchmarks(crew, size, args.seed, selected)
+        if selected & set(ITEM_BENCHMARKS):
+            count = min(size, args.max_items)
+            size_results += run_item_benchmarks(size, count, args.seed, selected)
+        for result in size_results:
+            logger.info(
+                f"{result['benchmark']} size={size}: p50 {result['p50_ms']} ms, "
+                f"p99 {result['p99_ms']} ms"
+            )
+        results.extend(size_results)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "sizes": sizes,
+            "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            * 1024,
+        },
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        report["regressions"] = [
+            f"{r['benchmark']}@{r['size']}: {r['p50_change']:+.0%}" for r in regressions
+        ]
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
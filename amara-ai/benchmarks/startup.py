@@ -0,0 +1,181 @@
+"""Cold start benchmark: import time, time to /health and time to /ready.
+
+Starts `uvicorn main:app` several times and measures, from process start,
+when /health first answers and when /ready reports the warm-up (crewai, the
+crews and the LLM client) done, plus /health latency while it runs. The app
+import is profiled with `python -X importtime`; crewai and friends must not
+be imported by it.
+
+    python -m benchmarks.startup --runs 5 --health-budget-ms 1000
+
+Exits with 1 when a median exceeds its budget or a heavy module is imported
+at startup, so it can gate CI.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.run_benchmarks import percentile
+
+logger = logging.getLogger(__name__)
+
+# Loaded on first use or by the warm-up, never by importing the app
+HEAVY_MODULES = ("crewai", "litellm", "chromadb", "openai", "langchain")
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$")
+
+
+def profile_import(module: str = "main", top: int = 10) -> Dict[str, Any]:
+    """Import `module` in a fresh interpreter under -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    packages = sorted(
+        ((name, us) for name, us in cumulative.items() if "." not in name),
+        key=lambda item: -item[1],
+    )
+    return {
+        "import_ms": round(cumulative.get(module, 0) / 1000, 1),
+        "slowest_packages_ms": {
+            name: round(us / 1000, 1) for name, us in packages[:top] if name != module
+        },
+        "heavy_modules": sorted(
+            {name.split(".")[0] for name in cumulative} & set(HEAVY_MODULES)
+        ),
+    }
+
+
+def cold_start(port: int, warmup: str, timeout: float) -> Dict[str, Any]:
+    """Start the server once and time /health and /ready from process start"""
+    env = {**os.environ, "WARMUP": warmup}
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    health_s = ready_s = None
+    latencies: List[float] = []
+    try:
+        with httpx.Client(base_url=base_url, timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                request_start = time.perf_counter()
+                try:
+                    response = client.get("/health")
+                except httpx.TransportError:
+                    time.sleep(0.005)
+                    continue
+                if response.status_code == 200:
+                    if health_s is None:
+                        health_s = time.perf_counter() - started
+                    else:
+                        latencies.append(time.perf_counter() - request_start)
+                if health_s is not None and client.get("/ready").status_code == 200:
+                    ready_s = time.perf_counter() - started
+                    break
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "health_ms": round(health_s * 1000, 1) if health_s is not None else None,
+        "ready_ms": round(ready_s * 1000, 1) if ready_s is not None else None,
+        "health_latency_during_warmup_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+            "max": round(max(latencies) * 1000, 1) if latencies else None,
+        },
+    }
+
+
+def median(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return percentile(values, 50) if values else None
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8021)
+    parser.add_argument(
+        "--warmup", choices=("background", "blocking", "off"), default="background"
+    )
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--import-budget-ms", type=float, default=1000.0)
+    parser.add_argument("--health-budget-ms", type=float, default=1500.0)
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    imports = profile_import()
+    logger.info(f"import main: {imports['import_ms']} ms")
+    runs = []
+    for i in range(args.runs):
+        run = cold_start(args.port, args.warmup, args.timeout)
+        logger.info(
+            f"run {i + 1}: /health {run['health_ms']} ms, /ready {run['ready_ms']} ms"
+        )
+        runs.append(run)
+
+    summary = {
+        "import_ms": imports["import_ms"],
+        "health_ms": median([r["health_ms"] for r in runs]),
+        "ready_ms": median([r["ready_ms"] for r in runs]),
+    }
+    failures = []
+    if imports["heavy_modules"]:
+        failures.append(f"imported at startup: {', '.join(imports['heavy_modules'])}")
+    if summary["import_ms"] > args.import_budget_ms:
+        failures.append(
+            f"import {summary['import_ms']} ms > {args.import_budget_ms:g} ms"
+        )
+    if summary["health_ms"] is None or summary["health_ms"] > args.health_budget_ms:
+        failures.append(
+            f"/health {summary['health_ms']} ms > {args.health_budget_ms:g} ms"
+        )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "warmup": args.warmup,
+            "runs": args.runs,
+        },
+        "summary": summary,
+        "imports": imports,
+        "runs": runs,
+        "failures": failures,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
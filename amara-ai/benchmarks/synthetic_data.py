@@ -0,0 +1,241 @@
+"""Deterministic synthetic South African statements, payslips and emails.
+
+Everything is generated from a seeded `random.Random`, so a given size and
+seed always produce the same documents and benchmark runs are comparable.
+"""
+
+import datetime
+import random
+from typing import Any, Dict, List
+
+BANKS = ("Standard Bank", "FNB", "ABSA", "Nedbank", "Capitec")
+DEBITS = (
+    "DEBIT ORDER VODACOM",
+    "DEBIT ORDER DISCOVERY HEALTH",
+    "POS PURCHASE CHECKERS SEA POINT",
+    "POS PURCHASE WOOLWORTHS CAVENDISH",
+    "POS PURCHASE PICK N PAY ROSEBANK",
+    "ENGEN GARAGE N1 CITY",
+    "UBER TRIP HELP.UBER.COM",
+    "CITY OF CAPE TOWN ELECTRICITY",
+    "NETFLIX.COM",
+    "ATM WITHDRAWAL SANDTON CITY",
+    "SERVICE FEE",
+)
+CREDITS = (
+    "SALARY ACME HOLDINGS (PTY) LTD",
+    "INTERNET TRANSFER FROM SAVINGS",
+    "REFUND TAKEALOT",
+    "CASH DEPOSIT",
+)
+EARNINGS = ("Basic Salary", "Overtime", "Travel Allowance", "Commission", "Bonus")
+DEDUCTIONS = ("PAYE", "UIF", "Medical Aid", "Pension Fund", "Group Life")
+FIRST_NAMES = ("Thabo", "Lerato", "Sipho", "Ayesha", "Pieter", "Naledi", "Johan")
+LAST_NAMES = ("Nkosi", "Dlamini", "van der Merwe", "Naidoo", "Botha", "Mokoena")
+STREETS = ("Main Road", "Kloof Street", "Jan Smuts Avenue", "Beach Road")
+SUBURBS = ("Sea Point", "Gardens", "Rosebank", "Umhlanga", "Observatory")
+INQUIRIES = (
+    "Is this property still available? I'd like to move in next month.",
+    "Could I arrange a viewing on {day}? I'm free after 4pm.",
+    "Please send me more information about the deposit and pet policy.",
+    "Hi, is the flat at {address} still on the market?",
+    "I'd love to view {web_ref} this weekend if possible.",
+)
+DAYS = ("Saturday", "Sunday", "Monday", "Friday", "tomorrow")
+
+# Mirrors the shape of the workflow's viewing template without importing the
+# workflow (which configures Azure OpenAI at import)
+REPLY_TEMPLATE = (
+    "Subject: Re: Property Viewing - {web_ref}\n\nHi,\n\nThank you for your "
+    "interest in {property_address}. I'd be delighted to arrange a viewing "
+    "for you.\n\nThis {property_type} features {key_highlights} and is "
+    "currently {availability_status}.\n\nTo proceed with your application or "
+    "schedule a viewing, please use this secure link: {application_link}\n\n"
+    "Feel free to contact me with any questions.\n\nBest regards,\n"
+    "{agent_name}\n{agent_contact}\n"
+)
+
+
+def zar(cents: int) -> str:
+    """Statement style amount with space thousands separators: -R 1 234.50"""
+    sign = "-" if cents < 0 else ""
+    rands = f"{abs(cents) // 100:,}".replace(",", " ")
+    return f"{sign}R {rands}.{abs(cents) % 100:02d}"
+
+
+def _amount(rng: random.Random, credit: bool) -> int:
+    if credit:
+        return rng.randint(2_000_000, 4_500_000)
+    return -rng.randint(1_500, 300_000)
+
+
+def _dates(rng: random.Random, count: int) -> List[datetime.date]:
+    """Non-decreasing statement dates spread over roughly three months"""
+    start = datetime.date(2024, 1, 1)
+    step = max(count // 90, 1)
+    return [start + datetime.timedelta(days=i // step) for i in range(count)]
+
+
+def transactions(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """API style transactions (ZAR string amounts, DD/MM/YYYY dates)"""
+    rng = random.Random(seed)
+    result = []
+    for date in _dates(rng, count):
+        credit = rng.random() < 0.08
+        result.append(
+            {
+                "description": rng.choice(CREDITS if credit else DEBITS),
+                "amount": zar(abs(_amount(rng, credit))),
+                "date": date.strftime("%d/%m/%Y"),
+                "type": "credit" if credit else "debit",
+            }
+        )
+    return result
+
+
+def bank_statement_text(count: int, seed: int = 0) -> str:
+    """OCR-like statement text: a date line, description line(s), amount line"""
+    rng = random.Random(seed)
+    lines = [
+        f"{rng.choice(BANKS)} - Current Account Statement",
+        "Account Number: 10 2345 6789",
+        "Date Description Amount",
+    ]
+    for date in _dates(rng, count):
+        credit = rng.random() < 0.08
+        lines.append(date.strftime("%d %b %Y"))
+        lines.append(rng.choice(CREDITS if credit else DEBITS))
+        if rng.random() < 0.2:
+            lines.append(f"REF {rng.randint(100000, 999999)}")
+        lines.append(zar(_amount(rng, credit)))
+    lines.append("Closing Balance")
+    return "\n".join(lines)
+
+
+def payslip_text(line_items: int, seed: int = 0) -> str:
+    """Payslip text with `line_items` earnings/deductions and Net Pay last"""
+    rng = random.Random(seed)
+    lines = ["ACME HOLDINGS (PTY) LTD", "Payslip for period ending 25 Jan 2024"]
+    net = 0
+    for i in range(line_items):
+        earning = i % 3 != 2
+        cents = rng.randint(10_000, 2_500_000 if earning else 600_000)
+        net += cents if earning else -cents
+        name = rng.choice(EARNINGS if earning else DEDUCTIONS)
+        lines.append(f"{name}    {zar(cents)}")
+    lines.append("Net Pay")
+    lines.append(zar(max(net, 100)))
+    return "\n".join(lines)
+
+
+def _person(rng: random.Random) -> Dict[str, str]:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    email = f"{first}.{last}".lower().replace(" ", "") + "@example.co.za"
+    return {"name": f"{first} {last}", "email": email}
+
+
+def _address(rng: random.Random) -> str:
+    return f"{rng.randint(1, 250)} {rng.choice(STREETS)}, {rng.choice(SUBURBS)}"
+
+
+def properties(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "web_reference": f"RR{4000000 + i}",
+            "address": _address(rng),
+            "property_type": rng.choice(("apartment", "house", "townhouse")),
+            "key_highlights": "two bedrooms, a balcony and secure parking",
+            "status": "available",
+            "availability_status": "available from 1 March",
+            "application_link": f"https://apply.example.co.za/RR{4000000 + i}",
+        }
+        for i in range(count)
+    ]
+
+
+def emails(
+    count: int, seed: int = 0, site_2_share: float = 0.5, listing_count: int = 1000
+) -> List[Dict[str, str]]:
+    """Inquiry emails: portal lead notifications, plain emails and HTML.
+
+    `site_2_share` of the emails quote a nine digit (site 2) reference that
+    is not in `properties(listing_count, seed)`; the rest quote a listed RR ref.
+    """
+    rng = random.Random(seed)
+    listings = properties(listing_count, seed)
+    result = []
+    for _ in range(count):
+        person = _person(rng)
+        listing = rng.choice(listings)
+        web_ref = listing["web_reference"]
+        portal_sender = "no-reply@privateproperty.co.za"
+        if rng.random() < site_2_share:
+            # Site 2 uses nine digit listing numbers
+            web_ref = str(rng.randint(100000000, 999999999))
+            portal_sender = "no-reply@property24.com"
+        inquiry = rng.choice(INQUIRIES).format(
+            day=rng.choice(DAYS), address=listing["address"], web_ref=web_ref
+        )
+        kind = rng.random()
+        sender = person["email"]
+        if kind < 0.5:
+            sender = portal_sender
+            subject = f"New lead for listing {web_ref}"
+            body = (
+                f"You have received a new enquiry.\n\nName: {person['name']}\n"
+                f"Email: {person['email']}\n"
+                f"Phone: 08{rng.randint(10000000, 99999999)}\n"
+                f"Listing Number: {web_ref}\nMessage: {inquiry}\n\n"
+                "This enquiry was sent via the portal. Do not reply to this email."
+            )
+        elif kind < 0.85:
+            subject = f"Enquiry about {web_ref}"
+            body = (
+                f"Good day,\n\n{inquiry}\n\nKind regards,\n{person['name']}\n\n"
+                f"On Mon, 1 Jan 2024 at 09:00, Agent <agent@example.co.za> wrote:\n"
+                f"> Thanks for your interest in {listing['address']}."
+            )
+        else:
+            subject = f"Fwd: {web_ref}"
+            body = (
+                f"<html><body><p>Hello,</p><p>{inquiry}</p>"
+                f"<p>Regards,<br>{person['name']}</p></body></html>"
+            )
+        result.append({"from": sender, "subject": subject, "body": body})
+    return result
+
+
+def template_variables(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Variables for REPLY_TEMPLATE, one set per property"""
+    return [
+        {
+            "web_ref": p["web_reference"],
+            "property_address": p["address"],
+            "property_type": p["property_type"],
+            "key_highlights": p["key_highlights"],
+            "availability_status": p["availability_status"],
+            "application_link": p["application_link"],
+            "agent_name": "Amara Agent",
+            "agent_contact": "021 555 0100",
+        }
+        for p in properties(count, seed)
+    ]
+
+
+def validation_cases(count: int, seed: int = 0) -> List[Any]:
+    """(reply, context) pairs; about a fifth omit a fact or add a bad phrase"""
+    rng = random.Random(seed)
+    cases = []
+    for prop, variables in zip(
+        properties(count, seed), template_variables(count, seed)
+    ):
+        reply = REPLY_TEMPLATE.format(**variables)
+        roll = rng.random()
+        if roll < 0.1:
+            reply = reply.replace(prop["address"], "the property")
+        elif roll < 0.2:
+            reply += "\nAct now, this is a limited time exclusive offer!"
+        context = {"property": prop, "inquiry_type": "viewing_request"}
+        cases.append((reply, context))
+    return cases
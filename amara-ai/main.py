@@ -1,4 +1,9 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
@@ -6,28 +11,39 @@ from pydantic import BaseModel
 from typing import List, Dict, Any, Optional, Union
 import os
 import json
+import base64
 import logging
 
-
-# Import the refactored CrewAI components and config
-from src.affordability_crew import AffordabilityAnalysisCrew
-from src.affordability_crew.config import setup_config
+# Load .env and read the settings before anything else looks at the environment
+from src.settings import get_settings
+
+get_settings()
+
+# crewai and the crews are imported on first use or by the warm-up at startup
+# (src/utils/startup.py), so /health answers long before they are loaded
+from src.affordability_crew.sweep import resolve_rents, sweep_rents
+from src.utils import (
+    email_fingerprint,
+    llm_usage,
+    memory,
+    metrics,
+    profiling,
+    startup,
+    tracing,
+)
+from src.utils.crew_runner import run_crew
+from src.utils.event_sink import shutdown_event_sink
+from src.utils.pdf_ingestion import ingest_pdf, shutdown_executor
+from src.utils.property_index import get_property_index
+from src.utils.transactions import TransactionRecord
 
 # Import email connector modul
 from src.email_connector import register_routes
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; force replaces any root handler a library installed
+logging.basicConfig(level=logging.INFO, force=True)
 logger = logging.getLogger(__name__)
 
-
-# Initialize environment configuration
-try:
-    setup_config()
-except Exception as e:
-    logger.error(f"Failed to setup configuration: {str(e)}")
-    # We'll continue and let individual API endpoints handle the errors
-
 # Initialize FastAPI app
 app = FastAPI(
     title="Amara AI API",
@@ -44,9 +60,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency middleware and the Prometheus /metrics endpoint
+metrics.instrument_app(app)
+
+# OpenTelemetry spans per request, stage, crew task and LLM call (TRACING_EXPORTER)
+tracing.setup_tracing(app)
+
+# Per request profiles (X-Profile, admin only) and sampled profiling
+profiling.instrument_app(app)
+
+# tracemalloc snapshots and diffs under /admin/memory (admin only)
+memory.register_routes(app)
+
+# Token and cost accounting for every crew LLM call, queried at /admin/usage
+llm_usage.install_hooks()
+llm_usage.register_routes(app)
+
 # Register email connector routes
 register_routes(app)
 
+# Warm-up of crewai, the crews and the LLM client (WARMUP) and /ready
+startup.register_routes(app)
+
 # Mount static files directory
 try:
     app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -54,6 +89,8 @@ try:
 except Exception as e:
     logger.warning(f"Could not mount static files directory: {e}")
 
+metrics.STARTUP_DURATION.labels("import").set(time.perf_counter() - _import_started)
+
 
 # Define data models
 class Transaction(BaseModel):
@@ -73,6 +110,29 @@ class AffordabilityRequest(BaseModel):
     tenant_income: Optional[Dict[str, Any]] = None
     credit_report: Optional[Dict[str, Any]] = None
     analysis_type: Optional[str] = "comprehensive"  # Default to comprehensive
+    # Base64-encoded PDFs, extracted page by page server-side
+    bank_statement_pdf: Optional[str] = None
+    payslip_pdf: Optional[str] = None
+
+
+class PropertyRent(BaseModel):
+    property_id: Optional[str] = None  # Web reference when rent is omitted
+    rent: Optional[float] = None  # In ZAR; looked up from the index if missing
+
+
+class AffordabilitySweepRequest(BaseModel):
+    transactions: List[Transaction] = []
+    properties: List[PropertyRent]
+    agent_id: Optional[str] = None  # Required to look up indexed rents
+    payslip_data: Optional[Union[List, Dict[str, Any]]] = None
+    bank_statement_data: Optional[Union[List, Dict[str, Any]]] = None
+    tenant_income: Optional[Dict[str, Any]] = None
+    credit_report: Optional[Dict[str, Any]] = None
+    bank_statement_pdf: Optional[str] = None
+    payslip_pdf: Optional[str] = None
+    # Optionally run one crew analysis covering the best matches
+    include_narrative: bool = False
+    narrative_top_n: int = 3
 
 
 class AffordabilityResponse(BaseModel):
@@ -84,6 +144,65 @@ class AffordabilityResponse(BaseModel):
     transaction_analysis: Dict[str, Any]  # Categorized transactions
 
 
+def to_transaction_records(transactions: List[Transaction]) -> List[TransactionRecord]:
+    """Convert request transactions to typed records (integer cents, epoch days)"""
+    return [
+        TransactionRecord.from_values(t.description, t.amount, t.date, t.type)
+        for t in transactions
+    ]
+
+
+def decode_pdf(data: Optional[str], field_name: str) -> Optional[bytes]:
+    """Decode a base64 PDF field from the request body"""
+    if not data:
+        return None
+    try:
+        return base64.b64decode(data, validate=True)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"{field_name} is not valid base64"
+        )
+
+
+def build_affordability_crew(
+    bank_statement_pdf: Optional[bytes] = None,
+    payslip_pdf: Optional[bytes] = None,
+    **crew_kwargs,
+):
+    """Build the crew and ingest the applicant's PDFs. Extraction and parsing
+    are CPU bound, so endpoints run this in the threadpool."""
+    from src.affordability_crew import AffordabilityAnalysisCrew
+
+    crew_instance = AffordabilityAnalysisCrew(**crew_kwargs)
+    crew_instance.ingest_pdfs(bank_statement_pdf, payslip_pdf)
+    return crew_instance
+
+
+@app.on_event("shutdown")
+def shutdown_pdf_pool():
+    shutdown_executor()
+
+
+@app.on_event("shutdown")
+def flush_observability_events():
+    shutdown_event_sink()
+
+
+@app.on_event("shutdown")
+def flush_traces():
+    tracing.shutdown_tracing()
+
+
+@app.on_event("shutdown")
+def flush_llm_usage():
+    llm_usage.flush_usage()
+
+
+@app.on_event("shutdown")
+def flush_skeleton_hits():
+    email_fingerprint.flush_hits()
+
+
 # Root endpoint redirects to test client
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -98,35 +217,27 @@ async def root():
 
 @app.post("/analyze-affordability", response_model=AffordabilityResponse)
 async def analyze_affordability(request: AffordabilityRequest):
-    try:
-        # Format transactions for better analysis
-        formatted_transactions = []
-        for t in request.transactions:
-            formatted_transactions.append(
-                {
-                    "description": t.description,
-                    "amount": f"R {t.amount:.2f}",  # South African Rand format
-                    "date": t.date,  # DD/MM/YYYY
-                    "type": t.type,
-                }
-            )
+    bank_statement_pdf = decode_pdf(request.bank_statement_pdf, "bank_statement_pdf")
+    payslip_pdf = decode_pdf(request.payslip_pdf, "payslip_pdf")
 
+    try:
         # Initialize crew with all relevant data
-        crew_instance = AffordabilityAnalysisCrew(
-            transactions_data=formatted_transactions,  # Keep formatted for potential backward compatibility or simple analysis
+        crew_instance = await run_in_threadpool(
+            build_affordability_crew,
+            transactions_data=to_transaction_records(request.transactions),
             target_rent=request.target_rent,
             payslip_data=request.payslip_data,  # Pass raw payslip data
             bank_statement_data=request.bank_statement_data,  # Pass raw bank statement data
             tenant_income=request.tenant_income,  # Pass tenant income data
             credit_report=request.credit_report,  # Pass credit report data
+            bank_statement_pdf=bank_statement_pdf,
+            payslip_pdf=payslip_pdf,
         )
 
         # Execute the analysis using the crew
         try:
-            # Create the crew instance - crew() is a function that returns the crew
-            crew = crew_instance.crew()
-            # Now kickoff the actual crew instance
-            raw_result = crew.kickoff()
+            # Build and kick off the crew in a crew slot, off the event loop
+            _, raw_result = await run_in_threadpool(run_crew, crew_instance.crew)
 
             # Process the result to ensure it matches our expected format
             # The process_results method in the crew handles parsing and validation
@@ -134,9 +245,10 @@ async def analyze_affordability(request: AffordabilityRequest):
                 crew_instance.process_results
             ):
                 # Call process_results directly with the right event name to match the callback
-                result = crew_instance.process_results(
-                    "crew_finished", final_result=raw_result
-                )
+                with metrics.stage("process_results"):
+                    result = crew_instance.process_results(
+                        "crew_finished", final_result=raw_result
+                    )
                 if (
                     result is None
                 ):  # If process_results returns None, use the raw result
@@ -162,6 +274,75 @@ async def analyze_affordability(request: AffordabilityRequest):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 
+@app.post("/analyze-affordability/sweep")
+def analyze_affordability_sweep(request: AffordabilitySweepRequest):
+    """Evaluate one applicant against many properties in a single pass.
+
+    A plain def, so FastAPI runs ingestion and the optional crew kickoff in
+    its threadpool rather than on the event loop.
+    """
+    if not request.properties:
+        raise HTTPException(status_code=400, detail="No properties provided")
+    bank_statement_pdf = decode_pdf(request.bank_statement_pdf, "bank_statement_pdf")
+    payslip_pdf = decode_pdf(request.payslip_pdf, "payslip_pdf")
+    try:
+        properties = resolve_rents(
+            [p.model_dump() for p in request.properties],
+            request.agent_id,
+            get_property_index(),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Deterministic preprocessing runs once for the applicant
+        crew_instance = build_affordability_crew(
+            bank_statement_pdf=bank_statement_pdf,
+            payslip_pdf=payslip_pdf,
+            transactions_data=to_transaction_records(request.transactions),
+            payslip_data=request.payslip_data,
+            bank_statement_data=request.bank_statement_data,
+            tenant_income=request.tenant_income,
+            credit_report=request.credit_report,
+            target_rent=None,
+        )
+        sweep = sweep_rents(crew_instance.preprocessed, properties)
+
+        sweep["narrative"] = None
+        if request.include_narrative:
+            top = sweep["results"][: max(request.narrative_top_n, 1)]
+            # Same instance: the documents are not ingested or preprocessed again
+            crew_instance.retarget(top[0]["rent"], property_options=top)
+            _, raw_result = run_crew(crew_instance.crew)
+            with metrics.stage("process_results"):
+                result = crew_instance.process_results(
+                    "crew_finished", final_result=raw_result
+                )
+            sweep["narrative"] = AffordabilityResponse(**(result or {})).model_dump()
+
+        return sweep
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in affordability sweep: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Affordability sweep error: {str(e)}"
+        )
+
+
+@app.post("/ingest-document")
+def ingest_document(file: UploadFile = File(...), extract_tables: bool = True):
+    """Extract text and tables from an uploaded PDF with per-page timing"""
+    pdf_bytes = file.file.read()
+    if not pdf_bytes:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+    try:
+        return ingest_pdf(pdf_bytes, extract_tables=extract_tables)
+    except Exception as e:
+        logger.error(f"PDF ingestion failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Could not read PDF: {str(e)}")
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -170,6 +351,8 @@ def health():
 @app.get("/debug-crew-config")
 async def debug_crew_config():
     """Debug endpoint to check the crew configuration"""
+    from src.affordability_crew import AffordabilityAnalysisCrew
+
     try:
         # Create a sample crew instance
         sample_data = [
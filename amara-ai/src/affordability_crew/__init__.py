@@ -1,3 +1,11 @@
-from .crew import AffordabilityAnalysisCrew
-
 __all__ = ["AffordabilityAnalysisCrew"]
+
+
+def __getattr__(name):
+    # The crew module imports crewai, which takes seconds; load it on first use
+    # so the sweep and config modules can be imported without it
+    if name == "AffordabilityAnalysisCrew":
+        from .crew import AffordabilityAnalysisCrew
+
+        return AffordabilityAnalysisCrew
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,21 +1,34 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, agent, before_kickoff, crew, task
 from typing import List, Dict, Any, Optional
 import re
-import datetime
 import json
 import logging
-import sys
 import os
 import traceback
-
-# Configure logging to be more detailed
+from src.settings import configure
+from src.utils import metrics, startup
+from src.utils.event_sink import emit_event
+from src.utils.pdf_ingestion import iter_pdf_pages, ingest_pdf
+from src.utils.document_cache import TransactionColumns, get_document_cache
+from src.utils.transactions import (
+    TransactionRecord,
+    TransactionType,
+    coerce_transactions,
+    format_for_prompt,
+    parse_amount_cents,
+    parse_epoch_day,
+)
+
+# Configure logging
 logger = logging.getLogger(__name__)
-handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
-logger.setLevel(logging.DEBUG)  # Set to DEBUG for maximum verbosity
+
+# Install the hooks waiting for crewai (metrics, tracing, usage accounting)
+startup.load_crewai()
+
+# Bump whenever the statement or payslip parsing heuristics change so that
+# results cached by an older parser are not reused.
+PARSER_VERSION = "2"
 
 
 @CrewBase
@@ -24,21 +37,28 @@ class AffordabilityAnalysisCrew:
 
     def __init__(
         self,
-        transactions_data: Optional[List[Dict[str, Any]]] = None,
+        transactions_data: Optional[List[Any]] = None,
         target_rent: Optional[float] = None,
         payslip_data: Optional[Any] = None,
         bank_statement_data: Optional[Any] = None,
         tenant_income: Optional[Dict[str, Any]] = None,
         credit_report: Optional[Dict[str, Any]] = None,
+        property_options: Optional[List[Dict[str, Any]]] = None,
     ):
-        """Initialize with all relevant financial data"""
+        """Initialize with all relevant financial data (PDFs: see ingest_pdfs)"""
         logger.info("Initializing AffordabilityAnalysisCrew")
-        self.transactions_data = transactions_data
+        # Dicts (float or "R 15000.00" amounts) are normalised to typed records
+        self.transactions_data = coerce_transactions(transactions_data)
         self.target_rent = target_rent
         self.payslip_data = payslip_data
         self.bank_statement_data = bank_statement_data
         self.tenant_income = tenant_income
         self.credit_report = credit_report
+        # Ranked sweep results to summarise instead of a single target rent
+        self.property_options = property_options
+        # Transactions parsed while streaming PDF pages (None when no PDF given)
+        self.pdf_transactions = None
+        self.ingestion_report = {}
         # Initialize Langfuse with debug logging
         self.langfuse = None
         # Langfuse initialization and debug logging removed
@@ -48,15 +68,8 @@ class AffordabilityAnalysisCrew:
 
     # --- Observability/Monitoring Integration ---
     def log_observability_event(self, step: str, data: dict, event_type: str = "info"):
-        """Log structured observability/monitoring events for AgentOps or future integrations."""
-        log_entry = {
-            "timestamp": datetime.datetime.utcnow().isoformat(),
-            "step": step,
-            "event_type": event_type,
-            "data": data,
-        }
-        logger.info(f"[OBSERVABILITY] {json.dumps(log_entry, default=str)}")
-        # Langfuse trace logging removed
+        """Queue a structured observability event; serialized off the request path."""
+        emit_event(step, data, event_type)
 
     def parse_net_income_from_payslip_text(self, payslip_text: str) -> float:
         """Extract net income from payslip OCR text using regex heuristics."""
@@ -98,7 +111,9 @@ class AffordabilityAnalysisCrew:
                     continue
         return 0.0
 
-    def parse_transactions_from_bank_statement_text(self, statement_text: str) -> list:
+    def parse_transactions_from_bank_statement_text(
+        self, statement_text: str
+    ) -> List[TransactionRecord]:
         """Extract transactions from bank statement OCR text using regex heuristics."""
         if not statement_text:
             return []
@@ -119,39 +134,154 @@ class AffordabilityAnalysisCrew:
                 while j < len(lines) and j < i + 6:
                     amt_match = amount_regex.search(lines[j])
                     if amt_match:
-                        amt_str = amt_match.group(1)
-                        amt_str = (
-                            amt_str.replace("R", "").replace(",", "").replace(" ", "")
-                        )
-                        try:
-                            amount = float(amt_str)
-                        except Exception:
-                            amount = 0.0
+                        amount = parse_amount_cents(amt_match.group(1))
                         break
                     else:
                         desc.append(lines[j].strip())
                     j += 1
                 if amount is not None:
-                    # Try to parse date to DD/MM/YYYY
-                    try:
-                        dt = datetime.datetime.strptime(date_str.strip(), "%d %b %Y")
-                        date_fmt = dt.strftime("%d/%m/%Y")
-                    except Exception:
-                        date_fmt = date_str.strip()
-                    tx_type = "debit" if amount < 0 else "credit"
+                    date_days = parse_epoch_day(date_str)
                     transactions.append(
-                        {
-                            "date": date_fmt,
-                            "description": " ".join(desc).strip(),
-                            "amount": amount,
-                            "type": tx_type,
-                        }
+                        TransactionRecord(
+                            description=" ".join(desc).strip(),
+                            amount_cents=amount,
+                            date_days=date_days,
+                            type=(
+                                TransactionType.DEBIT
+                                if amount < 0
+                                else TransactionType.CREDIT
+                            ),
+                            date_raw=date_str.strip() if date_days is None else None,
+                        )
                     )
                 i = j
             else:
                 i += 1
         return transactions
 
+    def load_statement_transactions(self, statement_text: str):
+        """Parse statement text, reusing cached columns for documents seen before."""
+        cache = get_document_cache()
+        key = cache.key(statement_text, "bank_statement", PARSER_VERSION)
+        cached = cache.load_transactions(key)
+        metrics.record_cache_lookup("parsed_document", cached is not None)
+        if cached is not None:
+            logger.info(f"Parsed document cache hit for statement {key[:12]}")
+            return cached
+        parsed = self.parse_transactions_from_bank_statement_text(statement_text)
+        return cache.store_transactions(key, parsed) or parsed
+
+    def load_payslip_net_income(self, payslip_text: str) -> float:
+        """Parse payslip net income, reusing the cached value for documents seen before."""
+        cache = get_document_cache()
+        key = cache.key(payslip_text, "payslip", PARSER_VERSION)
+        cached = cache.load_fields(key)
+        hit = cached is not None and "net_income" in cached
+        metrics.record_cache_lookup("parsed_document", hit)
+        if hit:
+            logger.info(f"Parsed document cache hit for payslip {key[:12]}")
+            return float(cached["net_income"])
+        net_income = self.parse_net_income_from_payslip_text(payslip_text)
+        cache.store_fields(key, {"net_income": net_income})
+        return net_income
+
+    def ingest_bank_statement_pdf(self, pdf_bytes: bytes):
+        """Extract a bank statement PDF page by page, parsing each page as it arrives."""
+        cache = get_document_cache()
+        key = cache.key(pdf_bytes, "bank_statement_pdf", PARSER_VERSION)
+        cached = cache.load_transactions(key)
+        metrics.record_cache_lookup("parsed_document", cached is not None)
+        if cached is not None:
+            logger.info(f"Parsed document cache hit for statement PDF {key[:12]}")
+            self.pdf_transactions = cached
+            self.ingestion_report["bank_statement"] = {
+                "cached": True,
+                "transactions": len(cached),
+            }
+            if not self.bank_statement_data:
+                self.bank_statement_data = {"text": cache.load_text(key) or ""}
+            return
+
+        logger.info("Ingesting bank statement PDF")
+        transactions = []
+        texts = []
+        pages = []
+        for page in iter_pdf_pages(pdf_bytes):
+            pages.append(page.timing())
+            texts.append(page.text)
+            transactions.extend(
+                self.parse_transactions_from_bank_statement_text(page.text)
+            )
+        text = "\n".join(texts)
+        self.pdf_transactions = (
+            cache.store_transactions(key, transactions, text=text) or transactions
+        )
+        self.ingestion_report["bank_statement"] = {
+            "cached": False,
+            "pages": pages,
+            "transactions": len(transactions),
+        }
+        # Keep the extracted text available to the agent as raw statement data
+        if not self.bank_statement_data:
+            self.bank_statement_data = {"text": text}
+        logger.info(
+            f"Parsed {len(transactions)} transactions from {len(pages)} statement pages"
+        )
+
+    def ingest_payslip_pdf(self, pdf_bytes: bytes):
+        """Extract payslip PDF text so the payslip parser can run on it."""
+        cache = get_document_cache()
+        key = cache.key(pdf_bytes, "payslip_pdf", PARSER_VERSION)
+        cached = cache.load_fields(key)
+        metrics.record_cache_lookup("parsed_document", cached is not None)
+        if cached is not None:
+            logger.info(f"Parsed document cache hit for payslip PDF {key[:12]}")
+            text = cached.get("text", "")
+            self.ingestion_report["payslip"] = {"cached": True}
+        else:
+            logger.info("Ingesting payslip PDF")
+            extracted = ingest_pdf(pdf_bytes)
+            text = extracted["text"]
+            cache.store_fields(key, {"text": text})
+            self.ingestion_report["payslip"] = {
+                "cached": False,
+                "pages": extracted["pages"],
+            }
+        if not isinstance(self.payslip_data, dict):
+            self.payslip_data = {}
+        if not self.payslip_data.get("text"):
+            self.payslip_data["text"] = text
+
+    def ingest_pdfs(
+        self,
+        bank_statement_pdf: Optional[bytes] = None,
+        payslip_pdf: Optional[bytes] = None,
+    ):
+        """Extract and parse the applicant's PDFs, then prepare the task data
+        again. CPU bound, so endpoints call it through run_in_threadpool."""
+        if not (bank_statement_pdf or payslip_pdf):
+            return
+        if bank_statement_pdf:
+            self.ingest_bank_statement_pdf(bank_statement_pdf)
+        if payslip_pdf:
+            self.ingest_payslip_pdf(payslip_pdf)
+        self.prepare_data()
+
+    def retarget(self, target_rent: float, property_options=None):
+        """Aim the analysis at another rent, reusing the parsed documents and
+        preprocessed totals instead of ingesting and preprocessing again."""
+        self.target_rent = target_rent
+        self.property_options = property_options
+        max_rent = self.preprocessed.get("max_affordable_rent") or 0
+        self.preprocessed = {
+            **self.preprocessed,
+            "target_rent": target_rent,
+            "can_afford": target_rent <= max_rent,
+        }
+        self.context_data["target_rent"] = target_rent
+        self.context_data["preprocessed"] = self.preprocessed
+
+    @metrics.timed("preprocess_financials")
     def preprocess_financials(self):
         """Deterministically compute total net income, total expenses, debts, and apply the 30% rule."""
         logger.info("Preprocessing financial data for deterministic calculations")
@@ -166,41 +296,43 @@ class AffordabilityAnalysisCrew:
                 payslip.get("netIncome") or payslip.get("net_income") or 0
             )
             if payslip_income == 0 and "text" in payslip:
-                payslip_income = self.parse_net_income_from_payslip_text(
-                    payslip["text"]
-                )
-        # Bank statement transactions
+                payslip_income = self.load_payslip_net_income(payslip["text"])
+        # Bank statement transactions (cached columns or freshly parsed lists)
+        statements = []
         if not transactions or len(transactions) == 0:
-            # Try to parse from bank_statement_data OCR text
-            bank_data = self.bank_statement_data
-            if isinstance(bank_data, list):
-                for doc in bank_data:
+            if self.pdf_transactions is not None:
+                # Already parsed page by page during PDF ingestion
+                statements.append(self.pdf_transactions)
+            else:
+                # Try to parse from bank_statement_data OCR text
+                bank_data = self.bank_statement_data
+                docs = bank_data if isinstance(bank_data, list) else [bank_data]
+                for doc in docs:
                     if isinstance(doc, dict) and "text" in doc:
-                        parsed = self.parse_transactions_from_bank_statement_text(
-                            doc["text"]
+                        statements.append(
+                            self.load_statement_transactions(doc["text"])
                         )
-                        if parsed:
-                            transactions.extend(parsed)
-            elif isinstance(bank_data, dict) and "text" in bank_data:
-                parsed = self.parse_transactions_from_bank_statement_text(
-                    bank_data["text"]
-                )
-                if parsed:
-                    transactions.extend(parsed)
-        # Aggregate income and expenses from transactions
-        total_income = 0.0
-        total_expenses = 0.0
+        column_statements = []
+        for parsed in statements:
+            if isinstance(parsed, TransactionColumns):
+                column_statements.append(parsed)
+            elif parsed:
+                transactions.extend(parsed)
+        # Aggregate income and expenses from transactions (in cents)
+        income_cents = 0
+        expense_cents = 0
         for t in transactions:
-            amt = float(t.get("amount", 0))
-            # Outgoing: negative or type 'debit' or description with '-' or 'R' prefix
-            if (
-                str(t.get("type", "")).lower() == "debit"
-                or str(t.get("description", "")).strip().startswith("-")
-                or ("R" in str(t.get("description", "")) and amt < 0)
-            ):
-                total_expenses += abs(amt)
+            if t.is_outgoing():
+                expense_cents += abs(t.amount_cents)
             else:
-                total_income += amt
+                income_cents += t.amount_cents
+        total_income = income_cents / 100
+        total_expenses = expense_cents / 100
+        # Cached statements are aggregated directly from the mapped columns
+        for columns in column_statements:
+            totals = columns.totals()
+            total_income += totals["income"]
+            total_expenses += totals["expenses"]
         # Payslip fallback
         if payslip_income > 0:
             total_income = max(total_income, payslip_income)
@@ -227,6 +359,7 @@ class AffordabilityAnalysisCrew:
         logger.info(f"Preprocessing result: {audit}")
         return audit
 
+    @metrics.timed("prepare_data")
     def prepare_data(self):
         """Prepare data for task context as a dictionary"""
         logger.info("Preparing data for task context")
@@ -245,7 +378,10 @@ class AffordabilityAnalysisCrew:
 
         # Create a dictionary for the context
         self.context_data = {
-            "formatted_transactions": safe_json_dumps(self.transactions_data, "[]"),
+            # ZAR formatting happens only here, for the prompt
+            "formatted_transactions": safe_json_dumps(
+                format_for_prompt(self.transactions_data), "[]"
+            ),
             "target_rent": self.target_rent if self.target_rent is not None else 0.0,
             "payslip_data": self.payslip_data,
             "bank_statement_data": self.bank_statement_data,
@@ -289,7 +425,7 @@ class AffordabilityAnalysisCrew:
 
         # Create the agent using CrewAI's default handling of LLMs
         # CrewAI will automatically handle the Azure OpenAI configuration
-        # from the environment variables
+        # from the environment variables (exported by configure_llm)
         return Agent(
             role=config["role"],
             goal=enhanced_goal,
@@ -301,8 +437,8 @@ class AffordabilityAnalysisCrew:
     @task
     def affordability_analysis(self) -> Task:
         """Task for analyzing bank statements and assessing affordability"""
-        # Ensure we have the latest context data dictionary
-        context = self.prepare_data()
+        # Prepared in __init__ and kept current by ingest_pdfs/retarget
+        context = self.context_data
 
         # Create task with custom description that directly includes the data
         task_config = self.tasks_config["affordability_analysis"].copy()
@@ -316,6 +452,15 @@ class AffordabilityAnalysisCrew:
             "You must use these values for your reasoning and recommendations. Do NOT change the can_afford value. "
             "Explain the result, cite the 30% rule, and provide actionable recommendations."
         )
+        if self.property_options:
+            options_json = json.dumps(self.property_options, indent=2)
+            task_config["description"] += (
+                "\n\nThe applicant is being considered for several properties. "
+                "Below are the best matches, ranked by deterministic headroom:\n"
+                f"```json\n{options_json}\n```\n"
+                "Cover each of these properties in your recommendations, explaining which "
+                "ones the applicant can comfortably afford and why."
+            )
 
         # Add specific output expectations to ensure proper JSON format
         task_config["expected_output"] = (
@@ -337,6 +482,13 @@ class AffordabilityAnalysisCrew:
             ),
         )
 
+    @before_kickoff
+    def configure_llm(self, inputs):
+        """Validate and export the Azure OpenAI settings before the first LLM
+        call, so the crew can be built (and its parsers run) without them"""
+        configure()
+        return inputs
+
     @crew
     def crew(self) -> Crew:
         """Creates the affordability analysis crew"""
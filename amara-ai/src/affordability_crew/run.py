@@ -7,6 +7,7 @@ import os
 from pathlib import Path
 from .crew import AffordabilityAnalysisCrew
 from .config import setup_config
+from src.utils.crew_runner import run_crew
 
 # Configure logging
 logging.basicConfig(
@@ -196,10 +197,8 @@ def main():
 
         # Run the crew
         logger.info("Starting affordability analysis")
-        # Create the crew instance from the crew() function
-        crew = crew_instance.crew()
-        # Kickoff the actual crew instance
-        raw_result = crew.kickoff()
+        # Build and kick off the crew in a crew slot
+        _, raw_result = run_crew(crew_instance.crew)
 
         # Process the result to ensure it matches our expected format
         if hasattr(crew_instance, "process_results") and callable(
@@ -0,0 +1,87 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# South African affordability rule used by preprocess_financials
+RENT_TO_INCOME_LIMIT = 0.3
+
+
+def resolve_rents(
+    properties: List[Dict[str, Any]],
+    agent_id: Optional[str] = None,
+    property_index=None,
+) -> List[Dict[str, Any]]:
+    """Fill in missing rents from the agent's indexed properties.
+
+    A property without a rent has its property_id looked up as a web
+    reference, taking the listing's monthly_rent. Raises ValueError naming
+    every property that ends up without a rent.
+    """
+    resolved, missing = [], []
+    for prop in properties:
+        rent = prop.get("rent")
+        property_id = prop.get("property_id")
+        if rent is None and agent_id and property_id and property_index:
+            listing = property_index.get(agent_id, property_id) or {}
+            rent = listing.get("monthly_rent", listing.get("rent"))
+        try:
+            resolved.append({**prop, "rent": float(rent)})
+        except (TypeError, ValueError):
+            missing.append(str(property_id or f"#{len(resolved) + len(missing)}"))
+    if missing:
+        raise ValueError(f"No rent given or indexed for: {', '.join(missing)}")
+    return resolved
+
+
+def sweep_rents(
+    preprocessed: Dict[str, Any], properties: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Evaluate one applicant's deterministic affordability against many rents.
+
+    `preprocessed` is the audit block from preprocess_financials, computed
+    once per applicant; every property is then scored in a single vectorized
+    pass. Results are ranked by headroom (max affordable rent minus rent), so
+    the most comfortably affordable listings come first.
+    """
+    total_income = float(preprocessed.get("total_income") or 0.0)
+    max_affordable_rent = RENT_TO_INCOME_LIMIT * total_income if total_income > 0 else 0
+
+    rents = np.array([float(p["rent"]) for p in properties], dtype=np.float64)
+    headroom = max_affordable_rent - rents
+    can_afford = rents <= max_affordable_rent
+    if total_income > 0:
+        ratios = rents / total_income
+    else:
+        ratios = np.full(len(rents), np.inf)
+    order = np.argsort(-headroom, kind="stable")
+
+    results = []
+    for rank, i in enumerate(order, start=1):
+        results.append(
+            {
+                "rank": rank,
+                "property_id": properties[i].get("property_id"),
+                "rent": float(rents[i]),
+                "can_afford": bool(can_afford[i]),
+                "headroom": round(float(headroom[i]), 2),
+                "rent_to_income_ratio": (
+                    round(float(ratios[i]), 4) if np.isfinite(ratios[i]) else None
+                ),
+            }
+        )
+
+    logger.info(
+        f"Swept {len(results)} rents: {int(can_afford.sum())} affordable "
+        f"(max affordable rent {max_affordable_rent:.2f})"
+    )
+    return {
+        "total_income": total_income,
+        "total_expenses": preprocessed.get("total_expenses", 0.0),
+        "total_debt": preprocessed.get("total_debt", 0.0),
+        "max_affordable_rent": max_affordable_rent,
+        "affordable_count": int(can_afford.sum()),
+        "results": results,
+    }
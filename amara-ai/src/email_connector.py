@@ -1,8 +1,19 @@
+import json
+import asyncio
 import logging
+from email.utils import parseaddr
 from fastapi import APIRouter, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Any, Dict
-from src.email_response_workflow import run_email_response_workflow
+from typing import Any, Dict, List, Literal, Optional
+from src.email_response_workflow import PropertyResolver, run_email_response_workflow
+from src.settings import get_settings
+from src.utils.property_index import get_property_index
+from src.utils.idempotency import get_idempotency_store, run_once
+from src.utils.email_fingerprint import get_classification_store
+from src.utils import llm_usage, metrics
+from src.utils.crew_runner import crew_max_concurrency
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -10,6 +21,14 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def backlog_concurrency() -> int:
+    """Backlog emails in flight per request. Crews only run
+    CREW_MAX_CONCURRENCY at a time per process (see src.utils.crew_runner);
+    the other emails in flight are answered from the caches, templates or
+    stored results, or wait for a crew slot."""
+    return get_settings().email.backlog_concurrency or 8 * crew_max_concurrency()
+
+
 class EmailProcessRequest(BaseModel):
     agent_id: str
     workflow_id: str
@@ -17,15 +36,51 @@ class EmailProcessRequest(BaseModel):
     email_subject: str
     email_from: str
     email_date: str
-    agent_properties: list
+    # Optional: omit to use the agent's indexed properties
+    agent_properties: Optional[list] = None
     workflow_actions: dict
+    # Provider message id; redeliveries with the same id replay the result
+    message_id: Optional[str] = None
+    # Low priority work gets template replies once the agent is over budget
+    priority: Literal["normal", "low"] = "normal"
+
+
+def idempotency_key(agent_id: str, message_id: Optional[str]) -> Optional[str]:
+    return f"process-email:{agent_id}:{message_id}" if message_id else None
+
+
+async def run_workflow_once(key: Optional[str], **workflow_kwargs):
+    """Run the email workflow at most once per idempotency key.
+
+    Returns (result, replayed). Only successful results are stored; a
+    failed workflow raises HTTPException(400) and a retry runs it again.
+    """
+
+    async def run():
+        result = await run_in_threadpool(
+            run_email_response_workflow, **workflow_kwargs
+        )
+        if not result.get("success"):
+            raise HTTPException(status_code=400, detail=result)
+        return result
+
+    result, replayed = await run_once(get_idempotency_store(), key, run)
+    if key:
+        metrics.record_cache_lookup("idempotency", replayed)
+    return result, replayed
 
 
 @router.post("/api/v1/process-email")
 async def process_email(request: Request, payload: EmailProcessRequest):
+    llm_usage.set_attribution(
+        agent_id=payload.agent_id,
+        workflow_id=payload.workflow_id,
+        priority=payload.priority,
+    )
     try:
         # Use the modular workflow for end-to-end processing
-        workflow_result = run_email_response_workflow(
+        workflow_result, replayed = await run_workflow_once(
+            idempotency_key(payload.agent_id, payload.message_id),
             email_data={
                 "subject": payload.email_subject,
                 "body": payload.email_content,
@@ -34,15 +89,227 @@ async def process_email(request: Request, payload: EmailProcessRequest):
             },
             agent_properties=payload.agent_properties,
             workflow_actions=payload.workflow_actions,
+            agent_id=payload.agent_id,
         )
-        if not workflow_result.get("success"):
-            logger.error(f"Workflow failed: {workflow_result}")
-            raise HTTPException(status_code=400, detail=workflow_result)
+        if replayed:
+            logger.info(f"Replayed result for message {payload.message_id}")
         return workflow_result
     except Exception as e:
         logger.error(f"Email processing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class BacklogEmail(BaseModel):
+    message_id: Optional[str] = None
+    email_content: str
+    email_subject: str
+    email_from: str
+    email_date: str
+
+
+class EmailBacklogRequest(BaseModel):
+    agent_id: str
+    workflow_id: str
+    emails: List[BacklogEmail]
+    # Optional: omit to use the agent's indexed properties
+    agent_properties: Optional[list] = None
+    workflow_actions: dict
+    # Lower the server's concurrency cap for this batch
+    max_concurrency: Optional[int] = None
+    priority: Literal["normal", "low"] = "low"
+
+
+def plan_backlog(payload: EmailBacklogRequest):
+    """Resolve, dedupe and group backlog emails by matched property.
+
+    Emails are duplicates when they share a message id, or a sender and
+    web_ref (the lead's address for portal notifications; notifications
+    without one are only deduplicated by message id).
+
+    Returns (groups, skipped): groups maps web_ref to the emails to process,
+    skipped holds result lines for duplicates and unmatched emails.
+    """
+    resolver = PropertyResolver(payload.agent_properties, payload.agent_id)
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    skipped: List[Dict[str, Any]] = []
+    seen_ids: Dict[str, int] = {}
+    seen_senders: Dict[tuple, int] = {}
+    for i, email in enumerate(payload.emails):
+        line = {"index": i, "message_id": email.message_id}
+        if email.message_id and email.message_id in seen_ids:
+            skipped.append(
+                {
+                    **line,
+                    "status": "duplicate",
+                    "duplicate_of": seen_ids[email.message_id],
+                }
+            )
+            continue
+        if email.message_id:
+            seen_ids[email.message_id] = i
+        email_data = {
+            "subject": email.email_subject,
+            "body": email.email_content,
+            "from": email.email_from,
+            "date": email.email_date,
+        }
+        resolution = resolver.resolve(email_data)
+        web_ref = resolution["web_ref"]
+        if not resolution["property"]:
+            reason = "property_not_found" if web_ref else "web_ref_not_found"
+            result = {
+                "success": False,
+                "reason": reason,
+                "extraction": resolution["extraction"],
+            }
+            skipped.append({**line, "status": "failed", "result": result})
+            continue
+        # Portal notifications all come from the portal's no-reply address,
+        # so only the lead's own address identifies who is asking
+        lead = resolution.get("lead")
+        if lead:
+            sender = lead.email.lower() if lead.email else None
+        else:
+            sender = parseaddr(email.email_from)[1].strip().lower() or None
+        sender_key = (sender, web_ref)
+        if sender is not None and sender_key in seen_senders:
+            skipped.append(
+                {
+                    **line,
+                    "status": "duplicate",
+                    "duplicate_of": seen_senders[sender_key],
+                }
+            )
+            continue
+        if sender is not None:
+            seen_senders[sender_key] = i
+        groups.setdefault(web_ref, []).append(
+            {
+                **line,
+                "web_ref": web_ref,
+                "email_data": email_data,
+                "resolution": resolution,
+            }
+        )
+    return groups, skipped
+
+
+@router.post("/api/v1/process-email/backlog")
+async def process_email_backlog(payload: EmailBacklogRequest):
+    """Process a mailbox backlog, streaming one NDJSON result line per email.
+
+    Emails are deduplicated (see plan_backlog), queued property by property
+    and run concurrently up to the concurrency cap; each email still runs
+    its own workflow. A final summary line follows the per-email lines.
+    """
+    llm_usage.set_attribution(
+        agent_id=payload.agent_id,
+        workflow_id=payload.workflow_id,
+        priority=payload.priority,
+    )
+    max_emails = get_settings().email.backlog_max_emails
+    if len(payload.emails) > max_emails:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Backlog batches are limited to {max_emails} emails",
+        )
+    groups, skipped = await run_in_threadpool(plan_backlog, payload)
+    concurrency = backlog_concurrency()
+    limit = max(1, min(payload.max_concurrency or concurrency, concurrency))
+    logger.info(
+        f"Backlog for agent {payload.agent_id}: {len(payload.emails)} emails, "
+        f"{sum(len(g) for g in groups.values())} to process across "
+        f"{len(groups)} properties, {len(skipped)} skipped; {limit} in flight, "
+        f"{min(limit, crew_max_concurrency())} crew runs at a time"
+    )
+
+    async def stream():
+        counts = {"processed": 0, "failed": 0, "duplicate": 0}
+        for line in skipped:
+            counts[line["status"]] += 1
+            yield json.dumps(line) + "\n"
+
+        semaphore = asyncio.Semaphore(limit)
+
+        async def process(item: Dict[str, Any]) -> Dict[str, Any]:
+            line = {
+                "index": item["index"],
+                "message_id": item["message_id"],
+                "web_ref": item["web_ref"],
+            }
+            async with semaphore:
+                try:
+                    result, replayed = await run_workflow_once(
+                        idempotency_key(payload.agent_id, item["message_id"]),
+                        email_data=item["email_data"],
+                        agent_properties=payload.agent_properties,
+                        workflow_actions=payload.workflow_actions,
+                        agent_id=payload.agent_id,
+                        resolution=item["resolution"],
+                    )
+                except HTTPException as e:
+                    return {**line, "status": "failed", "result": e.detail}
+                except Exception as e:
+                    logger.error(f"Backlog email {item['index']} failed: {e}")
+                    result = {"success": False, "reason": "workflow_error"}
+                    return {**line, "status": "failed", "result": result}
+            return {
+                **line,
+                "status": "processed",
+                "replayed": replayed,
+                "result": result,
+            }
+
+        # Queue emails property by property so each group runs together
+        tasks = [
+            asyncio.create_task(process(item))
+            for items in groups.values()
+            for item in items
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                counts[line["status"]] += 1
+                yield json.dumps(line, default=str) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+        yield json.dumps({"summary": {"total": len(payload.emails), **counts}}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.put("/api/v1/agents/{agent_id}/properties")
+async def upsert_agent_properties(agent_id: str, properties: List[Dict[str, Any]]):
+    """Insert or update an agent's properties in the web reference index"""
+    index = get_property_index()
+    upserted = index.upsert(agent_id, properties)
+    return {"agent_id": agent_id, "upserted": upserted, "total": index.count(agent_id)}
+
+
+@router.get("/api/v1/agents/{agent_id}/properties/{web_ref}")
+async def get_agent_property(agent_id: str, web_ref: str):
+    prop = get_property_index().get(agent_id, web_ref)
+    if prop is None:
+        raise HTTPException(status_code=404, detail="Property not found")
+    return prop
+
+
+@router.delete("/api/v1/agents/{agent_id}/properties/{web_ref}")
+async def delete_agent_property(agent_id: str, web_ref: str):
+    if not get_property_index().delete(agent_id, web_ref):
+        raise HTTPException(status_code=404, detail="Property not found")
+    return {"agent_id": agent_id, "deleted": web_ref}
+
+
+@router.get("/api/v1/email-fingerprints/stats")
+async def email_fingerprint_stats(top: int = 10):
+    """Skeleton classification reuse: hit rate and most reused skeletons"""
+    store = get_classification_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Fingerprint cache disabled")
+    return store.stats(top)
+
+
 def register_routes(app):
     app.include_router(router)
@@ -1,17 +1,36 @@
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional
+from src.settings import get_settings
 from src.utils.web_ref_extractor import extract_web_ref
+from src.utils.address_matcher import AddressIndex, get_address_matcher
+from src.utils.email_preprocessor import count_tokens, preprocess_email
+from src.utils.lead_parser import parse_portal_lead
+from src.utils.email_fingerprint import (
+    get_classification_store,
+    hash_skeleton,
+    skeleton,
+)
+from src.utils.response_cache import (
+    applicant_terms,
+    get_response_cache,
+    is_template_shaped,
+    personalize,
+    property_fingerprint,
+)
+from src.utils.property_index import (
+    build_web_ref_map,
+    get_property_index,
+    normalize_web_ref,
+)
 from src.utils.template_manager import TemplateManager
 from src.utils.validators import ResponseValidator
-from src.tasks.email_response_agent import process_email_with_crew
-from src.email_response_config import setup_config
+from src.utils import llm_usage, metrics
 import logging
 import json
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Setup Azure OpenAI configuration
-setup_config()
+INQUIRY_TYPES = ("viewing_request", "availability_check", "general_info")
 
 # In-memory templates (replace with DB fetch in production)
 TEMPLATES = {
@@ -47,10 +66,24 @@ def _convert_crew_output(output):
     return output
 
 
-def extract_inquiry_type(result):
+def process_email_with_crew(**kwargs) -> Dict[str, Any]:
+    """Run the email crew; crewai is imported by the first call (or warm-up)"""
+    from src.tasks.email_response_agent import process_email_with_crew as run_crew
+
+    return run_crew(**kwargs)
+
+
+def address_reply(response, email_data: Dict[str, Any]):
+    """Address a reply to the email's sender (the lead, for portal leads)"""
+    if not isinstance(response, dict):
+        return response
+    return {**response, "to": email_data.get("from", "")}
+
+
+def extract_inquiry_type(result, default: Optional[str] = "availability_check"):
     """Extract inquiry type from classification result"""
     if not result:
-        return "availability_check"  # Default fallback
+        return default  # Default fallback
 
     # If result is a CrewOutput object with tasks_output
     if hasattr(result, "tasks_output"):
@@ -60,12 +93,12 @@ def extract_inquiry_type(result):
                     raw = task.get("raw", "")
                     if isinstance(raw, str):
                         parsed = json.loads(raw)
-                        return parsed.get("inquiry_type", "availability_check")
+                        return parsed.get("inquiry_type", default)
                 except json.JSONDecodeError:
                     logger.warning(
                         "Failed to parse classification result, using default"
                     )
-                    return "availability_check"
+                    return default
 
     # If it's a dict with raw field
     if isinstance(result, dict):
@@ -81,8 +114,8 @@ def extract_inquiry_type(result):
         except:
             pass
 
-    logger.info("Using default inquiry type: availability_check")
-    return "availability_check"  # Default fallback
+    logger.info(f"Using default inquiry type: {default}")
+    return default  # Default fallback
 
 
 def serialize_crew_result(result):
@@ -158,48 +191,200 @@ def serialize_crew_result(result):
         }
 
 
+def property_lookup(
+    agent_properties: Optional[list], agent_id: Optional[str]
+) -> Callable[[str], Optional[Dict[str, Any]]]:
+    """Return a web reference -> property lookup.
+
+    Uses the request's property list when one is sent (legacy callers),
+    otherwise the agent's server-side property index.
+    """
+    if agent_properties:
+        return build_web_ref_map(agent_properties).get
+    if agent_id:
+        index = get_property_index()
+        return lambda web_ref: index.get(agent_id, web_ref)
+    return lambda web_ref: None
+
+
+def match_property_by_address(
+    email_data: Dict[str, Any], index: AddressIndex
+) -> Dict[str, Any]:
+    """Fuzzy-match the email against the agent's property addresses.
+
+    Returns the ranked candidates and the accepted property, if the best
+    candidate scores at least ADDRESS_MATCH_MIN_SCORE and beats the runner-up
+    by ADDRESS_MATCH_MIN_MARGIN; otherwise the email is left for a human.
+    """
+    settings = get_settings().email
+    text = f"{email_data.get('subject', '')}\n{email_data.get('body', '')}"
+    candidates = index.match(text)
+    accepted = None
+    if candidates and candidates[0]["score"] >= settings.address_match_min_score:
+        runner_up = candidates[1]["score"] if len(candidates) > 1 else 0.0
+        if candidates[0]["score"] - runner_up >= settings.address_match_min_margin:
+            accepted = candidates[0]["property"]
+    return {
+        "property": accepted,
+        "candidates": [
+            {
+                "web_reference": c["property"].get("web_reference"),
+                "address": c["property"].get("address"),
+                "score": c["score"],
+            }
+            for c in candidates
+        ],
+    }
+
+
+class PropertyResolver:
+    """Resolves emails to one of an agent's properties.
+
+    Build one per request or batch: the web reference map and the address
+    index are then shared by every email it resolves.
+    """
+
+    def __init__(self, agent_properties: Optional[list], agent_id: Optional[str]):
+        self.agent_properties = agent_properties
+        self.agent_id = agent_id
+        self.find_property = property_lookup(agent_properties, agent_id)
+        self._address_index: Optional[AddressIndex] = None
+
+    def address_index(self) -> AddressIndex:
+        if self._address_index is None:
+            if self.agent_properties:
+                self._address_index = AddressIndex(self.agent_properties)
+            elif self.agent_id:
+                self._address_index = get_address_matcher().for_agent(
+                    self.agent_id, get_property_index()
+                )
+            else:
+                self._address_index = AddressIndex([])
+        return self._address_index
+
+    def resolve(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Return {"extraction", "property", "web_ref", "lead"} for an email"""
+        # Step 1: Extract web reference
+        extraction = extract_web_ref(
+            email_data.get("subject", ""), email_data.get("body", "")
+        )
+        # Portal lead notifications name the sender and listing explicitly
+        lead = parse_portal_lead(
+            email_data.get("body", ""), extraction, email_data.get("from")
+        )
+
+        # Step 2: Find property by web_ref (normalize case and trim spaces),
+        # trying the lead's listing reference, then each candidate in rank order
+        matched_property = None
+        normalized_web_ref = normalize_web_ref(extraction["web_ref"])
+        candidate_refs = [c["web_ref"] for c in extraction["candidates"]]
+        if lead and lead.web_ref:
+            candidate_refs.insert(0, lead.web_ref)
+        for candidate_ref in candidate_refs:
+            candidate_ref = normalize_web_ref(candidate_ref)
+            matched_property = self.find_property(candidate_ref)
+            if matched_property:
+                normalized_web_ref = candidate_ref
+                break
+
+        # Step 2b: No usable web_ref, fall back to fuzzy address matching
+        if not matched_property:
+            address_match = match_property_by_address(
+                email_data, self.address_index()
+            )
+            extraction["address_candidates"] = address_match["candidates"]
+            matched_property = address_match["property"]
+            if matched_property:
+                extraction["matched_by"] = "address"
+                normalized_web_ref = normalize_web_ref(
+                    matched_property.get("web_reference")
+                )
+        return {
+            "extraction": extraction,
+            "property": matched_property,
+            "web_ref": normalized_web_ref,
+            "lead": lead,
+        }
+
+
+def templated_reply(
+    matched_property: Dict[str, Any], inquiry_type: str, workflow_actions: dict
+) -> Dict[str, str]:
+    """Reply rendered from the inquiry type's template, without the LLM"""
+    compiled = template_manager.compiled_template(inquiry_type)
+    status = (
+        matched_property.get("availability_status")
+        or matched_property.get("status")
+        or "available"
+    )
+    highlights = matched_property.get("key_highlights") or ""
+    variables = {name: "" for name in compiled.variables}
+    variables.update(
+        {
+            "web_ref": matched_property.get("web_reference", ""),
+            "property_address": matched_property.get("address") or "the property",
+            "property_type": matched_property.get("property_type") or "property",
+            "key_highlights": highlights,
+            "availability_status": status,
+            "availability_message": f"The property is currently {status}.",
+            "property_highlights": f"Highlights: {highlights}" if highlights else "",
+            "application_link": matched_property.get("application_link", ""),
+            "agent_name": workflow_actions.get("agent_name", "Amara Agent"),
+            "agent_contact": workflow_actions.get("agent_contact", ""),
+        }
+    )
+    text = compiled.render(variables)
+    if text.lstrip().startswith("{"):
+        return json.loads(text)["response"]
+    subject = ""
+    if text.startswith("Subject:"):
+        first_line, _, text = text.partition("\n")
+        subject = first_line[len("Subject:") :].strip()
+    return {"subject": subject, "body": text.lstrip("\n")}
+
+
 def run_email_response_workflow(
-    email_data: Dict[str, Any], agent_properties: list, workflow_actions: dict
+    email_data: Dict[str, Any],
+    agent_properties: Optional[list],
+    workflow_actions: dict,
+    agent_id: Optional[str] = None,
+    resolution: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """Run the email response workflow using CrewAI
 
     Args:
         email_data: Dictionary containing email details (subject, body, from, date)
-        agent_properties: List of properties managed by the agent
+        agent_properties: List of properties managed by the agent, or None to
+            use the agent's indexed properties
         workflow_actions: Actions from the workflow configuration
+        agent_id: Agent whose property index is used when no list is sent
+        resolution: PropertyResolver.resolve() result, when the caller has
+            already matched the email to a property
 
     Returns:
         Dictionary containing the workflow results
     """
     try:
-        # Step 1: Extract web reference
-        extraction = extract_web_ref(
-            email_data.get("subject", ""), email_data.get("body", "")
-        )
-        if not extraction["web_ref"]:
-            return {
-                "success": False,
-                "reason": "web_ref_not_found",
-                "extraction": extraction,
-            }
-
-        # Step 2: Find property by web_ref (normalize case and trim spaces)
-        normalized_web_ref = extraction["web_ref"].strip().upper()
-        matched_property = next(
-            (
-                p
-                for p in agent_properties
-                if str(p.get("web_reference", "")).strip().upper() == normalized_web_ref
-            ),
-            None,
-        )
+        if resolution is None:
+            with metrics.stage("resolve_property"):
+                resolution = PropertyResolver(agent_properties, agent_id).resolve(
+                    email_data
+                )
+        extraction = resolution["extraction"]
+        matched_property = resolution["property"]
+        normalized_web_ref = resolution["web_ref"]
+        lead = resolution.get("lead")
         logger.info(
             f"DEBUG: Extraction info: {extraction}, Normalized: {normalized_web_ref}, Matched property: {matched_property}"
         )
         if not matched_property:
             return {
                 "success": False,
-                "reason": "property_not_found",
+                "reason": (
+                    "property_not_found"
+                    if extraction["web_ref"]
+                    else "web_ref_not_found"
+                ),
                 "extraction": extraction,
             }
 
@@ -207,29 +392,143 @@ def run_email_response_workflow(
         # Pass matched_property to the agent for downstream use
         full_workflow_actions = {**workflow_actions}
         full_workflow_actions["matched_property"] = matched_property
+        if lead:
+            full_workflow_actions["lead"] = lead.to_dict()
+            if lead.email:
+                # Replies go to the lead, not the portal's notification address
+                email_data = {**email_data, "from": lead.sender()}
+        # Indexed lookups only need the matched property downstream
+        crew_properties = agent_properties or [matched_property]
+
+        # Clean the body once; classification, generation and validation
+        # all work from the cleaned text (just the message for portal leads)
+        body = email_data.get("body", "")
+        with metrics.stage("preprocess_email"):
+            if lead and lead.message:
+                preprocessed = preprocess_email(lead.message)
+                preprocessed.tokens_before = count_tokens(body)
+            else:
+                preprocessed = preprocess_email(body)
+
+        # Agents over their LLM budget get template replies for low priority
+        # work (backlogs); cached classifications and replies are still used
+        budget_exceeded = llm_usage.should_degrade()
+        if budget_exceeded:
+            logger.info(f"Agent {agent_id} is over its LLM budget, skipping the LLM")
+
+        if lead and lead.inquiry_type:
+            # The portal's request type already says what the lead wants
+            inquiry_type = lead.inquiry_type
+        else:
+            # Emails sharing a skeleton (same text up to names, numbers, refs
+            # and dates) reuse the skeleton's classification
+            classification_store = get_classification_store()
+            email_skeleton = skeleton(email_data.get("subject", ""), preprocessed.text)
+            skeleton_hash = hash_skeleton(email_skeleton)
+            inquiry_type = (
+                classification_store.get(skeleton_hash)
+                if classification_store
+                else None
+            )
+            if classification_store:
+                metrics.record_cache_lookup("email_skeleton", bool(inquiry_type))
+            if inquiry_type:
+                logger.info(f"Reused classification for skeleton {skeleton_hash}")
+            elif not budget_exceeded:
+                # First get classification
+                classification_result = process_email_with_crew(
+                    email_content=preprocessed.text,
+                    email_subject=email_data.get("subject", ""),
+                    agent_properties=crew_properties,
+                    workflow_actions={
+                        **full_workflow_actions,
+                        "classification_only": True,
+                    },
+                )
 
-        # First get classification
-        classification_result = process_email_with_crew(
-            email_content=email_data.get("body", ""),
-            email_subject=email_data.get("subject", ""),
-            agent_properties=agent_properties,
-            workflow_actions={**full_workflow_actions, "classification_only": True},
-        )
-
-        # Extract inquiry type using the new helper function
-        inquiry_type = extract_inquiry_type(classification_result)
+                # Extract inquiry type using the new helper function
+                inquiry_type = extract_inquiry_type(classification_result, None)
+                if classification_store and inquiry_type in INQUIRY_TYPES:
+                    classification_store.put(
+                        skeleton_hash, inquiry_type, email_skeleton
+                    )
         logger.info(f"Extracted inquiry type: {inquiry_type}")
 
         # Relaxed validation - always proceed with availability_check if unclear
         if not inquiry_type:
             inquiry_type = "availability_check"
             logger.warning("Using default inquiry_type: availability_check")
+        metrics.set_labels(inquiry_type=inquiry_type)
+
+        # Reuse the reply to a near-identical past inquiry about this property
+        response_cache = get_response_cache()
+        cache_key = f"{normalized_web_ref}:{property_fingerprint(matched_property)}"
+        reply_context = {"property": matched_property, "inquiry_type": inquiry_type}
+        if response_cache:
+            response_cache.purge_stale(agent_id, f"{normalized_web_ref}:", cache_key)
+            cached = response_cache.lookup(
+                agent_id, cache_key, inquiry_type, preprocessed.text
+            )
+            cached_validation = None
+            if cached:
+                # Check again before sending it on: entries stored before the
+                # template check may still quote their applicant's inquiry
+                cached_validation = validator.validate(cached["reply"], reply_context)
+                terms = applicant_terms({}, cached["matched_inquiry"], matched_property)
+                if not (
+                    cached_validation["pass"]
+                    and is_template_shaped(cached["reply"], terms)
+                ):
+                    logger.info(
+                        f"Cached reply for {normalized_web_ref} is not reusable, "
+                        "generating a new one"
+                    )
+                    cached = None
+            metrics.record_cache_lookup("response", cached is not None)
+            if cached:
+                logger.info(
+                    f"Reusing cached reply for {normalized_web_ref} "
+                    f"(similarity {cached['similarity']})"
+                )
+                return {
+                    "success": True,
+                    "response": address_reply(
+                        personalize(cached["reply"], email_data), email_data
+                    ),
+                    "validation": cached_validation,
+                    "property": matched_property,
+                    "inquiry_type": inquiry_type,
+                    "email_preprocessing": preprocessed.stats(),
+                    "lead": lead.to_dict() if lead else None,
+                    "cached_response": {
+                        "similarity": cached["similarity"],
+                        "matched_inquiry": cached["matched_inquiry"],
+                    },
+                }
+
+        if budget_exceeded:
+            reply = templated_reply(matched_property, inquiry_type, workflow_actions)
+            return {
+                "success": True,
+                "response": address_reply(
+                    personalize(reply, email_data), email_data
+                ),
+                "validation": validator.validate(
+                    reply["body"],
+                    {"property": matched_property, "inquiry_type": inquiry_type},
+                ),
+                "property": matched_property,
+                "inquiry_type": inquiry_type,
+                "email_preprocessing": preprocessed.stats(),
+                "lead": lead.to_dict() if lead else None,
+                "budget_fallback": True,
+            }
 
         # Then get full response
         ai_result = process_email_with_crew(
-            email_content=email_data.get("body", ""),
+            email_content=preprocessed.text,
             email_subject=email_data.get("subject", ""),
-            agent_properties=agent_properties,
+            agent_properties=crew_properties,
             workflow_actions={**full_workflow_actions, "inquiry_type": inquiry_type},
         )
 
@@ -264,7 +563,8 @@ def run_email_response_workflow(
         logger.info("=== END DEBUGGING ===")
 
         # Ensure result is JSON serializable
-        serialized_result = serialize_crew_result(ai_result)
+        with metrics.stage("process_results"):
+            serialized_result = serialize_crew_result(ai_result)
         logger.info(f"Serialized AI result: {json.dumps(serialized_result, indent=2)}")
 
         # Extract the response for validation
@@ -298,13 +598,33 @@ def run_email_response_workflow(
             },
         }
 
+        # Only replies that pass the rule-based checks and say nothing specific
+        # to this applicant are offered for reuse
+        response = serialized_result.get("response", {})
+        if response_cache and response_text and isinstance(response, dict):
+            rule_check = validator.validate(response_text, reply_context)
+            terms = applicant_terms(
+                email_data,
+                preprocessed.text,
+                matched_property,
+                lead.to_dict() if lead else None,
+            )
+            if rule_check["pass"] and is_template_shaped(response, terms):
+                response_cache.store(
+                    agent_id, cache_key, inquiry_type, preprocessed.text, response
+                )
+
         # Return successful result with the response
         return {
             "success": True,
-            "response": serialized_result.get("response", {}),
+            "response": address_reply(
+                serialized_result.get("response", {}), email_data
+            ),
             "validation": validation,
             "property": matched_property,
             "inquiry_type": inquiry_type,
+            "email_preprocessing": preprocessed.stats(),
+            "lead": lead.to_dict() if lead else None,
         }
 
     except Exception as e:
@@ -0,0 +1,354 @@
+import os
+import re
+import json
+import logging
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_VERSION = "2024-08-01-preview"
+DEFAULT_DEPLOYMENT = "gpt-4o-mini"
+# Azure resources, with or without the trailing slash
+AZURE_ENDPOINT_PATTERN = re.compile(r"^https://[^/]+\.openai\.azure\.com/?$")
+# Loopback endpoints (e.g. benchmarks.fake_azure_openai for load tests)
+LOCAL_ENDPOINT_PATTERN = re.compile(r"^https?://(?:localhost|127\.0\.0\.1)(?::\d+)?/?$")
+WARMUP_MODES = ("background", "blocking", "off")
+CACHE_DIR = ".cache"
+
+
+def _env(name: str, default: Any = None, parse: Optional[Callable] = None):
+    """A field read from the environment variable `name` (parsed with the
+    default's type unless `parse` is given)"""
+    if parse is None:
+        parse = type(default) if default is not None else str
+    return field(default=default, metadata={"env": name, "parse": parse})
+
+
+def _flag(name: str, default: bool = True):
+    """An on/off field: any value but "0" turns it on"""
+    return _env(name, default, parse=lambda raw: raw != "0")
+
+
+def _json(name: str):
+    """A mapping given as a JSON object, empty when unset"""
+    return field(
+        default_factory=dict,
+        metadata={"env": name, "parse": lambda raw: json.loads(raw) if raw else {}},
+    )
+
+
+def _from_env(cls):
+    """Build a settings section from the environment, keeping the defaults
+    for unset variables"""
+    values = {}
+    for f in fields(cls):
+        raw = os.getenv(f.metadata["env"])
+        if raw is not None:
+            values[f.name] = f.metadata["parse"](raw)
+    return cls(**values)
+
+
+@dataclass(frozen=True)
+class EmailSettings:
+    # Longest cleaned body passed to the crew (characters)
+    max_chars: int = _env("EMAIL_MAX_CHARS", 2000)
+    # tiktoken encoding used for token counts (gpt-4o family); "estimate"
+    # skips tiktoken, which downloads encodings on first use
+    token_encoding: str = _env("EMAIL_TOKEN_ENCODING", "o200k_base")
+    backlog_max_emails: int = _env("EMAIL_BACKLOG_MAX_EMAILS", 1000)
+    # Emails of a backlog batch in flight at once; 0 means eight per crew slot
+    backlog_concurrency: int = _env("EMAIL_BACKLOG_CONCURRENCY", 0)
+    # A street match is only trusted above this score and this far ahead
+    # of the runner-up
+    address_match_min_score: float = _env("ADDRESS_MATCH_MIN_SCORE", 90.0)
+    address_match_min_margin: float = _env("ADDRESS_MATCH_MIN_MARGIN", 5.0)
+    # Sender domain -> portal name, merged over the known portals in
+    # src.utils.lead_parser; map a domain to "" to stop trusting it
+    portal_sender_domains: Dict[str, str] = _json("PORTAL_SENDER_DOMAINS")
+    property_index_db: str = _env(
+        "PROPERTY_INDEX_DB", os.path.join(CACHE_DIR, "property_index.db")
+    )
+
+
+@dataclass(frozen=True)
+class FingerprintSettings:
+    enabled: bool = _flag("EMAIL_FINGERPRINT_CACHE")
+    db_path: str = _env(
+        "EMAIL_FINGERPRINT_DB", os.path.join(CACHE_DIR, "email_fingerprints.db")
+    )
+    # Skeletons kept in memory; the SQLite table keeps every classified skeleton
+    lru_size: int = _env("EMAIL_FINGERPRINT_LRU_SIZE", 10000)
+    # Seconds between writes of the batched hit counters to SQLite
+    flush_seconds: float = _env("EMAIL_FINGERPRINT_FLUSH_SECONDS", 30.0)
+
+
+@dataclass(frozen=True)
+class ResponseCacheSettings:
+    enabled: bool = _flag("RESPONSE_CACHE")
+    db_path: str = _env(
+        "RESPONSE_CACHE_DB", os.path.join(CACHE_DIR, "response_cache.db")
+    )
+    # Cosine similarity a past inquiry needs before its reply is reused
+    threshold: float = _env("RESPONSE_CACHE_THRESHOLD", 0.85)
+    # Past inquiries kept per property and inquiry type
+    max_entries: int = _env("RESPONSE_CACHE_MAX_ENTRIES", 50)
+    # Entries older than this are purged with those of outdated property details
+    ttl_seconds: int = _env("RESPONSE_CACHE_TTL_SECONDS", 30 * 86400)
+
+
+@dataclass(frozen=True)
+class DocumentCacheSettings:
+    enabled: bool = _flag("PARSED_DOC_CACHE")
+    root: str = _env("PARSED_DOC_CACHE_DIR", os.path.join(CACHE_DIR, "parsed_docs"))
+    # Entries unused for longer than this are deleted, then the least recently
+    # used ones until the cache fits in the byte budget (0 disables either)
+    max_bytes: int = _env("PARSED_DOC_CACHE_MAX_BYTES", 1024**3)
+    ttl_seconds: int = _env("PARSED_DOC_CACHE_TTL_SECONDS", 30 * 86400)
+    # Minimum time between two prunes, which walk the whole cache directory
+    prune_interval: int = _env("PARSED_DOC_CACHE_PRUNE_INTERVAL_SECONDS", 600)
+
+
+@dataclass(frozen=True)
+class IdempotencySettings:
+    # "sqlite" or "module:Class" for another IdempotencyStore
+    store: str = _env("IDEMPOTENCY_STORE", "sqlite")
+    db_path: str = _env("IDEMPOTENCY_DB", os.path.join(CACHE_DIR, "idempotency.db"))
+    # Completed results are kept this long, and at most this many of them
+    ttl_seconds: float = _env("IDEMPOTENCY_TTL_SECONDS", 604800.0)
+    max_entries: int = _env("IDEMPOTENCY_MAX_ENTRIES", 100000)
+    # A claim older than this is treated as abandoned (e.g. the worker died)
+    in_flight_timeout: float = _env("IDEMPOTENCY_IN_FLIGHT_TIMEOUT", 600.0)
+
+
+@dataclass(frozen=True)
+class PdfSettings:
+    # Documents with this many pages or fewer are extracted inline; spinning
+    # work out to the pool costs more than it saves for a short payslip
+    inline_pages: int = _env("PDF_INGEST_INLINE_PAGES", 2)
+    # Extraction processes; 0 means one per CPU
+    workers: int = _env("PDF_INGEST_WORKERS", 0)
+    # Pages per pool task: small enough that the slowest task is about one
+    # slow page, large enough that opening the document is amortised
+    pages_per_task: int = _env("PDF_INGEST_PAGES_PER_TASK", 2)
+
+
+@dataclass(frozen=True)
+class UsageSettings:
+    enabled: bool = _flag("LLM_USAGE_ENABLED")
+    db_path: str = _env("LLM_USAGE_DB", os.path.join(CACHE_DIR, "llm_usage.db"))
+    # Seconds between writes of the in-memory totals to SQLite
+    flush_seconds: float = _env("LLM_USAGE_FLUSH_SECONDS", 30.0)
+    # USD per million tokens by model or deployment name, merged over the
+    # list prices: {"my-deployment": {"prompt": 0.15, "completion": 0.6}}
+    prices: Dict[str, Dict[str, float]] = _json("LLM_PRICES")
+    # Daily USD budget per agent id, "*" for agents not listed: {"*": 5.0}
+    budgets: Dict[str, float] = _json("LLM_BUDGETS")
+
+
+@dataclass(frozen=True)
+class EventSinkSettings:
+    enabled: bool = _flag("EVENT_SINK_ENABLED")
+    # Comma separated: log, file, otlp or "module:Class"
+    exporters: str = _env("EVENT_SINK_EXPORTERS", "log")
+    file: str = _env(
+        "EVENT_SINK_FILE", os.path.join(CACHE_DIR, "observability_events.ndjson")
+    )
+    # Events waiting for the background thread; beyond this they are dropped
+    queue_size: int = _env("EVENT_SINK_QUEUE_SIZE", 10000)
+    batch_size: int = _env("EVENT_SINK_BATCH_SIZE", 256)
+    # Fraction of info events kept; warnings and errors are always kept
+    sample_rate: float = _env("EVENT_SINK_SAMPLE_RATE", 1.0)
+    max_field_chars: int = _env("EVENT_SINK_MAX_FIELD_CHARS", 2000)
+    max_items: int = _env("EVENT_SINK_MAX_ITEMS", 50)
+    max_event_bytes: int = _env("EVENT_SINK_MAX_EVENT_BYTES", 65536)
+    # Keys whose values never leave the process (matched at any depth)
+    redact: str = _env(
+        "EVENT_SINK_REDACT",
+        "bank_statement_data,payslip_data,credit_report,tenant_income,"
+        "formatted_transactions,email_content,content,description,body,api_key",
+    )
+
+
+@dataclass(frozen=True)
+class TracingSettings:
+    # none, file, otlp (OTLP/HTTP, configured by OTEL_EXPORTER_OTLP_*) or console
+    exporter: str = _env("TRACING_EXPORTER", "none")
+    file: str = _env("TRACING_FILE", os.path.join(CACHE_DIR, "traces.ndjson"))
+    # Fraction of new traces recorded; traces started upstream keep their decision
+    sample_rate: float = _env("TRACING_SAMPLE_RATE", 1.0)
+    excluded_urls: str = _env("TRACING_EXCLUDED_URLS", "/health,/ready,/metrics")
+    service_name: str = _env("OTEL_SERVICE_NAME", "amara-ai")
+
+
+@dataclass(frozen=True)
+class ProfilingSettings:
+    # Fraction of requests profiled in the background (0 disables)
+    sample_rate: float = _env("PROFILING_SAMPLE_RATE", 0.0)
+    interval_ms: float = _env("PROFILING_INTERVAL_MS", 5.0)
+    # Sampled profiles are appended here, one collapsed stack per line
+    dir: str = _env("PROFILING_DIR", os.path.join(CACHE_DIR, "profiles"))
+    max_bytes: int = _env("PROFILING_MAX_BYTES", 10 * 1024 * 1024)
+    backup_count: int = _env("PROFILING_BACKUP_COUNT", 5)
+    # Call tree nodes below this share of the samples are left out
+    tree_min_percent: float = _env("PROFILING_TREE_MIN_PERCENT", 0.5)
+
+
+@dataclass(frozen=True)
+class MemorySettings:
+    # Start tracemalloc at startup with this many frames per allocation (0
+    # leaves it off; PYTHONTRACEMALLOC or the admin endpoint can also start it)
+    tracemalloc_frames: int = _env("MEMORY_TRACEMALLOC_FRAMES", 0)
+    # Snapshots kept for diffing; older ones are discarded
+    max_snapshots: int = _env("MEMORY_MAX_SNAPSHOTS", 5)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Process configuration, read once from the environment and .env"""
+
+    azure_openai_api_key: Optional[str] = None
+    azure_openai_endpoint: Optional[str] = None
+    azure_openai_api_version: Optional[str] = None
+    azure_openai_deployment_name: Optional[str] = None
+    # How crewai, the crews and the LLM client are loaded at startup:
+    # background (the default; /health answers meanwhile), blocking (the
+    # server accepts no requests until they are) or off (first request)
+    warmup: str = "background"
+    # Shared secret for operator-only features (profiling, memory
+    # snapshots); when unset those features are disabled
+    admin_token: Optional[str] = None
+    # Crews kicked off at once in this process (see src.utils.crew_runner)
+    crew_max_concurrency: int = 1
+    email: EmailSettings = field(default_factory=EmailSettings)
+    fingerprint: FingerprintSettings = field(default_factory=FingerprintSettings)
+    response_cache: ResponseCacheSettings = field(
+        default_factory=ResponseCacheSettings
+    )
+    document_cache: DocumentCacheSettings = field(
+        default_factory=DocumentCacheSettings
+    )
+    idempotency: IdempotencySettings = field(default_factory=IdempotencySettings)
+    pdf: PdfSettings = field(default_factory=PdfSettings)
+    usage: UsageSettings = field(default_factory=UsageSettings)
+    event_sink: EventSinkSettings = field(default_factory=EventSinkSettings)
+    tracing: TracingSettings = field(default_factory=TracingSettings)
+    profiling: ProfilingSettings = field(default_factory=ProfilingSettings)
+    memory: MemorySettings = field(default_factory=MemorySettings)
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        warmup = os.getenv("WARMUP", "background").lower()
+        if warmup not in WARMUP_MODES:
+            logger.warning(f"Unknown WARMUP mode {warmup!r}, using background")
+            warmup = "background"
+        return cls(
+            azure_openai_api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            # A trailing slash breaks the URLs litellm builds
+            azure_openai_endpoint=endpoint.rstrip("/") if endpoint else endpoint,
+            azure_openai_api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+            azure_openai_deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+            warmup=warmup,
+            admin_token=os.getenv("ADMIN_TOKEN"),
+            crew_max_concurrency=max(int(os.getenv("CREW_MAX_CONCURRENCY", "1")), 1),
+            email=_from_env(EmailSettings),
+            fingerprint=_from_env(FingerprintSettings),
+            response_cache=_from_env(ResponseCacheSettings),
+            document_cache=_from_env(DocumentCacheSettings),
+            idempotency=_from_env(IdempotencySettings),
+            pdf=_from_env(PdfSettings),
+            usage=_from_env(UsageSettings),
+            event_sink=_from_env(EventSinkSettings),
+            tracing=_from_env(TracingSettings),
+            profiling=_from_env(ProfilingSettings),
+            memory=_from_env(MemorySettings),
+        )
+
+    def missing(self) -> List[str]:
+        required = {
+            "AZURE_OPENAI_API_KEY": self.azure_openai_api_key,
+            "AZURE_OPENAI_ENDPOINT": self.azure_openai_endpoint,
+            "AZURE_OPENAI_API_VERSION": self.azure_openai_api_version,
+            "AZURE_OPENAI_DEPLOYMENT_NAME": self.azure_openai_deployment_name,
+        }
+        return [name for name, value in required.items() if not value]
+
+    def validate(self):
+        """Raise ValueError when the Azure OpenAI configuration is unusable"""
+        missing = self.missing()
+        if missing:
+            raise ValueError(
+                f"Missing required environment variables: {', '.join(missing)}"
+            )
+        endpoint = self.azure_openai_endpoint
+        if not (
+            AZURE_ENDPOINT_PATTERN.match(endpoint)
+            or LOCAL_ENDPOINT_PATTERN.match(endpoint)
+        ):
+            raise ValueError(f"Invalid Azure OpenAI endpoint format: {endpoint}")
+
+    def export_to_environ(self):
+        """Set the variables crewai and litellm read to reach Azure OpenAI"""
+        api_key = self.azure_openai_api_key or ""
+        endpoint = self.azure_openai_endpoint or ""
+        api_version = self.azure_openai_api_version or DEFAULT_API_VERSION
+        os.environ["AZURE_OPENAI_ENDPOINT"] = endpoint
+        os.environ["AZURE_API_KEY"] = api_key
+        os.environ["AZURE_API_BASE"] = endpoint
+        os.environ["AZURE_API_VERSION"] = api_version
+        # Also set the OpenAI variables as CrewAI might use these too
+        os.environ["OPENAI_API_KEY"] = api_key
+        os.environ["OPENAI_API_BASE"] = endpoint
+        os.environ["OPENAI_API_VERSION"] = api_version
+        os.environ["OPENAI_API_TYPE"] = "azure"
+        os.environ["OPENAI_API_ENGINE"] = (
+            self.azure_openai_deployment_name or DEFAULT_DEPLOYMENT
+        )
+
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+_configured = False
+
+
+def get_settings() -> Settings:
+    """Return the process-wide settings, loading .env on first use"""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            load_dotenv()
+            _settings = Settings.from_env()
+        return _settings
+
+
+def set_settings(settings: Optional[Settings]):
+    """Replace the process-wide settings (None reloads them on next use)"""
+    global _settings
+    with _settings_lock:
+        _settings = settings
+
+
+def configure() -> Settings:
+    """Validate the settings and export them for crewai (once per process)"""
+    global _configured
+    settings = get_settings()
+    with _settings_lock:
+        if _configured:
+            return settings
+        try:
+            settings.validate()
+        except ValueError as e:
+            logger.error(f"Configuration error: {e}")
+            raise
+        settings.export_to_environ()
+        _configured = True
+    logger.info(
+        f"Azure OpenAI configured: endpoint {settings.azure_openai_endpoint}, "
+        f"deployment {settings.azure_openai_deployment_name}, "
+        f"API version {settings.azure_openai_api_version}"
+    )
+    return settings
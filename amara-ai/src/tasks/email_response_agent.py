@@ -3,31 +3,37 @@ from crewai.project import CrewBase, agent, crew, task  # <-- Added missing impo
 from typing import Dict, List, Any, Optional
 import json
 import logging
-import os
 import traceback
-import sys
-from datetime import datetime
-from src.email_response_config import setup_config
+import threading
+from src.settings import configure
+from src.utils import startup
+from src.utils.crew_runner import run_crew
+from src.utils.event_sink import emit_event
 
 # Configure logging
 logger = logging.getLogger(__name__)
-handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
 
-# Setup Azure OpenAI configuration
-setup_config()
-
-# Setup Azure OpenAI LLM
-azure_llm = LLM(
-    model="azure/gpt-4o-mini",  # or your deployment name
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_base=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-    temperature=0.7,
-)
+# Install the hooks waiting for crewai (metrics, tracing, usage accounting)
+startup.load_crewai()
+
+_azure_llm: Optional[LLM] = None
+_azure_llm_lock = threading.Lock()
+
+
+def get_azure_llm() -> LLM:
+    """Return the process-wide Azure OpenAI LLM, built on first use"""
+    global _azure_llm
+    with _azure_llm_lock:
+        if _azure_llm is None:
+            settings = configure()
+            _azure_llm = LLM(
+                model="azure/gpt-4o-mini",  # or your deployment name
+                api_key=settings.azure_openai_api_key,
+                api_base=settings.azure_openai_endpoint,
+                api_version=settings.azure_openai_api_version,
+                temperature=0.7,
+            )
+        return _azure_llm
 
 
 @CrewBase
@@ -76,16 +82,8 @@ class EmailResponseCrew:
         }
 
     def log_observability_event(self, step: str, data: dict, event_type: str = "info"):
-        """Log structured observability/monitoring events"""
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "step": step,
-            "event_type": event_type,
-            "data": data,
-        }
-
-        # Only log to standard logger (Langfuse logging removed)
-        # logger.info(f"[OBSERVABILITY] {json.dumps(log_entry, default=str)}")
+        """Queue a structured observability event; serialized off the request path"""
+        emit_event(step, data, event_type)
 
     @agent
     def response_writer(self) -> Agent:
@@ -98,7 +96,7 @@ class EmailResponseCrew:
                      South African real estate standards and POPI Act compliance.""",
             verbose=True,
             allow_delegation=False,
-            llm=azure_llm,
+            llm=get_azure_llm(),
             tools=[],
             memory=False,
             max_rpm=5,
@@ -114,7 +112,7 @@ class EmailResponseCrew:
                      I can determine if they want to view a property, check availability, or need general info.""",
             verbose=True,
             allow_delegation=False,
-            llm=azure_llm,
+            llm=get_azure_llm(),
             tools=[],
             memory=False,
             max_rpm=5,
@@ -130,7 +128,7 @@ class EmailResponseCrew:
                      professionally written, and include all required information.""",
             verbose=True,
             allow_delegation=False,
-            llm=azure_llm,
+            llm=get_azure_llm(),
             tools=[],
             memory=False,
             max_rpm=5,
@@ -176,7 +174,12 @@ class EmailResponseCrew:
             logger.info("Classification task created successfully")
             self.log_observability_event(
                 "task_creation",
-                {"task": "classify_inquiry", "context": context, "status": "success"},
+                {
+                    "task": "classify_inquiry",
+                    # The prompt context holds the applicant's email
+                    "context_messages": len(context),
+                    "status": "success",
+                },
             )
 
             return task
@@ -244,7 +247,12 @@ class EmailResponseCrew:
             logger.info("Response generation task created successfully")
             self.log_observability_event(
                 "task_creation",
-                {"task": "generate_response", "context": context, "status": "success"},
+                {
+                    "task": "generate_response",
+                    # The prompt context holds the applicant's email
+                    "context_messages": len(context),
+                    "status": "success",
+                },
             )
 
             return task
@@ -326,7 +334,12 @@ class EmailResponseCrew:
             logger.info("Validation task created successfully")
             self.log_observability_event(
                 "task_creation",
-                {"task": "validate_response", "context": context, "status": "success"},
+                {
+                    "task": "validate_response",
+                    # The prompt context holds the applicant's email
+                    "context_messages": len(context),
+                    "status": "success",
+                },
             )
 
             return task
@@ -587,19 +600,21 @@ def process_email_with_crew(
         if not workflow_actions:
             raise ValueError("No workflow actions provided")
 
-        logger.info("Creating EmailResponseCrew instance...")
-        crew_instance = EmailResponseCrew(
-            email_content=email_content,
-            email_subject=email_subject,
-            agent_properties=agent_properties,
-            workflow_actions=workflow_actions,
-        )
-
-        logger.info("Initializing crew...")
-        crew = crew_instance.crew()
+        def build():
+            logger.info("Creating EmailResponseCrew instance...")
+            crew_instance = EmailResponseCrew(
+                email_content=email_content,
+                email_subject=email_subject,
+                agent_properties=agent_properties,
+                workflow_actions=workflow_actions,
+            )
+            logger.info("Initializing crew...")
+            crew = crew_instance.crew()
+            logger.info("Starting crew execution...")
+            return crew
 
-        logger.info("Starting crew execution...")
-        result = crew.kickoff()  # This runs all tasks in sequence
+        # Runs all tasks in sequence
+        _, result = run_crew(build)
 
         # Convert result to serializable format
         serialized_result = _ensure_serializable(result)
@@ -0,0 +1,241 @@
+import math
+import threading
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import regex
+from rapidfuzz import fuzz, process
+
+logger = logging.getLogger(__name__)
+
+# Property fields that describe where a listing is; all of them feed
+# blocking, but only the street (number and name) decides the score
+ADDRESS_FIELDS = ("address", "suburb", "city", "title")
+# Common abbreviations in South African addresses
+ABBREVIATIONS = {
+    "st": "street",
+    "str": "street",
+    "rd": "road",
+    "ave": "avenue",
+    "av": "avenue",
+    "dr": "drive",
+    "cres": "crescent",
+    "cl": "close",
+    "ln": "lane",
+    "blvd": "boulevard",
+    "ext": "extension",
+}
+TOKEN_PATTERN = regex.compile(r"[\p{L}\p{N}]+")
+# Every street name word must be at least this similar to the email word
+# aligned with it ("kloff" still matches "kloof", "on" does not match "long")
+MIN_TOKEN_SIMILARITY = 75
+# Subtracted when the email names the street without its number
+MISSING_NUMBER_PENALTY = 10.0
+# Added when the email also names the suburb (a tie-breaker, never required)
+SUBURB_BONUS = 5.0
+SUBURB_MIN_SIMILARITY = 90
+# Candidates scored per query after token blocking
+MAX_BLOCK_CANDIDATES = 50
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(ABBREVIATIONS.get(token, token))
+    return tokens
+
+
+def _has_digit(token: str) -> bool:
+    return any(c.isdigit() for c in token)
+
+
+def split_street(prop: Dict[str, Any]) -> Tuple[Optional[str], List[str], str]:
+    """(street number, street name tokens, normalised suburb) of a property.
+
+    The street is the first comma-separated part of the address that starts
+    with a number ("Unit 4, 12 Main Rd" gives 12 / main road), else the first
+    part; the suburb field, or the rest of the address, is the suburb.
+    """
+    parts = [tokenize(p) for p in str(prop.get("address") or "").split(",")]
+    parts = [p for p in parts if p]
+    if not parts:
+        return None, [], ""
+    street_at = next(
+        (i for i, p in enumerate(parts) if len(p) > 1 and _has_digit(p[0])), 0
+    )
+    tokens = parts[street_at]
+    number = tokens[0] if len(tokens) > 1 and _has_digit(tokens[0]) else None
+    name = tokens[1:] if number else tokens
+    if prop.get("suburb"):
+        suburb = tokenize(str(prop["suburb"]))
+    else:
+        suburb = [t for p in parts[street_at + 1 :] for t in p]
+    return number, name, " ".join(suburb)
+
+
+class AddressIndex:
+    """Token-blocked fuzzy index over property street addresses.
+
+    Query tokens first select candidate properties through an inverted
+    index (exact token or shared 4-character prefix, IDF weighted). A
+    candidate then scores by its street name found as a contiguous run of
+    email words, each fuzzily matching (RapidFuzz) the street word in the same
+    position. A number right before that run must be the street number; a
+    missing number costs MISSING_NUMBER_PENALTY and naming the suburb adds
+    SUBURB_BONUS.
+    """
+
+    def __init__(self, properties: Iterable[Dict[str, Any]]):
+        self.properties: List[Dict[str, Any]] = []
+        self._streets: List[Tuple[Optional[str], List[str], str]] = []
+        self._blocks: Dict[str, set] = defaultdict(set)
+        self._block_ids: Dict[str, np.ndarray] = {}
+        doc_freq: Dict[str, int] = defaultdict(int)
+        for prop in properties:
+            street = split_street(prop)
+            if not street[1]:
+                continue
+            text = " ".join(str(prop.get(f) or "") for f in ADDRESS_FIELDS)
+            tokens = list(dict.fromkeys(tokenize(text)))
+            doc_id = len(self.properties)
+            self.properties.append(prop)
+            self._streets.append(street)
+            for token in tokens:
+                doc_freq[token] += 1
+                for key in self._block_keys(token):
+                    self._blocks[key].add(doc_id)
+        n = max(len(self.properties), 1)
+        self._idf = {t: math.log(1 + n / df) for t, df in doc_freq.items()}
+        self._block_ids = {
+            key: np.fromiter(ids, dtype=np.int64, count=len(ids))
+            for key, ids in self._blocks.items()
+        }
+        del self._blocks
+
+    @staticmethod
+    def _block_keys(token: str) -> Tuple[str, ...]:
+        if len(token) >= 5:
+            # Prefix blocks let misspelt street names still reach scoring
+            return (token, f"{token[:4]}*")
+        return (token,)
+
+    def __len__(self) -> int:
+        return len(self.properties)
+
+    def _block(self, query_tokens: List[str]) -> np.ndarray:
+        """Doc ids sharing the most IDF-weighted block keys with the query"""
+        hits = np.zeros(len(self.properties))
+        for token in query_tokens:
+            weight = self._idf.get(token, 1.0)
+            for key in self._block_keys(token):
+                ids = self._block_ids.get(key)
+                if ids is not None:
+                    hits[ids] += weight
+        matched = np.flatnonzero(hits)
+        if len(matched) > MAX_BLOCK_CANDIDATES:
+            top = np.argpartition(-hits[matched], MAX_BLOCK_CANDIDATES)
+            matched = matched[top[:MAX_BLOCK_CANDIDATES]]
+        return matched
+
+    def _street_score(
+        self,
+        street: Tuple[Optional[str], List[str], str],
+        similarity: np.ndarray,
+        rows: Dict[str, int],
+        query_tokens: List[str],
+    ) -> float:
+        """Best score of the street over every run of len(name) email words"""
+        number, name, _ = street
+        k, n = len(name), len(query_tokens)
+        if k > n:
+            return 0.0
+        # runs[j, i]: similarity of street word j to email word i + j
+        runs = np.stack(
+            [similarity[rows[t], j : n - k + 1 + j] for j, t in enumerate(name)]
+        )
+        scores = np.where(
+            runs.min(axis=0) >= MIN_TOKEN_SIMILARITY, runs.mean(axis=0), 0.0
+        )
+        best = 0.0
+        for i in np.flatnonzero(scores):
+            before = query_tokens[i - 1] if i > 0 else ""
+            score = float(scores[i])
+            if number and before != number:
+                if _has_digit(before):
+                    # Another house on the same street
+                    continue
+                score -= MISSING_NUMBER_PENALTY
+            best = max(best, score)
+        return best
+
+    def match(
+        self, text: str, limit: int = 5, min_score: float = 70.0
+    ) -> List[Dict[str, Any]]:
+        """Rank properties whose street address appears (approximately) in
+        `text`.
+
+        Returns up to `limit` candidates as {"property", "score"} with scores
+        from 0 to 100.
+        """
+        query_tokens = tokenize(text or "")
+        if not query_tokens or not self.properties:
+            return []
+        doc_ids = self._block(list(dict.fromkeys(query_tokens)))
+        if len(doc_ids) == 0:
+            return []
+        # Compare every candidate street word with every email word in one
+        # cdist call; runs are then read off the matrix per candidate
+        words = list(dict.fromkeys(t for d in doc_ids for t in self._streets[d][1]))
+        rows = {word: i for i, word in enumerate(words)}
+        similarity = process.cdist(
+            words, query_tokens, scorer=fuzz.ratio, dtype=np.float64
+        )
+        query = " ".join(query_tokens)
+        candidates = []
+        for d in doc_ids:
+            street = self._streets[d]
+            score = self._street_score(street, similarity, rows, query_tokens)
+            if not score:
+                continue
+            suburb = street[2]
+            if suburb and fuzz.partial_ratio(suburb, query) >= SUBURB_MIN_SIMILARITY:
+                score = min(score + SUBURB_BONUS, 100.0)
+            if score >= min_score:
+                candidates.append(
+                    {"property": self.properties[d], "score": round(score, 1)}
+                )
+        candidates.sort(key=lambda c: c["score"], reverse=True)
+        return candidates[:limit]
+
+
+class AddressMatcher:
+    """Per-agent cache of AddressIndex objects built from the property index"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, Tuple[int, AddressIndex]] = {}
+
+    def for_agent(self, agent_id: str, property_index) -> AddressIndex:
+        version = property_index.version(agent_id)
+        with self._lock:
+            cached = self._indexes.get(agent_id)
+            if cached and cached[0] == version:
+                return cached[1]
+        index = AddressIndex(property_index.list(agent_id))
+        logger.info(f"Built address index of {len(index)} properties for {agent_id}")
+        with self._lock:
+            self._indexes[agent_id] = (version, index)
+        return index
+
+
+_default_matcher: Optional[AddressMatcher] = None
+
+
+def get_address_matcher() -> AddressMatcher:
+    """Return the process-wide per-agent address matcher"""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = AddressMatcher()
+    return _default_matcher
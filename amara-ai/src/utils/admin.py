@@ -0,0 +1,20 @@
+import hmac
+
+from fastapi import HTTPException, Request
+
+from src.settings import get_settings
+
+
+def is_admin(request: Request) -> bool:
+    """True when the request carries the admin token in X-Admin-Token"""
+    token = get_settings().admin_token
+    supplied = request.headers.get("x-admin-token")
+    if not token or not supplied:
+        return False
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def require_admin(request: Request):
+    """FastAPI dependency rejecting requests without the admin token"""
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,40 @@
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+from src.settings import get_settings
+from src.utils import metrics
+
+# Crews running in several threads of one process crash the interpreter
+# (segfaults during garbage collection under concurrent kickoffs), so every
+# crew run in the process (email and affordability) takes one of
+# CREW_MAX_CONCURRENCY slots; scale out with more workers instead. The backlog
+# endpoint (src.email_connector) sizes its concurrency from this.
+_crew_slots: Optional[threading.BoundedSemaphore] = None
+_crew_slots_lock = threading.Lock()
+
+
+def crew_max_concurrency() -> int:
+    return get_settings().crew_max_concurrency
+
+
+def _get_crew_slots() -> threading.BoundedSemaphore:
+    global _crew_slots
+    with _crew_slots_lock:
+        if _crew_slots is None:
+            _crew_slots = threading.BoundedSemaphore(crew_max_concurrency())
+        return _crew_slots
+
+
+def run_crew(build: Callable[[], Any], **inputs) -> Tuple[Any, Any]:
+    """Build a crew and kick it off while holding a crew slot.
+
+    Returns (crew, result). Blocks for the whole LLM run, so call it from a
+    worker thread (run_in_threadpool), never on the event loop.
+    """
+    with metrics.acquire(_get_crew_slots(), "crew_slots"):
+        with metrics.stage("crew_build"):
+            crew = build()
+        with metrics.stage("kickoff"):
+            result = crew.kickoff(**inputs)
+    metrics.record_crew_usage(crew)
+    return crew, result
@@ -0,0 +1,317 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from src.settings import get_settings
+from src.utils.transactions import TransactionRecord, TransactionType
+
+logger = logging.getLogger(__name__)
+
+# date_days value for dates the parser could not interpret
+NO_DATE = np.iinfo(np.int32).min
+
+
+def _encode_strings(values: List[str]):
+    """Pack strings into one utf-8 blob plus an offsets array"""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+class TransactionColumns:
+    """Columnar, memory-mapped view of parsed statement transactions.
+
+    Numeric columns are read straight from the mapped files; strings are
+    only decoded when records are requested.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.amount_cents = np.load(
+            os.path.join(path, "amount_cents.npy"), mmap_mode="r"
+        )
+        self.type_code = np.load(os.path.join(path, "type.npy"), mmap_mode="r")
+        self.outgoing = np.load(os.path.join(path, "outgoing.npy"), mmap_mode="r")
+        self.date_days = np.load(os.path.join(path, "date_days.npy"), mmap_mode="r")
+        self._strings = {}
+
+    def __len__(self) -> int:
+        return len(self.amount_cents)
+
+    def _column(self, name: str):
+        if name not in self._strings:
+            self._strings[name] = (
+                np.load(os.path.join(self.path, f"{name}.blob.npy"), mmap_mode="r"),
+                np.load(os.path.join(self.path, f"{name}.offsets.npy"), mmap_mode="r"),
+            )
+        return self._strings[name]
+
+    def strings(self, name: str) -> List[str]:
+        blob, offsets = self._column(name)
+        raw = blob.tobytes()
+        return [
+            raw[offsets[i] : offsets[i + 1]].decode("utf-8")
+            for i in range(len(offsets) - 1)
+        ]
+
+    def totals(self) -> Dict[str, float]:
+        """Total income and expenses in ZAR, using the parser's outgoing rule"""
+        outgoing = self.outgoing.astype(bool)
+        return {
+            "income": int(self.amount_cents[~outgoing].sum()) / 100,
+            "expenses": int(np.abs(self.amount_cents[outgoing]).sum()) / 100,
+        }
+
+    def to_transactions(self) -> List[TransactionRecord]:
+        descriptions = self.strings("description")
+        raw_dates = self.strings("date_raw")
+        return [
+            TransactionRecord(
+                description=descriptions[i],
+                amount_cents=int(self.amount_cents[i]),
+                date_days=(
+                    None if self.date_days[i] == NO_DATE else int(self.date_days[i])
+                ),
+                type=TransactionType(int(self.type_code[i])),
+                date_raw=raw_dates[i] or None,
+            )
+            for i in range(len(self))
+        ]
+
+
+class ParsedDocumentCache:
+    """On-disk cache of parser output keyed by document content hash.
+
+    Each entry is a directory of .npy columns (plus optional JSON fields and
+    extracted text) written atomically, so concurrent workers can share it.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        prune_interval: Optional[int] = None,
+    ):
+        settings = get_settings().document_cache
+        self.root = root or settings.root
+        self.enabled = settings.enabled if enabled is None else enabled
+        self.max_bytes = settings.max_bytes if max_bytes is None else max_bytes
+        self.ttl_seconds = settings.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.prune_interval = (
+            settings.prune_interval if prune_interval is None else prune_interval
+        )
+        self._last_prune = 0.0
+        self._prune_lock = threading.Lock()
+
+    @staticmethod
+    def key(content: Union[str, bytes], kind: str, parser_version: str) -> str:
+        """SHA-256 of the document content, document kind and parser version"""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest = hashlib.sha256()
+        digest.update(f"{kind}:{parser_version}:".encode("utf-8"))
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    @staticmethod
+    def _touch(path: str):
+        """Mark an entry as used; its directory mtime is its last use"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _write_entry(self, key: str, write):
+        path = self._path(key)
+        if os.path.isdir(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            write(tmp)
+            os.rename(tmp, path)
+        except OSError:
+            # Another worker stored the same document first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._maybe_prune()
+        return path
+
+    def _maybe_prune(self):
+        if not self.prune_interval:
+            return
+        now = time.monotonic()
+        with self._prune_lock:
+            if self._last_prune and now - self._last_prune < self.prune_interval:
+                return
+            self._last_prune = now
+        try:
+            self.prune()
+        except OSError as e:
+            logger.warning(f"Could not prune the parsed document cache: {e}")
+
+    def prune(self) -> int:
+        """Delete expired entries, then the least recently used ones until the
+        cache fits in max_bytes. Returns the number of entries deleted.
+
+        Deleting an entry another worker has mapped is safe: the mapped files
+        stay readable until they are closed.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.is_dir() or entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+                except OSError:
+                    # Deleted by another worker meanwhile
+                    continue
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds else None
+        removed = 0
+        for mtime, size, path in entries:
+            expired = cutoff is not None and mtime < cutoff
+            if not expired and (not self.max_bytes or total <= self.max_bytes):
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(
+                f"Pruned {removed} parsed document cache entries, {total} bytes left"
+            )
+        return removed
+
+    def load_transactions(self, key: str) -> Optional[TransactionColumns]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        if not os.path.exists(os.path.join(path, "amount_cents.npy")):
+            return None
+        try:
+            columns = TransactionColumns(path)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        self._touch(path)
+        return columns
+
+    def store_transactions(
+        self,
+        key: str,
+        transactions: List[TransactionRecord],
+        text: Optional[str] = None,
+    ) -> Optional[TransactionColumns]:
+        """Persist parsed transactions (and optionally the source text)"""
+        if not self.enabled:
+            return None
+
+        def write(tmp: str):
+            columns = {
+                "amount_cents": np.array(
+                    [t.amount_cents for t in transactions], dtype=np.int64
+                ),
+                "type": np.array([t.type for t in transactions], dtype=np.int8),
+                "outgoing": np.array(
+                    [t.is_outgoing() for t in transactions], dtype=np.bool_
+                ),
+                "date_days": np.array(
+                    [
+                        NO_DATE if t.date_days is None else t.date_days
+                        for t in transactions
+                    ],
+                    dtype=np.int32,
+                ),
+            }
+            for name, values in columns.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), values)
+            strings = {
+                "description": [t.description for t in transactions],
+                "date_raw": [t.date_raw or "" for t in transactions],
+            }
+            for name, values in strings.items():
+                blob, offsets = _encode_strings(values)
+                np.save(os.path.join(tmp, f"{name}.blob.npy"), blob)
+                np.save(os.path.join(tmp, f"{name}.offsets.npy"), offsets)
+            if text is not None:
+                with open(os.path.join(tmp, "text.txt"), "w", encoding="utf-8") as f:
+                    f.write(text)
+
+        try:
+            self._write_entry(key, write)
+        except Exception as e:
+            logger.warning(f"Could not cache parsed transactions: {e}")
+            return None
+        return self.load_transactions(key)
+
+    def load_text(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, "text.txt"), "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        self._touch(path)
+        return text
+
+    def load_fields(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, "fields.json"), "r") as f:
+                fields = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._touch(path)
+        return fields
+
+    def store_fields(self, key: str, fields: Dict[str, Any]):
+        """Persist small parsed field sets such as payslip values"""
+        if not self.enabled:
+            return
+
+        def write(tmp: str):
+            with open(os.path.join(tmp, "fields.json"), "w") as f:
+                json.dump(fields, f)
+
+        try:
+            self._write_entry(key, write)
+        except Exception as e:
+            logger.warning(f"Could not cache parsed fields: {e}")
+
+
+_default_cache: Optional[ParsedDocumentCache] = None
+
+
+def get_document_cache() -> ParsedDocumentCache:
+    """Return the process-wide parsed document cache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParsedDocumentCache()
+    return _default_cache
@@ -0,0 +1,237 @@
+import os
+import re
+import time
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Masks applied in order; each replaces a kind of variable token with a
+# placeholder so emails that differ only in those tokens share a skeleton
+MASKS = (
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE), "<url>"),
+    # Anything with a digit: web refs, phone numbers, dates, amounts, times
+    (re.compile(r"[\w/.:+-]*\d[\w/.:+-]*"), "<num>"),
+    # Phone numbers and dates written in groups collapse to one placeholder
+    (re.compile(r"<num>(?:[ \t()]+<num>)+"), "<num>"),
+    (
+        re.compile(
+            r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?"
+            r"|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?"
+            r"|nov(?:ember)?|dec(?:ember)?|monday|tuesday|wednesday|thursday"
+            r"|friday|saturday|sunday|today|tomorrow)\b",
+            re.IGNORECASE,
+        ),
+        "<date>",
+    ),
+    # Name fields in portal layouts
+    (
+        re.compile(
+            r"^([ \t*]*(?:full |contact )?name[ \t*]*[:\-]).*$",
+            re.IGNORECASE | re.MULTILINE,
+        ),
+        r"\1 <name>",
+    ),
+    # Capitalised words that do not start a sentence: names, streets, suburbs
+    (re.compile(r"(?<=[a-z,>] )[A-Z][a-z'-]+(?: [A-Z][a-z'-]+)*"), "<name>"),
+)
+WHITESPACE = re.compile(r"\s+")
+
+
+def skeleton(subject: str, body: str) -> str:
+    """Email text with names, numbers, refs, dates and addresses masked"""
+    text = f"{subject or ''}\n{body or ''}"
+    for pattern, placeholder in MASKS:
+        text = pattern.sub(placeholder, text)
+    return WHITESPACE.sub(" ", text).strip().lower()
+
+
+def hash_skeleton(skeleton_text: str) -> str:
+    return hashlib.blake2b(skeleton_text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def fingerprint(subject: str, body: str) -> str:
+    return hash_skeleton(skeleton(subject, body))
+
+
+class SkeletonClassificationStore:
+    """Inquiry type per email skeleton, with hit statistics.
+
+    Lookups are served from an in-memory LRU backed by SQLite, so known
+    skeletons survive restarts and are shared by workers on the host. Hit
+    counters are batched in memory and added to SQLite by a background
+    thread every EMAIL_FINGERPRINT_FLUSH_SECONDS, so a hit never writes.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        lru_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None,
+    ):
+        settings = get_settings().fingerprint
+        self.db_path = db_path or settings.db_path
+        self.lru_size = settings.lru_size if lru_size is None else lru_size
+        self.flush_seconds = (
+            settings.flush_seconds if flush_seconds is None else flush_seconds
+        )
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Hit counters are statistics; no need to fsync every increment
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS skeleton_classifications (
+                fingerprint TEXT PRIMARY KEY,
+                inquiry_type TEXT NOT NULL,
+                skeleton TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_hit_at REAL
+            )"""
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, str]" = OrderedDict()
+        # fingerprint -> [hits, last hit time] not yet written to SQLite
+        self._pending_hits: Dict[str, List[float]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.lookups = 0
+        self.hits = 0
+
+    def get(self, fp: str) -> Optional[str]:
+        """Known inquiry type for a fingerprint (counts as a hit)"""
+        with self._lock:
+            self.lookups += 1
+            inquiry_type = self._lru.get(fp)
+            if inquiry_type is None:
+                row = self._conn.execute(
+                    "SELECT inquiry_type FROM skeleton_classifications "
+                    "WHERE fingerprint = ?",
+                    (fp,),
+                ).fetchone()
+                if row is None:
+                    return None
+                inquiry_type = row[0]
+            self._remember(fp, inquiry_type)
+            self.hits += 1
+            pending = self._pending_hits.setdefault(fp, [0, 0.0])
+            pending[0] += 1
+            pending[1] = time.time()
+        self._ensure_started()
+        return inquiry_type
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="fingerprint-hits-flush", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Could not flush skeleton hit counts: {e}")
+
+    def flush(self):
+        """Add the batched hit counters to SQLite"""
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+            if not pending:
+                return
+            self._conn.executemany(
+                "UPDATE skeleton_classifications "
+                "SET hits = hits + ?, last_hit_at = ? WHERE fingerprint = ?",
+                [(hits, last_hit, fp) for fp, (hits, last_hit) in pending.items()],
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        self.flush()
+
+    def put(self, fp: str, inquiry_type: str, skeleton_text: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO skeleton_classifications "
+                "(fingerprint, inquiry_type, skeleton, hits, created_at) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (fp, inquiry_type, skeleton_text[:2000], time.time()),
+            )
+            self._conn.commit()
+            self._remember(fp, inquiry_type)
+
+    def _remember(self, fp: str, inquiry_type: str):
+        self._lru[fp] = inquiry_type
+        self._lru.move_to_end(fp)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        """Hit rate in this process plus the most reused skeletons"""
+        self.flush()
+        with self._lock:
+            total, total_hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) "
+                "FROM skeleton_classifications"
+            ).fetchone()
+            rows = self._conn.execute(
+                "SELECT fingerprint, inquiry_type, hits, skeleton "
+                "FROM skeleton_classifications ORDER BY hits DESC LIMIT ?",
+                (top,),
+            ).fetchall()
+        hit_rate = self.hits / self.lookups if self.lookups else 0.0
+        return {
+            "skeletons": total,
+            "total_hits": total_hits,
+            "process_lookups": self.lookups,
+            "process_hits": self.hits,
+            "process_hit_rate": round(hit_rate, 3),
+            "top": [
+                {
+                    "fingerprint": fp,
+                    "inquiry_type": inquiry_type,
+                    "hits": hits,
+                    "skeleton": text[:200],
+                }
+                for fp, inquiry_type, hits, text in rows
+            ],
+        }
+
+
+_default_store: Optional[SkeletonClassificationStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_classification_store() -> Optional[SkeletonClassificationStore]:
+    """Return the process-wide skeleton store, or None when disabled"""
+    global _default_store
+    if not get_settings().fingerprint.enabled:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SkeletonClassificationStore()
+            atexit.register(_default_store.flush)
+        return _default_store
+
+
+def flush_hits():
+    if _default_store is not None:
+        _default_store.flush()
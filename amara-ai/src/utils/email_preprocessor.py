@@ -0,0 +1,207 @@
+import re
+import html
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+HTML_TAG = re.compile(r"<[a-zA-Z/!][^>]*>")
+HTML_DROP = re.compile(
+    r"<(script|style|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+HTML_BREAK = re.compile(r"<(br|/p|/div|/tr|/li|/h\d)\b[^>]*>", re.IGNORECASE)
+
+# Lines that start the quoted history of a reply or forward; everything
+# from the first of them onwards is dropped
+QUOTE_MARKERS = re.compile(
+    r"^(?:"
+    r"On .{0,200}wrote:\s*$"
+    r"|-{2,}\s*(?:Original|Forwarded) Message\s*-{2,}"
+    r"|_{10,}\s*$"
+    r"|From:\s.+$\n^(?:Sent|Date):\s"
+    r")",
+    re.IGNORECASE | re.MULTILINE,
+)
+QUOTED_LINE = re.compile(r"^\s*>.*$\n?", re.MULTILINE)
+# Signature delimiters and mobile footers; the rest of the email goes
+SIGNATURE_MARKERS = re.compile(
+    r"^(?:--\s*$|Sent from my \w+|Get Outlook for \w+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Lines that open a portal footer, disclaimer or similar notice. A single
+# matching line may well be the applicant's own words, so only trailing
+# blocks after a separator line, or with two boilerplate lines in a row,
+# are dropped.
+BOILERPLATE_LINE = re.compile(
+    r"^\W*(?:"
+    r"(?:to |click here to |you can )?unsubscribe"
+    r"|(?:view |read |see )?our privacy policy|privacy policy"
+    r"|terms (?:and|&) conditions"
+    r"|this (?:e-?mail|message)(?: and any attachments)? (?:is|are|may be|was sent)"
+    r" (?:confidential|privileged|intended|to you|via|by|from)"
+    r"|(?:it is )?intended (?:solely |only )?for the (?:named )?(?:addressee|recipient)"
+    r"|if you are not the (?:intended|named) (?:recipient|addressee)"
+    r"|confidential(?:ity)? (?:notice|information)|disclaimer\b"
+    r"|(?:this |the )?(?:enquiry|inquiry|lead) (?:was )?(?:sent|submitted)"
+    r" (?:via|through|from)"
+    r"|(?:please )?do not reply to this (?:e-?mail|message)|popi(?:a| act) notice"
+    r")",
+    re.IGNORECASE,
+)
+SEPARATOR_LINE = re.compile(r"^\s*(?:[-_=*~]\s*){3,}$")
+INLINE_SPACE = re.compile(r"[ \t\f\v\u00a0]+")
+BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+@dataclass
+class PreprocessedEmail:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    truncated: bool = False
+
+    def stats(self) -> dict:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "truncated": self.truncated,
+        }
+
+
+_token_counter: Optional[Callable[[str], int]] = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken, or ~4 characters per token without it"""
+    global _token_counter
+    if _token_counter is None:
+        _token_counter = lambda t: (len(t) + 3) // 4
+        encoding_name = get_settings().email.token_encoding
+        if encoding_name != "estimate":
+            try:
+                import tiktoken
+
+                encoding = tiktoken.get_encoding(encoding_name)
+                _token_counter = lambda t: len(
+                    encoding.encode(t, disallowed_special=())
+                )
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+    return _token_counter(text)
+
+
+def strip_html(text: str) -> str:
+    if not HTML_TAG.search(text):
+        return html.unescape(text) if "&" in text else text
+    text = HTML_DROP.sub("", text)
+    text = HTML_BREAK.sub("\n", text)
+    return html.unescape(HTML_TAG.sub("", text))
+
+
+def _normalize_whitespace(text: str) -> str:
+    text = INLINE_SPACE.sub(" ", text)
+    text = BLANK_LINES.sub("\n\n", text)
+    return "\n".join(line.strip() for line in text.split("\n")).strip()
+
+
+def _separator_above(lines, start: int, end: int) -> Optional[int]:
+    """Index of the last separator line in a paragraph, or just above it"""
+    for i in range(end - 1, start - 1, -1):
+        if SEPARATOR_LINE.match(lines[i]):
+            return i
+    above = start - 1
+    while above >= 0 and not lines[above].strip():
+        above -= 1
+    if above >= 0 and SEPARATOR_LINE.match(lines[above]):
+        return above
+    return None
+
+
+def _strip_footer(text: str) -> str:
+    """Drop boilerplate blocks after the last content line.
+
+    A trailing block goes when a separator line sets it off from the body,
+    or when it holds at least two consecutive boilerplate lines (whole
+    paragraphs when they open with them, otherwise just the run at the end).
+    """
+    lines = text.rstrip().split("\n")
+    end = len(lines)
+    while end > 0:
+        if not lines[end - 1].strip():
+            end -= 1
+            continue
+        start = end
+        while start > 0 and lines[start - 1].strip():
+            start -= 1
+        separator = _separator_above(lines, start, end)
+        if separator is not None and any(
+            BOILERPLATE_LINE.match(line) for line in lines[separator + 1 : end]
+        ):
+            end = separator
+            continue
+        if end - start > 1 and all(
+            BOILERPLATE_LINE.match(line) for line in lines[start : start + 2]
+        ):
+            end = start
+            continue
+        run = 0
+        while run < end - start and BOILERPLATE_LINE.match(lines[end - 1 - run]):
+            run += 1
+        if run < 2:
+            break
+        end -= run
+    return "\n".join(lines[:end])
+
+
+def _clean(body: str, max_chars: int):
+    """Cleaned text and whether it was truncated"""
+    original = strip_html((body or "").replace("\r\n", "\n").replace("\r", "\n"))
+    text = original
+    for marker in (QUOTE_MARKERS, SIGNATURE_MARKERS):
+        match = marker.search(text)
+        # A marker on the first line means the whole email is quoted or
+        # forwarded; keep it rather than send an empty inquiry
+        if match and text[: match.start()].strip():
+            text = text[: match.start()]
+    text = QUOTED_LINE.sub("", text)
+    text = _strip_footer(text)
+    text = _normalize_whitespace(text)
+    if not text:
+        # Nothing but quotes and boilerplate (e.g. a bare forward): keep it all
+        text = _normalize_whitespace(original)
+    if len(text) <= max_chars:
+        return text, False
+    cut = text.rfind(" ", 0, max_chars)
+    text = text[: cut if cut > max_chars // 2 else max_chars].rstrip()
+    return text + " ...", True
+
+
+def clean_email_body(body: str, max_chars: Optional[int] = None) -> str:
+    """Strip HTML, quoted history, signatures and boilerplate; cap length
+    (EMAIL_MAX_CHARS unless given)"""
+    if max_chars is None:
+        max_chars = get_settings().email.max_chars
+    return _clean(body, max_chars)[0]
+
+
+def preprocess_email(
+    body: str, max_chars: Optional[int] = None
+) -> PreprocessedEmail:
+    """Clean an inquiry email once for classification, generation and validation"""
+    if max_chars is None:
+        max_chars = get_settings().email.max_chars
+    text, truncated = _clean(body, max_chars)
+    result = PreprocessedEmail(
+        text=text,
+        tokens_before=count_tokens(body or ""),
+        tokens_after=count_tokens(text),
+        truncated=truncated,
+    )
+    logger.info(
+        f"Email body preprocessed: {result.tokens_before} -> "
+        f"{result.tokens_after} tokens"
+    )
+    return result
@@ -0,0 +1,295 @@
+import os
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import importlib
+from typing import Any, List, NamedTuple, Optional
+
+import orjson
+
+from src.settings import get_settings
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+# Exported events go here with the "log" exporter
+events_logger = logging.getLogger("amara.events")
+
+ALWAYS_KEPT = ("warning", "error")
+_STOP = object()
+
+
+class SerializedEvent(NamedTuple):
+    timestamp: float
+    step: str
+    event_type: str
+    line: bytes  # One orjson encoded event, without a trailing newline
+
+
+class EventExporter:
+    """Interface for event exporters; called on the sink's background thread"""
+
+    def export(self, events: List[SerializedEvent]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class LogExporter(EventExporter):
+    """Writes events to the `amara.events` logger"""
+
+    def export(self, events: List[SerializedEvent]):
+        for event in events:
+            events_logger.info(f"[OBSERVABILITY] {event.line.decode('utf-8')}")
+
+
+class FileExporter(EventExporter):
+    """Appends events to a newline delimited JSON file"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_settings().event_sink.file
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "ab")
+
+    def export(self, events: List[SerializedEvent]):
+        self._file.write(b"".join(event.line + b"\n" for event in events))
+        self._file.flush()
+
+    def shutdown(self):
+        self._file.close()
+
+
+class OTLPExporter(EventExporter):
+    """Sends events as OpenTelemetry log records over OTLP/HTTP.
+
+    The endpoint and headers come from the standard OTEL_EXPORTER_OTLP_*
+    environment variables.
+    """
+
+    def __init__(self, endpoint: Optional[str] = None):
+        from opentelemetry.exporter.otlp.proto.http._log_exporter import (
+            OTLPLogExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+        self._exporter = OTLPLogExporter(endpoint=endpoint)
+        self._resource = Resource.create(
+            {"service.name": get_settings().tracing.service_name}
+        )
+        self._scope = InstrumentationScope("amara.events")
+
+    def export(self, events: List[SerializedEvent]):
+        from opentelemetry.sdk._logs import LogData, LogRecord
+
+        self._exporter.export(
+            [
+                LogData(
+                    LogRecord(
+                        timestamp=int(event.timestamp * 1e9),
+                        severity_text=event.event_type.upper(),
+                        body=event.line.decode("utf-8"),
+                        resource=self._resource,
+                        attributes={
+                            "event.step": event.step,
+                            "event.type": event.event_type,
+                        },
+                    ),
+                    self._scope,
+                )
+                for event in events
+            ]
+        )
+
+    def shutdown(self):
+        self._exporter.shutdown()
+
+
+EXPORTERS = {"log": LogExporter, "file": FileExporter, "otlp": OTLPExporter}
+
+
+def create_exporters(spec: Optional[str] = None) -> List[EventExporter]:
+    """Exporters named in `spec` (EVENT_SINK_EXPORTERS by default): log,
+    file, otlp or "module:Class", comma separated"""
+    if spec is None:
+        spec = get_settings().event_sink.exporters
+    exporters = []
+    for name in (s.strip() for s in spec.split(",")):
+        if not name:
+            continue
+        if name in EXPORTERS:
+            exporters.append(EXPORTERS[name]())
+        else:
+            module_name, _, class_name = name.partition(":")
+            module = importlib.import_module(module_name)
+            exporters.append(getattr(module, class_name)())
+    return exporters
+
+
+class EventSink:
+    """Structured observability events, serialized off the request path.
+
+    `emit` only samples, shallow-copies the payload and enqueues it; a
+    background thread redacts, truncates and serializes queued events with
+    orjson and hands them to the exporters in batches. When the queue is
+    full events are dropped rather than blocking the caller.
+    """
+
+    def __init__(
+        self,
+        exporters: Optional[List[EventExporter]] = None,
+        queue_size: Optional[int] = None,
+        sample_rate: Optional[float] = None,
+        redact: Optional[str] = None,
+    ):
+        settings = get_settings().event_sink
+        queue_size = settings.queue_size if queue_size is None else queue_size
+        redact = settings.redact if redact is None else redact
+        self.exporters = create_exporters() if exporters is None else exporters
+        self.sample_rate = settings.sample_rate if sample_rate is None else sample_rate
+        self.batch_size = settings.batch_size
+        self.max_items = settings.max_items
+        self.max_field_chars = settings.max_field_chars
+        self.max_event_bytes = settings.max_event_bytes
+        self.redact = {k.strip().lower() for k in redact.split(",") if k.strip()}
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def emit(self, step: str, data: Any, event_type: str = "info"):
+        if event_type not in ALWAYS_KEPT and random.random() >= self.sample_rate:
+            metrics.OBSERVABILITY_EVENTS.labels("sampled_out").inc()
+            return
+        if isinstance(data, dict):
+            # The caller may keep mutating its dict after we return
+            data = dict(data)
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((time.time(), step, event_type, data))
+        except queue.Full:
+            metrics.OBSERVABILITY_EVENTS.labels("dropped").inc()
+            return
+        metrics.OBSERVABILITY_EVENTS.labels("queued").inc()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="event-sink", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            events = []
+            for item in batch:
+                if item is _STOP:
+                    continue
+                try:
+                    events.append(self.serialize(*item))
+                except Exception as e:
+                    metrics.OBSERVABILITY_EVENTS.labels("failed").inc()
+                    logger.warning(f"Could not serialize event {item[1]}: {e}")
+            if events:
+                self._export(events)
+            if stop:
+                return
+
+    def _export(self, events: List[SerializedEvent]):
+        for exporter in self.exporters:
+            try:
+                exporter.export(events)
+                metrics.OBSERVABILITY_EVENTS.labels("exported").inc(len(events))
+            except Exception as e:
+                metrics.OBSERVABILITY_EVENTS.labels("failed").inc(len(events))
+                logger.warning(f"{type(exporter).__name__} failed to export: {e}")
+
+    def serialize(
+        self, timestamp: float, step: str, event_type: str, data: Any
+    ) -> SerializedEvent:
+        event = {
+            "timestamp": timestamp,
+            "step": step,
+            "event_type": event_type,
+            "data": self._scrub(data),
+        }
+        line = orjson.dumps(event, default=str, option=orjson.OPT_NON_STR_KEYS)
+        if len(line) > self.max_event_bytes:
+            keys = list(data)[: self.max_items] if isinstance(data, dict) else []
+            event["data"] = {"truncated": True, "bytes": len(line), "keys": keys}
+            line = orjson.dumps(event, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return SerializedEvent(timestamp, step, event_type, line)
+
+    def _scrub(self, value: Any) -> Any:
+        """Redact sensitive keys and cap string lengths and list sizes"""
+        if isinstance(value, dict):
+            items = list(value.items())[: self.max_items]
+            return {
+                k: "[redacted]" if str(k).lower() in self.redact else self._scrub(v)
+                for k, v in items
+            }
+        if isinstance(value, (list, tuple)):
+            items = [self._scrub(v) for v in value[: self.max_items]]
+            if len(value) > self.max_items:
+                items.append(f"... {len(value) - self.max_items} more")
+            return items
+        if isinstance(value, str) and len(value) > self.max_field_chars:
+            return (
+                value[: self.max_field_chars]
+                + f"... [{len(value) - self.max_field_chars} more chars]"
+            )
+        return value
+
+    def shutdown(self, timeout: float = 5.0):
+        """Export what is queued and stop the background thread"""
+        if self._thread is not None:
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+
+_default_sink: Optional[EventSink] = None
+_default_sink_lock = threading.Lock()
+
+
+def get_event_sink() -> Optional[EventSink]:
+    """Return the process-wide event sink, or None when disabled"""
+    global _default_sink
+    if not get_settings().event_sink.enabled:
+        return None
+    with _default_sink_lock:
+        if _default_sink is None:
+            _default_sink = EventSink()
+            atexit.register(_default_sink.shutdown)
+        return _default_sink
+
+
+def emit_event(step: str, data: Any, event_type: str = "info"):
+    sink = get_event_sink()
+    if sink is not None:
+        sink.emit(step, data, event_type)
+
+
+def shutdown_event_sink():
+    global _default_sink
+    with _default_sink_lock:
+        if _default_sink is not None:
+            _default_sink.shutdown()
+            _default_sink = None
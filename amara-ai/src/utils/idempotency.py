@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+import importlib
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+NEW = "new"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class IdempotencyStore(ABC):
+    """Interface for idempotency stores.
+
+    `claim` atomically records that a key is being processed and returns
+    (NEW, None) to the first caller; later callers get (IN_PROGRESS, None)
+    or (COMPLETED, result). The claimant then calls `complete` with the
+    result, or `release` so a retry can run again.
+    """
+
+    @abstractmethod
+    def claim(self, key: str) -> Tuple[str, Optional[Any]]:
+        ...
+
+    @abstractmethod
+    def complete(self, key: str, result: Any):
+        ...
+
+    @abstractmethod
+    def release(self, key: str):
+        ...
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """Idempotency store in SQLite, shared by workers on the same host"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        in_flight_timeout: Optional[float] = None,
+    ):
+        settings = get_settings().idempotency
+        self.db_path = db_path or settings.db_path
+        self.ttl_seconds = settings.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.max_entries if max_entries is None else max_entries
+        self.in_flight_timeout = (
+            settings.in_flight_timeout
+            if in_flight_timeout is None
+            else in_flight_timeout
+        )
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS idempotency (
+                key TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                result TEXT,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idempotency_updated ON idempotency (updated_at)"
+        )
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def claim(self, key: str) -> Tuple[str, Optional[Any]]:
+        now = time.time()
+        with self._lock:
+            while True:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO idempotency "
+                    "(key, status, result, updated_at) VALUES (?, ?, NULL, ?)",
+                    (key, IN_PROGRESS, now),
+                )
+                if cursor.rowcount == 1:
+                    return NEW, None
+                row = self._conn.execute(
+                    "SELECT status, result, updated_at FROM idempotency WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                # None: released or purged by another worker between the insert
+                # and the select, so try to insert it again
+                if row is not None:
+                    break
+            status, result, updated_at = row
+            if status == COMPLETED:
+                if now - updated_at <= self.ttl_seconds:
+                    return COMPLETED, json.loads(result)
+            elif now - updated_at <= self.in_flight_timeout:
+                return IN_PROGRESS, None
+            # Expired result or abandoned claim: take the key over
+            cursor = self._conn.execute(
+                "UPDATE idempotency SET status = ?, result = NULL, updated_at = ? "
+                "WHERE key = ? AND updated_at = ?",
+                (IN_PROGRESS, now, key, updated_at),
+            )
+            return (NEW, None) if cursor.rowcount == 1 else (IN_PROGRESS, None)
+
+    def complete(self, key: str, result: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency SET status = ?, result = ?, updated_at = ? "
+                "WHERE key = ?",
+                (COMPLETED, json.dumps(result, default=str), now, key),
+            )
+            if now - self._last_purge > 60:
+                self._purge(now)
+
+    def release(self, key: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM idempotency WHERE key = ? AND status = ?",
+                (key, IN_PROGRESS),
+            )
+
+    def _purge(self, now: float):
+        """Drop expired results, then the oldest ones beyond max_entries"""
+        self._last_purge = now
+        self._conn.execute(
+            "DELETE FROM idempotency WHERE status = ? AND updated_at < ?",
+            (COMPLETED, now - self.ttl_seconds),
+        )
+        self._conn.execute(
+            "DELETE FROM idempotency WHERE key IN ("
+            "SELECT key FROM idempotency WHERE status = ? "
+            "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (COMPLETED, self.max_entries),
+        )
+
+
+async def run_once(
+    store: IdempotencyStore,
+    key: Optional[str],
+    run: Callable[[], Awaitable[Any]],
+    wait_timeout: Optional[float] = None,
+) -> Tuple[Any, bool]:
+    """Run `run()` at most once per key; returns (result, replayed).
+
+    Duplicates of an in-flight key poll the store until the original
+    completes. If the original fails its claim is released and a waiting
+    duplicate runs instead. Raises TimeoutError after `wait_timeout`
+    (IDEMPOTENCY_IN_FLIGHT_TIMEOUT by default).
+    Store calls block (SQLite), so they run in the threadpool.
+    """
+    if not key:
+        return await run(), False
+    if wait_timeout is None:
+        wait_timeout = get_settings().idempotency.in_flight_timeout
+    deadline = time.monotonic() + wait_timeout
+    delay = 0.05
+    state, result = await run_in_threadpool(store.claim, key)
+    while state == IN_PROGRESS:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Timed out waiting for in-flight request {key}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+        state, result = await run_in_threadpool(store.claim, key)
+    if state == COMPLETED:
+        logger.info(f"Replaying stored result for {key}")
+        return result, True
+    try:
+        result = await run()
+    except BaseException:
+        await run_in_threadpool(store.release, key)
+        raise
+    await run_in_threadpool(store.complete, key, result)
+    return result, False
+
+
+_default_store: Optional[IdempotencyStore] = None
+_default_store_lock = threading.Lock()
+
+
+def _create_store() -> IdempotencyStore:
+    """Build the store named by IDEMPOTENCY_STORE ("sqlite" or "module:Class")"""
+    spec = get_settings().idempotency.store
+    if spec == "sqlite":
+        return SQLiteIdempotencyStore()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Return the process-wide idempotency store"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = _create_store()
+        return _default_store
+
+
+def set_idempotency_store(store: IdempotencyStore):
+    """Replace the process-wide store (e.g. with a Redis-backed one)"""
+    global _default_store
+    with _default_store_lock:
+        _default_store = store
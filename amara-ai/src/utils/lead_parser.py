@@ -0,0 +1,218 @@
+import re
+import threading
+from dataclasses import dataclass, field, asdict
+from email.utils import parseaddr
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.settings import get_settings
+from src.utils.email_preprocessor import clean_email_body
+from src.utils.web_ref_extractor import WEB_REF_MATCHER
+
+# Notification domains of the portals in WEB_REF_PATTERNS; subdomains match
+# too. The PORTAL_SENDER_DOMAINS setting adds to and overrides them.
+PORTAL_SENDER_DOMAINS: Dict[str, str] = {
+    "privateproperty.co.za": "site_1",
+    "property24.com": "site_2",
+    "property24.co.za": "site_2",
+}
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d ()-]{7,}\d")
+
+# Label text (lower case) -> lead field, shared by every portal layout
+COMMON_LABELS = {
+    "name": "name",
+    "full name": "name",
+    "contact name": "name",
+    "phone": "phone",
+    "phone number": "phone",
+    "contact number": "phone",
+    "cell": "phone",
+    "cell number": "phone",
+    "mobile": "phone",
+    "tel": "phone",
+    "email": "email",
+    "e-mail": "email",
+    "email address": "email",
+    "message": "message",
+    "comments": "message",
+    "enquiry": "message",
+    "listing number": "web_ref",
+    "listing ref": "web_ref",
+    "listing reference": "web_ref",
+    "reference": "web_ref",
+    "web ref": "web_ref",
+    "web reference": "web_ref",
+    "property reference": "web_ref",
+    "enquiry type": "request_type",
+    "request type": "request_type",
+}
+# Portal request types -> workflow inquiry types
+REQUEST_TYPES = (
+    ("view", "viewing_request"),
+    ("avail", "availability_check"),
+    ("info", "general_info"),
+)
+
+
+@dataclass
+class PortalLead:
+    """Structured portal lead: who is asking and about which listing"""
+
+    portal: str
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    message: Optional[str] = None
+    web_ref: Optional[str] = None
+    inquiry_type: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def template_variables(self) -> Dict[str, str]:
+        """Lead fields as template variables ({lead_name}, {web_ref}, ...)"""
+        return {
+            "lead_name": self.name or "",
+            "lead_first_name": (self.name or "").split(" ")[0],
+            "lead_phone": self.phone or "",
+            "lead_email": self.email or "",
+            "lead_message": self.message or "",
+            "web_ref": self.web_ref or "",
+        }
+
+    def sender(self) -> str:
+        """RFC 5322 style sender for the lead (not the portal's no-reply)"""
+        if self.name and self.email:
+            return f"{self.name} <{self.email}>"
+        return self.email or self.name or ""
+
+
+@dataclass
+class LeadParser:
+    """Label-based parser for one portal's lead notification layout.
+
+    All labels are compiled into one line-anchored alternation, so a lead
+    is parsed in a single scan of the body.
+    """
+
+    portal: str
+    labels: Dict[str, str] = field(default_factory=lambda: dict(COMMON_LABELS))
+
+    def __post_init__(self):
+        alternation = "|".join(
+            re.escape(label) for label in sorted(self.labels, key=len, reverse=True)
+        )
+        self._regex = re.compile(
+            rf"^[ \t*]*(?P<label>{alternation})[ \t*]*[:\-][ \t]*(?P<value>[^\n]*)",
+            re.IGNORECASE | re.MULTILINE,
+        )
+
+    def parse(self, body: str) -> Optional[PortalLead]:
+        text = (body or "").replace("\r\n", "\n")
+        matches = list(self._regex.finditer(text))
+        values: Dict[str, str] = {}
+        for i, match in enumerate(matches):
+            name = self.labels[match.group("label").lower()]
+            if name in values:
+                continue
+            if name == "message":
+                # Messages run until the next label (or the end of the email)
+                end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+                value = clean_email_body(text[match.start("value") : end])
+            else:
+                value = match.group("value").strip()
+            if value:
+                values[name] = value
+        # A lead says who is asking and about what; contact details alone
+        # are just someone's signature
+        has_sender = any(k in values for k in ("name", "email", "phone"))
+        if not has_sender or not ("message" in values or "web_ref" in values):
+            return None
+
+        lead = PortalLead(portal=self.portal, name=values.get("name"))
+        if "email" in values:
+            email = EMAIL_PATTERN.search(values["email"])
+            lead.email = email.group() if email else None
+        if "phone" in values:
+            phone = PHONE_PATTERN.search(values["phone"])
+            lead.phone = re.sub(r"[^\d+]", "", phone.group()) if phone else None
+        lead.message = values.get("message")
+        if "web_ref" in values:
+            candidates = WEB_REF_MATCHER.scan("", values["web_ref"])
+            lead.web_ref = candidates[0]["web_ref"] if candidates else None
+        request_type = values.get("request_type", "").lower()
+        for keyword, inquiry_type in REQUEST_TYPES:
+            if keyword in request_type:
+                lead.inquiry_type = inquiry_type
+                break
+        return lead
+
+
+class LeadParserRegistry:
+    """Portal name -> lead parser, with a generic fallback layout"""
+
+    def __init__(self, parsers: Iterable[LeadParser] = ()):
+        self._lock = threading.Lock()
+        self._parsers = {p.portal: p for p in parsers}
+        self._generic = LeadParser("generic")
+
+    def register(self, parser: LeadParser):
+        with self._lock:
+            self._parsers = {**self._parsers, parser.portal: parser}
+
+    def parse(self, body: str, portals: List[str]) -> Optional[PortalLead]:
+        """Parse with the first listed portal that has a parser, else generic.
+
+        Without a portal the email is an ordinary one: "Name:" or "Cell:"
+        lines in a signature do not make it a lead.
+        """
+        if not portals:
+            return None
+        parsers = self._parsers
+        for portal in portals:
+            if portal in parsers:
+                return parsers[portal].parse(body)
+        return self._generic.parse(body)
+
+
+# Both portals in WEB_REF_PATTERNS send "Label: value" notifications; the
+# listing reference label differs
+LEAD_PARSERS = LeadParserRegistry(
+    [
+        LeadParser("site_1", {**COMMON_LABELS, "listing no": "web_ref"}),
+        LeadParser("site_2", {**COMMON_LABELS, "listing id": "web_ref"}),
+    ]
+)
+
+
+def portal_for_sender(sender: Optional[str]) -> Optional[str]:
+    """Portal whose notification address (or a subdomain of it) sent an email"""
+    portals = {**PORTAL_SENDER_DOMAINS, **get_settings().email.portal_sender_domains}
+    domain = parseaddr(sender or "")[1].rpartition("@")[2].lower()
+    while domain:
+        if domain in portals:
+            return portals[domain] or None
+        domain = domain.partition(".")[2]
+    return None
+
+
+def parse_portal_lead(
+    body: str,
+    extraction: Optional[Dict[str, Any]] = None,
+    sender: Optional[str] = None,
+) -> Optional[PortalLead]:
+    """Parse a portal lead notification.
+
+    Only emails from a portal's sender domain are parsed: an applicant who
+    quotes a listing reference and signs off with "Name:" or "Cell:" lines
+    is not a lead notification. The extracted web_ref fills in a lead
+    without a listing line.
+    """
+    portal = portal_for_sender(sender)
+    if not portal:
+        return None
+    lead = LEAD_PARSERS.parse(body, [portal])
+    if lead and not lead.web_ref and extraction and extraction.get("web_ref"):
+        lead.web_ref = extraction["web_ref"]
+    return lead
@@ -0,0 +1,464 @@
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+import contextvars
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.settings import get_settings
+from src.utils import metrics, startup
+
+logger = logging.getLogger(__name__)
+
+# Azure OpenAI list prices, USD per million tokens; LLM_PRICES adds to and
+# overrides them
+PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-4o-mini": {"prompt": 0.15, "cached_prompt": 0.075, "completion": 0.60},
+    "gpt-4o": {"prompt": 2.50, "cached_prompt": 1.25, "completion": 10.00},
+    "gpt-4.1-nano": {"prompt": 0.10, "cached_prompt": 0.025, "completion": 0.40},
+    "gpt-4.1-mini": {"prompt": 0.40, "cached_prompt": 0.10, "completion": 1.60},
+    "gpt-4.1": {"prompt": 2.00, "cached_prompt": 0.50, "completion": 8.00},
+    "gpt-35-turbo": {"prompt": 0.50, "cached_prompt": 0.50, "completion": 1.50},
+}
+
+DIMENSIONS = ("day", "agent_id", "workflow_id", "endpoint", "model")
+
+# Who LLM calls made in this context are billed to. The email routes set it
+# before the workflow runs; Starlette copies it into the worker thread.
+DEFAULT_ATTRIBUTION = {"agent_id": "none", "workflow_id": "none", "priority": "normal"}
+_attribution: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar(
+    "llm_attribution", default=DEFAULT_ATTRIBUTION
+)
+
+
+def set_attribution(**attribution: Optional[str]) -> contextvars.Token:
+    current = _attribution.get()
+    return _attribution.set(
+        {**current, **{k: v for k, v in attribution.items() if v is not None}}
+    )
+
+
+def reset_attribution(token: contextvars.Token):
+    _attribution.reset(token)
+
+
+def current_attribution() -> Dict[str, str]:
+    return _attribution.get()
+
+
+def price_for(model: str) -> Optional[Dict[str, float]]:
+    """Prices for a litellm model ("azure/<deployment>") or deployment name"""
+    name = model.split("/", 1)[-1]
+    prices = {**PRICES, **get_settings().usage.prices}
+    if name in prices:
+        return prices[name]
+    # Versioned deployments: gpt-4o-mini-2024-07-18 is priced as gpt-4o-mini
+    matches = [key for key in prices if name.startswith(key)]
+    return prices[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: str, prompt: int, completion: int, cached: int) -> float:
+    prices = price_for(model)
+    if prices is None:
+        return 0.0
+    cached_price = prices.get("cached_prompt", prices["prompt"])
+    return (
+        (prompt - cached) * prices["prompt"]
+        + cached * cached_price
+        + completion * prices["completion"]
+    ) / 1_000_000
+
+
+def _today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+class UsageLedger:
+    """Token and cost totals per day, agent, workflow, endpoint and model.
+
+    Calls are added to in-memory totals and a background thread upserts them
+    into SQLite every LLM_USAGE_FLUSH_SECONDS, so recording a call never
+    touches the database. Budget checks read a per-agent running total for
+    the day, re-read from SQLite on every flush (or when a check finds it
+    older than LLM_USAGE_FLUSH_SECONDS), so workers sharing the database see
+    each other's spend within about two flush intervals.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        flush_seconds: Optional[float] = None,
+        budgets: Optional[Dict[str, float]] = None,
+    ):
+        settings = get_settings().usage
+        self.db_path = db_path or settings.db_path
+        self.flush_seconds = (
+            settings.flush_seconds if flush_seconds is None else flush_seconds
+        )
+        self.budgets = settings.budgets if budgets is None else budgets
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_usage (
+                day TEXT NOT NULL,
+                agent_id TEXT NOT NULL,
+                workflow_id TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                model TEXT NOT NULL,
+                calls INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                cached_prompt_tokens INTEGER NOT NULL,
+                cost_usd REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (day, agent_id, workflow_id, endpoint, model)
+            )"""
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._pending: Dict[Tuple[str, ...], List[float]] = {}
+        self._spent: Dict[Tuple[str, str], float] = {}
+        self._spent_refreshed_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached_prompt_tokens: int = 0,
+        attribution: Optional[Dict[str, str]] = None,
+        endpoint: Optional[str] = None,
+    ) -> float:
+        """Add one LLM call and return its estimated cost in USD"""
+        attribution = attribution or _attribution.get()
+        endpoint = endpoint or metrics.current_labels()["endpoint"]
+        cost = estimate_cost(
+            model, prompt_tokens, completion_tokens, cached_prompt_tokens
+        )
+        day = _today()
+        agent_id = attribution["agent_id"]
+        key = (day, agent_id, attribution["workflow_id"], endpoint, model)
+        with self._lock:
+            totals = self._pending.setdefault(key, [0, 0, 0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += prompt_tokens
+            totals[2] += completion_tokens
+            totals[3] += cached_prompt_tokens
+            totals[4] += cost
+            spent_key = (day, agent_id)
+            if spent_key in self._spent:
+                self._spent[spent_key] += cost
+        self._ensure_started()
+        return cost
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="llm-usage-flush", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Could not flush LLM usage: {e}")
+
+    def flush(self):
+        """Write the in-memory totals to SQLite and re-read the day's spend"""
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if pending:
+                self._write(pending)
+            self._refresh_spent()
+
+    def _write(self, pending: Dict[Tuple[str, ...], List[float]]):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT INTO llm_usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (day, agent_id, workflow_id, endpoint, model) DO UPDATE "
+            "SET calls = calls + excluded.calls, "
+            "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+            "completion_tokens = completion_tokens + excluded.completion_tokens, "
+            "cached_prompt_tokens = "
+            "cached_prompt_tokens + excluded.cached_prompt_tokens, "
+            "cost_usd = cost_usd + excluded.cost_usd, "
+            "updated_at = excluded.updated_at",
+            [(*key, *totals, now) for key, totals in pending.items()],
+        )
+        self._conn.commit()
+
+    def _pending_cost(self, day: str, agent_id: str) -> float:
+        return sum(
+            totals[4]
+            for key, totals in self._pending.items()
+            if key[0] == day and key[1] == agent_id
+        )
+
+    def _refresh_spent(self):
+        """Replace the running totals with the day's spend across all workers
+        (plus calls recorded since the last write). Call with _db_lock held."""
+        day = _today()
+        rows = self._conn.execute(
+            "SELECT agent_id, SUM(cost_usd) FROM llm_usage WHERE day = ? "
+            "GROUP BY agent_id",
+            (day,),
+        ).fetchall()
+        stored = dict(rows)
+        with self._lock:
+            for spent_key in list(self._spent):
+                if spent_key[0] != day:
+                    del self._spent[spent_key]
+                else:
+                    spent = stored.get(spent_key[1], 0.0)
+                    self._spent[spent_key] = spent + self._pending_cost(*spent_key)
+            self._spent_refreshed_at = time.monotonic()
+
+    def spent_today(self, agent_id: str) -> float:
+        day = _today()
+        spent_key = (day, agent_id)
+        with self._lock:
+            fresh = (
+                time.monotonic() - self._spent_refreshed_at < self.flush_seconds
+            )
+            if fresh and spent_key in self._spent:
+                return self._spent[spent_key]
+        # Flush first so the seed covers everything this process recorded;
+        # flushing also refreshes the totals already tracked
+        self.flush()
+        with self._lock:
+            if spent_key in self._spent:
+                return self._spent[spent_key]
+        with self._db_lock:
+            (spent,) = self._conn.execute(
+                "SELECT COALESCE(SUM(cost_usd), 0) FROM llm_usage "
+                "WHERE day = ? AND agent_id = ?",
+                (day, agent_id),
+            ).fetchone()
+        with self._lock:
+            spent += self._pending_cost(day, agent_id)
+            return self._spent.setdefault(spent_key, spent)
+
+    def budget_for(self, agent_id: str) -> Optional[float]:
+        return self.budgets.get(agent_id, self.budgets.get("*"))
+
+    def budget_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        budget = self.budget_for(agent_id)
+        if budget is None:
+            return None
+        spent = self.spent_today(agent_id)
+        return {
+            "daily_budget_usd": budget,
+            "spent_today_usd": round(spent, 6),
+            "exceeded": spent >= budget,
+        }
+
+    def over_budget(self, agent_id: str) -> bool:
+        budget = self.budget_for(agent_id)
+        return budget is not None and self.spent_today(agent_id) >= budget
+
+    def query(
+        self,
+        group_by: Tuple[str, ...] = ("agent_id",),
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        **filters: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        """Totals grouped by `group_by` (DIMENSIONS), days since/until inclusive"""
+        invalid = [d for d in (*group_by, *filters) if d not in DIMENSIONS]
+        if invalid:
+            raise ValueError(f"Unknown usage dimensions: {', '.join(invalid)}")
+        where, params = [], []
+        for column, value in filters.items():
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            where.append("day >= ?")
+            params.append(since)
+        if until:
+            where.append("day <= ?")
+            params.append(until)
+        columns = ", ".join(group_by)
+        sql = (
+            f"SELECT {columns + ', ' if columns else ''}SUM(calls), "
+            "SUM(prompt_tokens), SUM(completion_tokens), "
+            "SUM(cached_prompt_tokens), SUM(cost_usd) FROM llm_usage"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + (f" GROUP BY {columns} ORDER BY SUM(cost_usd) DESC" if columns else "")
+        )
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        totals = ("calls", "prompt_tokens", "completion_tokens", "cached_prompt_tokens")
+        result = []
+        for row in rows:
+            if row[len(group_by)] is None:
+                continue
+            entry = dict(zip(group_by, row))
+            entry.update(zip(totals, row[len(group_by) : -1]))
+            entry["cost_usd"] = round(row[-1], 6)
+            result.append(entry)
+        return result
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        self.flush()
+
+
+_default_ledger: Optional[UsageLedger] = None
+_default_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> Optional[UsageLedger]:
+    """Return the process-wide usage ledger, or None when disabled"""
+    global _default_ledger
+    if not get_settings().usage.enabled:
+        return None
+    with _default_ledger_lock:
+        if _default_ledger is None:
+            _default_ledger = UsageLedger()
+            atexit.register(_default_ledger.flush)
+        return _default_ledger
+
+
+def should_degrade() -> bool:
+    """True when low priority work should avoid the LLM: its agent is over
+    the daily budget"""
+    attribution = _attribution.get()
+    if attribution["priority"] != "low" or not get_settings().usage.budgets:
+        return False
+    ledger = get_usage_ledger()
+    return ledger is not None and ledger.over_budget(attribution["agent_id"])
+
+
+def flush_usage():
+    if _default_ledger is not None:
+        _default_ledger.flush()
+
+
+_installed = False
+_install_lock = threading.Lock()
+# Task and token counts before the LLM call in progress on this thread
+_local = threading.local()
+
+
+def _token_summary(agent):
+    process = getattr(agent, "_token_process", None)
+    return process.get_summary() if process is not None else None
+
+
+def install_hooks():
+    """Record every crew LLM call in the usage ledger"""
+    global _installed
+    with _install_lock:
+        if _installed or not get_settings().usage.enabled:
+            return
+        _installed = True
+
+    # crewai is imported on first use or during warm-up, not at startup
+    startup.on_crewai_loaded(_install_crewai_hooks)
+
+
+def _install_crewai_hooks():
+    from crewai.utilities.events import (
+        LLMCallCompletedEvent,
+        LLMCallStartedEvent,
+        TaskCompletedEvent,
+        TaskFailedEvent,
+        TaskStartedEvent,
+        crewai_event_bus,
+    )
+
+    # crewai counts tokens per agent; a call's usage is the difference
+    # between the agent's totals before and after it
+    @crewai_event_bus.on(TaskStartedEvent)
+    def on_task_started(source, event):
+        _local.agent = getattr(event.task or source, "agent", None)
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def on_task_completed(source, event):
+        _local.agent = None
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def on_task_failed(source, event):
+        _local.agent = None
+
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def on_llm_call_started(source, event):
+        _local.before = _token_summary(getattr(_local, "agent", None))
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_llm_call_completed(source, event):
+        before = getattr(_local, "before", None)
+        after = _token_summary(getattr(_local, "agent", None))
+        _local.before = None
+        ledger = get_usage_ledger()
+        if ledger is None or before is None or after is None:
+            return
+        model = getattr(source, "model", None) or "unknown"
+        prompt = after.prompt_tokens - before.prompt_tokens
+        completion = after.completion_tokens - before.completion_tokens
+        cached = after.cached_prompt_tokens - before.cached_prompt_tokens
+        cost = ledger.record(model, prompt, completion, cached)
+        metrics.record_llm_cost(model, cost)
+
+
+def register_routes(app):
+    """Admin endpoint for usage totals (X-Admin-Token required)"""
+    from fastapi import APIRouter, Depends, HTTPException
+
+    from src.utils.admin import require_admin
+
+    router = APIRouter(
+        prefix="/admin/usage",
+        dependencies=[Depends(require_admin)],
+        include_in_schema=False,
+    )
+
+    @router.get("")
+    def usage(
+        group_by: str = "agent_id",
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        model: Optional[str] = None,
+    ):
+        ledger = get_usage_ledger()
+        if ledger is None:
+            raise HTTPException(status_code=404, detail="LLM usage is disabled")
+        dimensions = tuple(d.strip() for d in group_by.split(",") if d.strip())
+        try:
+            rows = ledger.query(
+                dimensions,
+                since=since,
+                until=until,
+                agent_id=agent_id,
+                workflow_id=workflow_id,
+                endpoint=endpoint,
+                model=model,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        result: Dict[str, Any] = {"group_by": dimensions, "rows": rows}
+        if agent_id:
+            result["budget"] = ledger.budget_status(agent_id)
+        return result
+
+    app.include_router(router)
@@ -0,0 +1,235 @@
+import sys
+import time
+import logging
+import resource
+import threading
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Allocations of the tracing machinery itself are left out of snapshots
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+
+class Window:
+    """Peak traced memory between open_window() and close_window()"""
+
+    __slots__ = ("start", "peak")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.peak = start
+
+
+# tracemalloc keeps a single process-wide peak. Every time a window opens or
+# closes, that peak is folded into all open windows and then reset, so each
+# window ends up with the exact peak over its own lifetime. Windows overlap
+# under concurrency: a request's peak includes what concurrent requests
+# allocated at the time, which is what a worker memory limit has to cover.
+_windows: List[Window] = []
+_windows_lock = threading.Lock()
+
+
+def _fold_peak() -> int:
+    current, peak = tracemalloc.get_traced_memory()
+    for window in _windows:
+        if peak > window.peak:
+            window.peak = peak
+    tracemalloc.reset_peak()
+    return current
+
+
+def open_window() -> Optional[Window]:
+    if not tracemalloc.is_tracing():
+        return None
+    with _windows_lock:
+        if not tracemalloc.is_tracing():
+            return None
+        window = Window(_fold_peak())
+        _windows.append(window)
+    return window
+
+
+def close_window(window: Optional[Window]) -> Optional[int]:
+    """Bytes traced above the window's starting point at its peak"""
+    if window is None:
+        return None
+    with _windows_lock:
+        if tracemalloc.is_tracing():
+            _fold_peak()
+        try:
+            _windows.remove(window)
+        except ValueError:
+            pass
+    return max(window.peak - window.start, 0)
+
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def start_tracing(frames: int = 1):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        logger.info(f"tracemalloc started ({frames} frames)")
+
+
+def stop_tracing():
+    """Stop tracemalloc; open windows and stored snapshots are discarded"""
+    with _windows_lock:
+        _windows.clear()
+        tracemalloc.stop()
+    _snapshots.clear()
+    logger.info("tracemalloc stopped")
+
+
+_snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_snapshots_lock = threading.Lock()
+_next_snapshot_id = 1
+
+
+def _top(stats, limit: int) -> List[Dict[str, Any]]:
+    result = []
+    for stat in stats[:limit]:
+        entry = {
+            "size": stat.size,
+            "count": stat.count,
+            "traceback": [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+        }
+        if hasattr(stat, "size_diff"):
+            entry["size_diff"] = stat.size_diff
+            entry["count_diff"] = stat.count_diff
+        result.append(entry)
+    return result
+
+
+def take_snapshot(key_type: str = "lineno", limit: int = 25) -> Dict[str, Any]:
+    """Store a tracemalloc snapshot and summarize its largest allocations"""
+    global _next_snapshot_id
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    current, _ = tracemalloc.get_traced_memory()
+    with _snapshots_lock:
+        snapshot_id = _next_snapshot_id
+        _next_snapshot_id += 1
+        _snapshots[snapshot_id] = {
+            "snapshot": snapshot,
+            "taken_at": time.time(),
+            "traced_bytes": current,
+        }
+        while len(_snapshots) > get_settings().memory.max_snapshots:
+            _snapshots.popitem(last=False)
+    return {
+        "id": snapshot_id,
+        "traced_bytes": current,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "traceback_limit": snapshot.traceback_limit,
+        "top": _top(snapshot.statistics(key_type), limit),
+    }
+
+
+def list_snapshots() -> List[Dict[str, Any]]:
+    with _snapshots_lock:
+        return [
+            {"id": i, "taken_at": s["taken_at"], "traced_bytes": s["traced_bytes"]}
+            for i, s in _snapshots.items()
+        ]
+
+
+def diff_snapshots(
+    base_id: int, snapshot_id: int, key_type: str = "lineno", limit: int = 25
+) -> Optional[Dict[str, Any]]:
+    """Largest allocation changes from `base_id` to `snapshot_id`"""
+    with _snapshots_lock:
+        base = _snapshots.get(base_id)
+        target = _snapshots.get(snapshot_id)
+    if base is None or target is None:
+        return None
+    stats = target["snapshot"].compare_to(base["snapshot"], key_type)
+    return {
+        "base": base_id,
+        "snapshot": snapshot_id,
+        "traced_bytes_diff": target["traced_bytes"] - base["traced_bytes"],
+        "top": _top(stats, limit),
+    }
+
+
+def register_routes(app):
+    """Admin endpoints for tracemalloc (X-Admin-Token required); starts
+    tracemalloc now when MEMORY_TRACEMALLOC_FRAMES is set"""
+    from fastapi import APIRouter, Depends, HTTPException
+
+    from src.utils.admin import require_admin
+
+    router = APIRouter(
+        prefix="/admin/memory",
+        dependencies=[Depends(require_admin)],
+        include_in_schema=False,
+    )
+
+    def check_key_type(key_type: str):
+        if key_type not in KEY_TYPES:
+            raise HTTPException(
+                status_code=400, detail=f"key_type must be one of {KEY_TYPES}"
+            )
+
+    @router.get("")
+    def memory_status():
+        current, _ = (
+            tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        )
+        return {
+            "tracemalloc": tracemalloc.is_tracing(),
+            "traceback_limit": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "snapshots": list_snapshots(),
+        }
+
+    @router.post("/tracemalloc/start")
+    def memory_start(frames: int = 1):
+        start_tracing(frames)
+        return {
+            "tracemalloc": True,
+            "traceback_limit": tracemalloc.get_traceback_limit(),
+        }
+
+    @router.post("/tracemalloc/stop")
+    def memory_stop():
+        stop_tracing()
+        return {"tracemalloc": False}
+
+    @router.post("/snapshots")
+    def memory_snapshot(key_type: str = "lineno", limit: int = 25):
+        check_key_type(key_type)
+        if not tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="tracemalloc is not running")
+        return take_snapshot(key_type, limit)
+
+    @router.get("/snapshots/{snapshot_id}/diff")
+    def memory_diff(
+        snapshot_id: int, base: int, key_type: str = "lineno", limit: int = 25
+    ):
+        check_key_type(key_type)
+        result = diff_snapshots(base, snapshot_id, key_type, limit)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Snapshot not found")
+        return result
+
+    app.include_router(router)
+
+    frames = get_settings().memory.tracemalloc_frames
+    if frames > 0:
+        start_tracing(frames)
@@ -0,0 +1,430 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from src.utils import memory, profiling, startup, tracing
+
+logger = logging.getLogger(__name__)
+
+# Set (before the workers start) when running several uvicorn/gunicorn
+# workers so /metrics aggregates every worker's samples
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Seconds; LLM bound stages take tens of seconds, parsing takes milliseconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+# Bytes, 64KB to 2GB
+MEMORY_BUCKETS = tuple(2**n for n in range(16, 32))
+
+REQUEST_DURATION = Histogram(
+    "amara_request_duration_seconds",
+    "HTTP request latency",
+    ["endpoint", "method", "status"],
+    buckets=BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "amara_requests_in_flight",
+    "Requests currently being handled",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+STAGE_DURATION = Histogram(
+    "amara_stage_duration_seconds",
+    "Duration of a processing stage (prepare_data, kickoff, ...)",
+    ["stage", "endpoint", "inquiry_type"],
+    buckets=BUCKETS,
+)
+TASK_DURATION = Histogram(
+    "amara_crew_task_duration_seconds",
+    "Duration of a single crew task",
+    ["task", "status", "endpoint", "inquiry_type"],
+    buckets=BUCKETS,
+)
+LLM_CALLS = Counter(
+    "amara_llm_calls_total",
+    "LLM calls made by the crews",
+    ["status", "endpoint", "inquiry_type"],
+)
+LLM_TOKENS = Counter(
+    "amara_llm_tokens_total",
+    "LLM tokens used by the crews",
+    ["kind", "endpoint", "inquiry_type"],
+)
+LLM_RETRIES = Counter(
+    "amara_llm_retries_total",
+    "LLM requests retried by the OpenAI client",
+    ["endpoint", "inquiry_type"],
+)
+LLM_RATE_LIMITED = Counter(
+    "amara_llm_rate_limited_total",
+    "LLM requests answered with HTTP 429",
+    ["endpoint", "inquiry_type"],
+)
+LLM_COST = Counter(
+    "amara_llm_cost_usd_total",
+    "Estimated LLM spend in USD (see src/utils/llm_usage.py)",
+    ["endpoint", "model"],
+)
+CACHE_LOOKUPS = Counter(
+    "amara_cache_lookups_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result", "endpoint"],
+)
+OBSERVABILITY_EVENTS = Counter(
+    "amara_observability_events_total",
+    "Structured events by outcome (queued, dropped, sampled_out, exported)",
+    ["result"],
+)
+STAGE_MEMORY_PEAK = Histogram(
+    "amara_stage_memory_peak_bytes",
+    "Peak traced memory above the stage's start (only while tracemalloc runs)",
+    ["stage", "endpoint"],
+    buckets=MEMORY_BUCKETS,
+)
+REQUEST_MEMORY_PEAK = Histogram(
+    "amara_request_memory_peak_bytes",
+    "Peak traced memory above the request's start (only while tracemalloc runs)",
+    ["endpoint"],
+    buckets=MEMORY_BUCKETS,
+)
+PEAK_RSS = Gauge(
+    "amara_process_peak_resident_memory_bytes",
+    "Highest resident set size of the worker so far",
+    multiprocess_mode="liveall",
+)
+TRACED_MEMORY = Gauge(
+    "amara_tracemalloc_traced_bytes",
+    "Memory currently traced by tracemalloc (0 when it is off)",
+    multiprocess_mode="liveall",
+)
+QUEUE_DEPTH = Gauge(
+    "amara_executor_queue_depth",
+    "Work waiting for an executor, worker thread or crew slot",
+    ["executor"],
+    multiprocess_mode="livesum",
+)
+STARTUP_DURATION = Gauge(
+    "amara_startup_seconds",
+    "Time spent importing the app and warming up crewai, crews and clients",
+    ["phase"],
+    multiprocess_mode="liveall",
+)
+
+# Labels for metrics recorded below the HTTP layer. The middleware sets the
+# endpoint and the email workflow adds the inquiry type; Starlette copies the
+# context into threadpool workers, so crew code sees the request's labels.
+DEFAULT_LABELS = {"endpoint": "none", "inquiry_type": "none"}
+_labels: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar(
+    "metric_labels", default=DEFAULT_LABELS
+)
+
+
+def set_labels(**labels: Optional[str]) -> contextvars.Token:
+    """Add labels for metrics recorded later in this context"""
+    current = _labels.get()
+    return _labels.set({**current, **{k: v or "none" for k, v in labels.items()}})
+
+
+def reset_labels(token: contextvars.Token):
+    _labels.reset(token)
+
+
+def current_labels() -> Dict[str, str]:
+    return _labels.get()
+
+
+def observe_stage(stage: str, seconds: float):
+    labels = _labels.get()
+    STAGE_DURATION.labels(stage, labels["endpoint"], labels["inquiry_type"]).observe(
+        seconds
+    )
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as a stage, in its own tracing span.
+
+    The thread running the stage is also sampled when the request is being
+    profiled, and its peak memory is recorded while tracemalloc runs.
+    """
+    labels = _labels.get()
+    attributes = {
+        "amara.endpoint": labels["endpoint"],
+        "amara.inquiry_type": labels["inquiry_type"],
+    }
+    window = memory.open_window()
+    start = time.perf_counter()
+    try:
+        with tracing.span(name, attributes) as span, profiling.thread_scope():
+            try:
+                yield
+            finally:
+                peak = memory.close_window(window)
+                if peak is not None:
+                    span.set_attribute("memory.peak_bytes", peak)
+                    STAGE_MEMORY_PEAK.labels(name, labels["endpoint"]).observe(peak)
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """Decorator form of stage()"""
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(
+        cache, "hit" if hit else "miss", _labels.get()["endpoint"]
+    ).inc()
+
+
+def record_crew_usage(crew):
+    """Count the prompt and completion tokens of a finished crew"""
+    usage = getattr(crew, "usage_metrics", None)
+    if usage is None:
+        return
+    labels = _labels.get()
+    endpoint, inquiry_type = labels["endpoint"], labels["inquiry_type"]
+    LLM_TOKENS.labels("prompt", endpoint, inquiry_type).inc(usage.prompt_tokens)
+    LLM_TOKENS.labels("completion", endpoint, inquiry_type).inc(
+        usage.completion_tokens
+    )
+    LLM_TOKENS.labels("cached_prompt", endpoint, inquiry_type).inc(
+        usage.cached_prompt_tokens
+    )
+
+
+def record_llm_cost(model: str, cost: float):
+    LLM_COST.labels(_labels.get()["endpoint"], model).inc(cost)
+
+
+@contextmanager
+def acquire(semaphore: threading.Semaphore, executor: str):
+    """Hold `semaphore`, counting this thread in the queue while it waits"""
+    gauge = QUEUE_DEPTH.labels(executor)
+    gauge.inc()
+    try:
+        semaphore.acquire()
+    finally:
+        gauge.dec()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def track_future(future, executor: str):
+    """Count a submitted future in the queue until it finishes"""
+    gauge = QUEUE_DEPTH.labels(executor)
+    gauge.inc()
+    future.add_done_callback(lambda _: gauge.dec())
+
+
+class _LLMClientLogHandler(logging.Handler):
+    """Counts retries and 429s from the OpenAI client and httpx log records.
+
+    litellm calls Azure through the OpenAI SDK, which retries 429s and 5xxs
+    internally; its INFO log lines are the only place those retries surface.
+    The client loggers are opened up to INFO for this handler, which passes
+    on only the records that were enabled before (`threshold`).
+    """
+
+    def __init__(self, threshold: int):
+        super().__init__()
+        self.threshold = threshold
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            labels = _labels.get()
+            endpoint, inquiry_type = labels["endpoint"], labels["inquiry_type"]
+            if record.name == "openai._base_client":
+                if record.getMessage().startswith("Retrying request"):
+                    LLM_RETRIES.labels(endpoint, inquiry_type).inc()
+                    tracing.record_llm_event("retry")
+            elif record.name == "httpx":
+                # "HTTP Request: %s %s "%s %d %s"" (method, url, version, status)
+                args = record.args
+                if isinstance(args, tuple) and len(args) >= 4 and args[3] == 429:
+                    LLM_RATE_LIMITED.labels(endpoint, inquiry_type).inc()
+                    tracing.record_llm_event("rate_limited")
+        except Exception:
+            self.handleError(record)
+        if record.levelno >= self.threshold:
+            logging.getLogger().handle(record)
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install_hooks():
+    """Subscribe to crewai task/LLM events and the LLM client loggers"""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        _installed = True
+
+    for name in ("openai._base_client", "httpx"):
+        client_logger = logging.getLogger(name)
+        handler = _LLMClientLogHandler(client_logger.getEffectiveLevel())
+        client_logger.addHandler(handler)
+        client_logger.propagate = False
+        if not client_logger.isEnabledFor(logging.INFO):
+            client_logger.setLevel(logging.INFO)
+
+    # crewai is imported on first use or during warm-up, not at startup
+    startup.on_crewai_loaded(_install_crewai_hooks)
+
+
+def _install_crewai_hooks():
+    from crewai.utilities.events import (
+        LLMCallCompletedEvent,
+        LLMCallFailedEvent,
+        LLMCallStartedEvent,
+        TaskCompletedEvent,
+        TaskFailedEvent,
+        TaskStartedEvent,
+        crewai_event_bus,
+    )
+
+    # Events for one task or call are emitted on the thread that runs it
+    task_starts: Dict[int, float] = {}
+    call_starts: Dict[int, float] = {}
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def on_task_started(source, event):
+        task_starts[id(event.task or source)] = time.perf_counter()
+
+    def finish_task(source, event, status: str):
+        task = event.task or source
+        start = task_starts.pop(id(task), None)
+        if start is None:
+            return
+        labels = _labels.get()
+        TASK_DURATION.labels(
+            getattr(task, "name", None) or "unnamed",
+            status,
+            labels["endpoint"],
+            labels["inquiry_type"],
+        ).observe(time.perf_counter() - start)
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def on_task_completed(source, event):
+        finish_task(source, event, "ok")
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def on_task_failed(source, event):
+        finish_task(source, event, "error")
+
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def on_llm_call_started(source, event):
+        call_starts[threading.get_ident()] = time.perf_counter()
+
+    def finish_call(status: str):
+        labels = _labels.get()
+        LLM_CALLS.labels(status, labels["endpoint"], labels["inquiry_type"]).inc()
+        start = call_starts.pop(threading.get_ident(), None)
+        if start is not None:
+            observe_stage("llm_call", time.perf_counter() - start)
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_llm_call_completed(source, event):
+        finish_call("ok")
+
+    @crewai_event_bus.on(LLMCallFailedEvent)
+    def on_llm_call_failed(source, event):
+        error = event.error or ""
+        rate_limited = "429" in error or "RateLimit" in error
+        finish_call("rate_limited" if rate_limited else "error")
+
+
+def route_template(app, scope) -> str:
+    """Path template of the route matching a request (bounded label values)"""
+    from starlette.routing import Match
+
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+def render_latest():
+    """Exposition payload and content type for the /metrics endpoint"""
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def instrument_app(app):
+    """Add request metrics middleware and the /metrics endpoint to `app`"""
+    from fastapi import Request
+    from fastapi.responses import Response
+
+    install_hooks()
+
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        endpoint = route_template(request.app, request.scope)
+        token = set_labels(endpoint=endpoint)
+        in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+        in_flight.inc()
+        status = 500
+        window = memory.open_window()
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            in_flight.dec()
+            REQUEST_DURATION.labels(endpoint, request.method, str(status)).observe(
+                time.perf_counter() - start
+            )
+            peak = memory.close_window(window)
+            if peak is not None:
+                REQUEST_MEMORY_PEAK.labels(endpoint).observe(peak)
+            reset_labels(token)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        import anyio.to_thread
+
+        # Requests waiting for a worker thread (run_in_threadpool, sync routes)
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        QUEUE_DEPTH.labels("threadpool").set(limiter.statistics().tasks_waiting)
+        PEAK_RSS.set(memory.peak_rss_bytes())
+        TRACED_MEMORY.set(
+            tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        )
+        payload, content_type = render_latest()
+        return Response(payload, media_type=content_type)
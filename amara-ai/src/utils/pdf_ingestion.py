@@ -0,0 +1,197 @@
+import io
+import os
+import time
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from src.settings import get_settings
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass
+class PageResult:
+    """Text and tables extracted from a single PDF page"""
+
+    page_number: int  # 1-based
+    text: str
+    tables: List[List[List[Optional[str]]]] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+    def timing(self) -> Dict[str, Any]:
+        return {
+            "page": self.page_number,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "chars": len(self.text),
+            "tables": len(self.tables),
+            "error": self.error,
+        }
+
+
+def max_workers() -> int:
+    return get_settings().pdf.workers or os.cpu_count() or 1
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Create the shared extraction pool on first use"""
+    global _executor
+    if _executor is None:
+        workers = max_workers()
+        logger.info(f"Starting PDF ingestion pool with {workers} workers")
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the shared extraction pool (used on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    """Return the number of pages without parsing page content."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def extract_pages(
+    pdf: Union[bytes, str], start: int, stop: int, extract_tables: bool = False
+) -> List[PageResult]:
+    """Extract text (pypdfium2) and optionally tables (pdfplumber) from pages
+    start..stop-1 of a PDF (bytes or file path), opening it once for them.
+
+    Runs inside a pool worker, so it must stay a module-level function and
+    only return picklable data.
+    """
+    import pypdfium2 as pdfium
+
+    plumber = None
+    plumber_error = None
+    if extract_tables:
+        try:
+            import pdfplumber
+
+            plumber = pdfplumber.open(
+                io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf
+            )
+        except Exception as e:
+            plumber_error = str(e)
+    document = pdfium.PdfDocument(pdf)
+    results = []
+    try:
+        for page_index in range(start, stop):
+            page_start = time.perf_counter()
+            text = ""
+            tables: List[List[List[Optional[str]]]] = []
+            error = plumber_error
+            try:
+                page = document[page_index]
+                textpage = page.get_textpage()
+                text = textpage.get_text_bounded()
+                textpage.close()
+                page.close()
+                if plumber is not None:
+                    tables = plumber.pages[page_index].extract_tables() or []
+            except Exception as e:
+                error = str(e)
+            results.append(
+                PageResult(
+                    page_number=page_index + 1,
+                    text=text.replace("\r\n", "\n"),
+                    tables=tables,
+                    elapsed_ms=(time.perf_counter() - page_start) * 1000,
+                    error=error,
+                )
+            )
+    finally:
+        document.close()
+        if plumber is not None:
+            plumber.close()
+    return results
+
+
+def iter_pdf_pages(
+    pdf_bytes: bytes, extract_tables: bool = False, parallel: Optional[bool] = None
+) -> Iterator[PageResult]:
+    """Yield extracted pages in page order as soon as each one is ready.
+
+    The PDF is written to a temporary file that pool workers open by path,
+    so it is never pickled, and pages go out in tasks of pdf.pages_per_task.
+    Tasks are collected as they complete and every page is yielded as soon
+    as all pages before it are in, so total latency is bounded by the
+    slowest task rather than the sum of all pages and consumers can parse
+    the statement incrementally. Tables are only extracted on request: the
+    statement and payslip parsers work on the text alone.
+    """
+    settings = get_settings().pdf
+    num_pages = count_pages(pdf_bytes)
+    if parallel is None:
+        parallel = num_pages > settings.inline_pages and max_workers() > 1
+
+    if not parallel:
+        yield from extract_pages(pdf_bytes, 0, num_pages, extract_tables)
+        return
+
+    executor = _get_executor()
+    pages_per_task = max(settings.pages_per_task, 1)
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+        f.write(pdf_bytes)
+        f.flush()
+        futures = [
+            executor.submit(
+                extract_pages,
+                f.name,
+                start,
+                min(start + pages_per_task, num_pages),
+                extract_tables,
+            )
+            for start in range(0, num_pages, pages_per_task)
+        ]
+        for future in futures:
+            metrics.track_future(future, "pdf_pages")
+        ready: Dict[int, PageResult] = {}
+        next_page = 0
+        try:
+            for future in as_completed(futures):
+                for page in future.result():
+                    ready[page.page_number - 1] = page
+                while next_page in ready:
+                    yield ready.pop(next_page)
+                    next_page += 1
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def ingest_pdf(pdf_bytes: bytes, extract_tables: bool = False) -> Dict[str, Any]:
+    """Extract a whole PDF into the `{"text": ...}` shape used by
+    bank_statement_data and payslip_data, plus per-page timing (and the
+    tables, for /ingest-document callers that ask for them)."""
+    start = time.perf_counter()
+    pages = list(iter_pdf_pages(pdf_bytes, extract_tables=extract_tables))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    slowest = max((p.elapsed_ms for p in pages), default=0.0)
+    logger.info(
+        f"Ingested PDF: {len(pages)} pages in {elapsed_ms:.1f}ms "
+        f"(slowest page {slowest:.1f}ms)"
+    )
+    return {
+        "text": "\n".join(p.text for p in pages),
+        "tables": [t for p in pages for t in p.tables],
+        "pages": [p.timing() for p in pages],
+        "elapsed_ms": round(elapsed_ms, 2),
+    }
@@ -0,0 +1,272 @@
+import os
+import sys
+import time
+import random
+import sysconfig
+import logging
+import threading
+import contextvars
+import logging.handlers
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+# Sampled profiles are appended here, one collapsed stack per line
+profiles_logger = logging.getLogger("amara.profiles")
+
+FORMATS = ("collapsed", "tree")
+# Leaf frames of a thread with nothing to do: the event loop waiting on I/O
+# (uvloop waits in C, so its innermost Python frame is asyncio.run)
+IDLE_FILES = ("selectors.py", os.path.join("asyncio", "runners.py"))
+STDLIB_DIR = sysconfig.get_paths()["stdlib"]
+
+
+class Profile:
+    """Stack samples of the threads working on one request.
+
+    Sampling is wall clock: a thread blocked on the network or a lock shows
+    up in the frame it waits in. Threads join a profile while they run a
+    stage (see thread_scope), so only the request's own work is sampled.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self._threads: Dict[int, int] = {}
+
+    def add_thread(self, thread_id: int):
+        self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+
+    def remove_thread(self, thread_id: int):
+        depth = self._threads.get(thread_id, 0) - 1
+        if depth > 0:
+            self._threads[thread_id] = depth
+        else:
+            self._threads.pop(thread_id, None)
+
+    def sample(self, frames):
+        for thread_id in list(self._threads):
+            frame = frames.get(thread_id)
+            if frame is None or frame.f_code.co_filename.endswith(IDLE_FILES):
+                continue
+            self.stacks[_collapse(frame)] += 1
+            self.samples += 1
+
+    def collapsed(self, prefix: Optional[str] = None) -> str:
+        """Brendan Gregg's collapsed format (flamegraph.pl, speedscope, inferno)"""
+        root = f"{prefix};" if prefix else ""
+        return "".join(
+            f"{root}{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def call_tree(self, min_percent: Optional[float] = None) -> str:
+        settings = get_settings().profiling
+        if min_percent is None:
+            min_percent = settings.tree_min_percent
+        tree: Dict = {}
+        for stack, count in self.stacks.items():
+            node = tree
+            for frame in stack.split(";"):
+                entry = node.setdefault(frame, [0, {}])
+                entry[0] += count
+                node = entry[1]
+        total = self.samples or 1
+        lines = [
+            f"{self.label}: {self.samples} samples over {self.duration:.3f}s "
+            f"({settings.interval_ms:g}ms interval)"
+        ]
+
+        def render(node: Dict, depth: int):
+            for frame, (count, children) in sorted(
+                node.items(), key=lambda item: -item[1][0]
+            ):
+                percent = 100.0 * count / total
+                if percent < min_percent:
+                    continue
+                lines.append(f"{percent:6.1f}% {count:6d}  {'  ' * depth}{frame}")
+                render(children, depth + 1)
+
+        render(tree, 0)
+        return "\n".join(lines) + "\n"
+
+    def render(self, fmt: str) -> str:
+        return self.call_tree() if fmt == "tree" else self.collapsed()
+
+
+@lru_cache(maxsize=16384)
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        filename = filename[marker + len("site-packages") + 1 :]
+    elif filename.startswith(STDLIB_DIR):
+        filename = os.path.relpath(filename, STDLIB_DIR)
+    elif filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    # ";" separates frames in the collapsed format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+_current: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar(
+    "profile", default=None
+)
+_active: List[Profile] = []
+_active_lock = threading.Lock()
+_wakeup = threading.Event()
+_sampler: Optional[threading.Thread] = None
+
+
+def _run_sampler():
+    interval = get_settings().profiling.interval_ms / 1000.0
+    while True:
+        _wakeup.wait()
+        time.sleep(interval)
+        # Held while sampling so a stopped profile is never written to again
+        with _active_lock:
+            if not _active:
+                _wakeup.clear()
+                continue
+            frames = sys._current_frames()
+            for profile in _active:
+                profile.sample(frames)
+            del frames
+
+
+def start(label: str) -> Profile:
+    """Start sampling a new profile; the caller's context joins it"""
+    global _sampler
+    profile = Profile(label)
+    with _active_lock:
+        _active.append(profile)
+        if _sampler is None:
+            _sampler = threading.Thread(
+                target=_run_sampler, name="profiler", daemon=True
+            )
+            _sampler.start()
+    _wakeup.set()
+    return profile
+
+
+def stop(profile: Profile):
+    with _active_lock:
+        if profile in _active:
+            _active.remove(profile)
+    profile.duration = time.perf_counter() - profile.started
+
+
+@contextmanager
+def thread_scope():
+    """Sample the current thread for the request's profile, if it has one"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    profile.add_thread(thread_id)
+    try:
+        yield
+    finally:
+        profile.remove_thread(thread_id)
+
+
+_writer_lock = threading.Lock()
+_writer_ready = False
+
+
+def write_sampled(profile: Profile):
+    """Append a sampled profile to the rotating collapsed-stack files"""
+    global _writer_ready
+    with _writer_lock:
+        if not _writer_ready:
+            settings = get_settings().profiling
+            os.makedirs(settings.dir, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(settings.dir, "profiles.collapsed"),
+                maxBytes=settings.max_bytes,
+                backupCount=settings.backup_count,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            profiles_logger.addHandler(handler)
+            profiles_logger.setLevel(logging.INFO)
+            profiles_logger.propagate = False
+            _writer_ready = True
+    if profile.stacks:
+        # The request is the root frame, so one flame graph covers every route
+        profiles_logger.info(profile.collapsed(prefix=profile.label).rstrip("\n"))
+
+
+def instrument_app(app):
+    """Profile requests on demand (X-Profile, admin only) or by sampling"""
+    from fastapi import Request
+    from fastapi.responses import JSONResponse, Response
+    from fastapi.concurrency import run_in_threadpool
+
+    from src.utils import metrics
+    from src.utils.admin import is_admin
+
+    # Fraction of requests profiled in the background (0 disables)
+    sample_rate = get_settings().profiling.sample_rate
+
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        fmt = request.headers.get("x-profile")
+        if fmt:
+            if not is_admin(request):
+                return JSONResponse(
+                    {"detail": "Admin token required for profiling"}, status_code=403
+                )
+            if fmt not in FORMATS:
+                return JSONResponse(
+                    {"detail": f"X-Profile must be one of {', '.join(FORMATS)}"},
+                    status_code=400,
+                )
+        elif not (sample_rate and random.random() < sample_rate):
+            return await call_next(request)
+
+        endpoint = metrics.route_template(request.app, request.scope)
+        profile = start(f"{request.method} {endpoint}")
+        token = _current.set(profile)
+        # Under concurrency the event loop's samples include other requests'
+        # async work; stages run in worker threads and are the request's own
+        loop_thread = threading.get_ident()
+        profile.add_thread(loop_thread)
+        try:
+            response = await call_next(request)
+            if fmt:
+                # Response rendering is part of the request's cost
+                async for _ in response.body_iterator:
+                    pass
+        finally:
+            profile.remove_thread(loop_thread)
+            _current.reset(token)
+            stop(profile)
+
+        if not fmt:
+            try:
+                await run_in_threadpool(write_sampled, profile)
+            except Exception as e:
+                logger.warning(f"Could not write sampled profile: {e}")
+            return response
+        return Response(
+            profile.render(fmt),
+            media_type="text/plain",
+            headers={
+                "X-Profiled-Status": str(response.status_code),
+                "X-Profile-Samples": str(profile.samples),
+            },
+        )
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_web_ref(web_ref: Any) -> str:
+    """Normalize a web reference for lookups (trim spaces, upper case)"""
+    return str(web_ref or "").strip().upper()
+
+
+class PropertyIndex:
+    """Per-agent index of properties keyed by normalized web reference.
+
+    Lookups are served from an in-memory dict per agent, loaded from SQLite
+    on first use; upserts and deletes write through to SQLite so the index
+    survives restarts and is shared by workers on the same host. Every write
+    bumps the agent's version in SQLite, and each lookup compares it with the
+    version of the loaded dict, reloading it after another worker's change.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_settings().email.property_index_db
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS agent_properties (
+                agent_id TEXT NOT NULL,
+                web_ref TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (agent_id, web_ref)
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS agent_versions (
+                agent_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )"""
+        )
+        self._conn.commit()
+        self._lock = threading.RLock()
+        self._agents: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Stored version each loaded dict reflects; derived per-agent indexes
+        # rebuild when it changes
+        self._versions: Dict[str, int] = {}
+
+    def _stored_version(self, agent_id: str) -> int:
+        row = self._conn.execute(
+            "SELECT version FROM agent_versions WHERE agent_id = ?", (agent_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _load_agent(self, agent_id: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            # Read the version before the rows: a write landing in between
+            # only costs another reload on the next lookup
+            version = self._stored_version(agent_id)
+            properties = self._agents.get(agent_id)
+            if properties is None or self._versions.get(agent_id) != version:
+                rows = self._conn.execute(
+                    "SELECT web_ref, data FROM agent_properties WHERE agent_id = ?",
+                    (agent_id,),
+                ).fetchall()
+                properties = {web_ref: json.loads(data) for web_ref, data in rows}
+                self._agents[agent_id] = properties
+                self._versions[agent_id] = version
+                logger.info(
+                    f"Loaded {len(properties)} indexed properties for agent {agent_id}"
+                )
+            return properties
+
+    def get(self, agent_id: str, web_ref: str) -> Optional[Dict[str, Any]]:
+        """Return the agent's property for a web reference, if indexed"""
+        return self._load_agent(agent_id).get(normalize_web_ref(web_ref))
+
+    def list(self, agent_id: str) -> List[Dict[str, Any]]:
+        return list(self._load_agent(agent_id).values())
+
+    def count(self, agent_id: str) -> int:
+        return len(self._load_agent(agent_id))
+
+    def version(self, agent_id: str) -> int:
+        """Change counter for an agent's properties, shared by all workers"""
+        with self._lock:
+            self._load_agent(agent_id)
+            return self._versions[agent_id]
+
+    def _write(self, agent_id: str, statements, apply):
+        """Run the write and bump the stored version in one transaction, then
+        apply it to the loaded dict (or drop the dict when another worker
+        wrote since it was loaded)"""
+        with self._lock:
+            index = self._load_agent(agent_id)
+            try:
+                result = statements()
+                self._conn.execute(
+                    "INSERT INTO agent_versions (agent_id, version) VALUES (?, 1) "
+                    "ON CONFLICT(agent_id) DO UPDATE SET version = version + 1",
+                    (agent_id,),
+                )
+                version = self._stored_version(agent_id)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            if version == self._versions[agent_id] + 1:
+                apply(index)
+                self._versions[agent_id] = version
+            else:
+                self._agents.pop(agent_id, None)
+            return result
+
+    def upsert(self, agent_id: str, properties: Iterable[Dict[str, Any]]) -> int:
+        """Insert or update properties; entries without a web_reference are skipped"""
+        rows = []
+        for prop in properties:
+            web_ref = normalize_web_ref(prop.get("web_reference"))
+            if web_ref:
+                rows.append((web_ref, prop))
+        if not rows:
+            return 0
+        now = time.time()
+
+        def statements():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO agent_properties "
+                "(agent_id, web_ref, data, updated_at) VALUES (?, ?, ?, ?)",
+                [(agent_id, ref, json.dumps(prop), now) for ref, prop in rows],
+            )
+
+        def apply(index):
+            for ref, prop in rows:
+                index[ref] = prop
+
+        self._write(agent_id, statements, apply)
+        return len(rows)
+
+    def delete(self, agent_id: str, web_ref: str) -> bool:
+        ref = normalize_web_ref(web_ref)
+        cursor = self._write(
+            agent_id,
+            lambda: self._conn.execute(
+                "DELETE FROM agent_properties WHERE agent_id = ? AND web_ref = ?",
+                (agent_id, ref),
+            ),
+            lambda index: index.pop(ref, None),
+        )
+        return cursor.rowcount > 0
+
+    def clear(self, agent_id: str) -> int:
+        """Remove every indexed property for an agent"""
+        cursor = self._write(
+            agent_id,
+            lambda: self._conn.execute(
+                "DELETE FROM agent_properties WHERE agent_id = ?", (agent_id,)
+            ),
+            lambda index: index.clear(),
+        )
+        return cursor.rowcount
+
+
+def build_web_ref_map(properties: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """One-off web_ref map for callers that still send the full property list"""
+    mapping = {}
+    for prop in properties or []:
+        ref = normalize_web_ref(prop.get("web_reference"))
+        if ref and ref not in mapping:
+            mapping[ref] = prop
+    return mapping
+
+
+_default_index: Optional[PropertyIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_property_index() -> PropertyIndex:
+    """Return the process-wide property index"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = PropertyIndex()
+        return _default_index
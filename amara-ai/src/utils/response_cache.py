@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from email.utils import parseaddr
+from typing import Any, Dict, List, Optional, Tuple
+
+import mmh3
+import numpy as np
+
+from src.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 1 << 12
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+GREETING_PATTERN = re.compile(r"Hi(?: [^,\n]+)?,")
+# Words that make near-duplicate inquiries look different without changing
+# what is being asked
+STOP_WORDS = frozenset(
+    "a an and are at be can could do for hello hi i i'd i'm if in is it "
+    "me my of on or please the there this to we would you "
+    "afternoon apartment day dear flat good house kind morning place "
+    "property regards still thank thanks unit".split()
+)
+
+
+def embed(text: str) -> np.ndarray:
+    """L2-normalised hashed bag of words and word bigrams (offline, no model)"""
+    words = [w for w in WORD_PATTERN.findall(text.lower()) if w not in STOP_WORDS]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature in features:
+        h = mmh3.hash(feature)
+        # The hash sign spreads collisions instead of piling them up
+        vector[h % EMBEDDING_DIM] += 1.0 if h >= 0 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def property_fingerprint(prop: Dict[str, Any]) -> str:
+    """Short hash of a property's details, so edits invalidate cached replies"""
+    data = json.dumps(prop, sort_keys=True, default=str)
+    return format(mmh3.hash128(data), "x")[:16]
+
+
+def personalize(reply: Dict[str, Any], email_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Adapt a cached reply to a new sender: greeting name and subject line"""
+    reply = dict(reply)
+    subject = (email_data.get("subject") or "").strip()
+    if subject:
+        if not subject.lower().startswith("re:"):
+            subject = f"Re: {subject}"
+        reply["subject"] = subject
+    name = parseaddr(email_data.get("from") or "")[0].strip()
+    body = reply.get("body") or ""
+    greeting = GREETING_PATTERN.match(body)
+    if greeting:
+        first_name = name.split()[0] if name else ""
+        hello = f"Hi {first_name}," if first_name else "Hi,"
+        reply["body"] = hello + body[greeting.end() :]
+    return reply
+
+
+def applicant_terms(
+    email_data: Dict[str, Any],
+    inquiry: str,
+    prop: Dict[str, Any],
+    lead: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    """Words only this applicant's reply would contain: their name, email
+    address and phone, and numbers from their inquiry (dates, times, people)
+    that are not in the property's details"""
+    name, address = parseaddr(email_data.get("from") or "")
+    lead = lead or {}
+    # Only the local part of email addresses: domains like gmail.com would
+    # also match the agency's own links
+    values = [
+        name,
+        address.split("@")[0],
+        lead.get("name"),
+        (lead.get("email") or "").split("@")[0],
+        lead.get("phone"),
+    ]
+    terms = {
+        word
+        for value in values
+        if value
+        for word in WORD_PATTERN.findall(value.lower())
+        if len(word) > 2
+    }
+    known = set(WORD_PATTERN.findall(json.dumps(prop, default=str).lower()))
+    terms.update(
+        word
+        for word in WORD_PATTERN.findall(inquiry.lower())
+        if any(c.isdigit() for c in word) and word not in known
+    )
+    return sorted(terms - STOP_WORDS)
+
+
+def is_template_shaped(reply: Dict[str, Any], terms: List[str]) -> bool:
+    """True when the reply mentions none of the applicant's terms outside the
+    greeting personalize() replaces, so it can be sent to someone else"""
+    body = reply.get("body") or ""
+    greeting = GREETING_PATTERN.match(body)
+    if greeting:
+        body = body[greeting.end() :]
+    words = set(WORD_PATTERN.findall(body.lower()))
+    return not words.intersection(terms)
+
+
+class SemanticResponseCache:
+    """Per-property cache of validated replies keyed by inquiry similarity.
+
+    `property_key` should change whenever the property's details do (see
+    `property_fingerprint`), so replies quoting stale details are not reused;
+    `purge_stale` deletes the entries of the earlier keys. Only store replies
+    that pass `is_template_shaped`, as a hit is sent to a different applicant.
+
+    Entries for one (agent, property, inquiry type) live in a small numpy
+    matrix, so a lookup is one matrix-vector product. Entries are written
+    through to SQLite and reloaded (and re-embedded) on first use.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        settings = get_settings().response_cache
+        self.db_path = db_path or settings.db_path
+        self.threshold = settings.threshold if threshold is None else threshold
+        self.max_entries = settings.max_entries if max_entries is None else max_entries
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS cached_responses (
+                agent_id TEXT NOT NULL,
+                property_key TEXT NOT NULL,
+                inquiry_type TEXT NOT NULL,
+                inquiry TEXT NOT NULL,
+                reply TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cached_responses_key "
+            "ON cached_responses (agent_id, property_key, inquiry_type)"
+        )
+        self._conn.commit()
+        self._lock = threading.RLock()
+        # key -> (embedding matrix, [(inquiry, reply)])
+        self._entries: Dict[Tuple[str, str, str], Tuple[np.ndarray, List]] = {}
+        # (agent, property key) pairs purge_stale already ran for
+        self._purged: set = set()
+
+    def _load(self, key: Tuple[str, str, str]):
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries is None:
+                rows = self._conn.execute(
+                    "SELECT inquiry, reply FROM cached_responses "
+                    "WHERE agent_id = ? AND property_key = ? AND inquiry_type = ? "
+                    "ORDER BY created_at DESC LIMIT ?",
+                    (*key, self.max_entries),
+                ).fetchall()
+                items = [(inquiry, json.loads(reply)) for inquiry, reply in rows]
+                matrix = (
+                    np.stack([embed(inquiry) for inquiry, _ in items])
+                    if items
+                    else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+                )
+                entries = (matrix, items)
+                self._entries[key] = entries
+            return entries
+
+    def lookup(
+        self, agent_id: str, property_key: str, inquiry_type: str, inquiry: str
+    ) -> Optional[Dict[str, Any]]:
+        """Most similar past inquiry's reply, if above the threshold"""
+        matrix, items = self._load((agent_id or "", property_key, inquiry_type))
+        if not items:
+            return None
+        similarities = matrix @ embed(inquiry)
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            return None
+        return {
+            "reply": items[best][1],
+            "similarity": round(similarity, 3),
+            "matched_inquiry": items[best][0],
+        }
+
+    def store(
+        self,
+        agent_id: str,
+        property_key: str,
+        inquiry_type: str,
+        inquiry: str,
+        reply: Dict[str, Any],
+    ):
+        """Remember a validated reply; the oldest entries beyond the cap go"""
+        key = (agent_id or "", property_key, inquiry_type)
+        with self._lock:
+            matrix, items = self._load(key)
+            self._conn.execute(
+                "INSERT INTO cached_responses "
+                "(agent_id, property_key, inquiry_type, inquiry, reply, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, inquiry, json.dumps(reply), time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM cached_responses WHERE rowid IN ("
+                "SELECT rowid FROM cached_responses "
+                "WHERE agent_id = ? AND property_key = ? AND inquiry_type = ? "
+                "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (*key, self.max_entries),
+            )
+            self._conn.commit()
+            matrix = np.vstack([embed(inquiry)[None, :], matrix])[: self.max_entries]
+            items = [(inquiry, reply)] + items[: self.max_entries - 1]
+            self._entries[key] = (matrix, items)
+
+    def purge_stale(
+        self,
+        agent_id: str,
+        prefix: str,
+        property_key: str,
+        ttl_seconds: Optional[int] = None,
+    ) -> int:
+        """Delete the agent's entries under `prefix` (one property) whose key
+        is not `property_key`, and any of the agent's entries older than
+        `ttl_seconds` (RESPONSE_CACHE_TTL_SECONDS by default). Runs once per
+        process for each current key."""
+        if ttl_seconds is None:
+            ttl_seconds = get_settings().response_cache.ttl_seconds
+        agent_id = agent_id or ""
+        with self._lock:
+            if (agent_id, property_key) in self._purged:
+                return 0
+            self._purged.add((agent_id, property_key))
+            cutoff = time.time() - ttl_seconds if ttl_seconds else 0
+            cursor = self._conn.execute(
+                "DELETE FROM cached_responses WHERE agent_id = ? AND ("
+                "(substr(property_key, 1, ?) = ? AND property_key != ?) "
+                "OR created_at < ?)",
+                (agent_id, len(prefix), prefix, property_key, cutoff),
+            )
+            self._conn.commit()
+            if cursor.rowcount:
+                for key in [k for k in self._entries if k[0] == agent_id]:
+                    del self._entries[key]
+        if cursor.rowcount:
+            logger.info(
+                f"Purged {cursor.rowcount} cached replies of {agent_id} "
+                f"(outdated {prefix!r} details or older than {ttl_seconds}s)"
+            )
+        return cursor.rowcount
+
+
+_default_cache: Optional[SemanticResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[SemanticResponseCache]:
+    """Return the process-wide response cache, or None when disabled"""
+    global _default_cache
+    if not get_settings().response_cache.enabled:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SemanticResponseCache()
+        return _default_cache
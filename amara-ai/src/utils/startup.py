@@ -0,0 +1,113 @@
+import time
+import logging
+import threading
+import importlib
+from typing import Callable, List, Optional
+
+from src.settings import configure, get_settings
+
+logger = logging.getLogger(__name__)
+
+# The openai client imports its API resources (about 200 modules) on the
+# first completion; warm-up loads them so the first request does not
+CLIENT_MODULES = ("openai.resources.chat",)
+
+# Importing crewai (and litellm, chromadb, ...) takes seconds, so nothing is
+# allowed to import it before the app serves requests. Code that needs
+# crewai's event bus registers a callback that runs once it is loaded.
+_crewai_callbacks: List[Callable[[], None]] = []
+_crewai_loaded = False
+_crewai_lock = threading.RLock()
+
+_state = {"status": "pending", "error": None, "seconds": None}
+_state_lock = threading.Lock()
+
+
+def on_crewai_loaded(callback: Callable[[], None]):
+    """Run `callback` once crewai is imported (right away if it already is)"""
+    with _crewai_lock:
+        if not _crewai_loaded:
+            _crewai_callbacks.append(callback)
+            return
+    callback()
+
+
+def load_crewai():
+    """Import crewai and run the callbacks waiting for it (once per process)"""
+    global _crewai_loaded
+    with _crewai_lock:
+        if _crewai_loaded:
+            return
+        start = time.perf_counter()
+        import crewai  # noqa: F401
+
+        for callback in _crewai_callbacks:
+            callback()
+        _crewai_callbacks.clear()
+        _crewai_loaded = True
+    logger.info(f"crewai loaded in {time.perf_counter() - start:.2f}s")
+
+
+def warm_up():
+    """Load everything the first crew run would otherwise wait for.
+
+    Validates the settings, imports crewai and both crews, builds the LLM
+    client and imports the client modules loaded on the first completion.
+    """
+    from src.utils import metrics
+
+    with _state_lock:
+        if _state["status"] in ("running", "ready"):
+            return
+        _state["status"] = "running"
+    start = time.perf_counter()
+    try:
+        configure()
+        load_crewai()
+        import src.affordability_crew.crew  # noqa: F401
+        from src.tasks.email_response_agent import get_azure_llm
+
+        get_azure_llm()
+        for name in CLIENT_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logger.warning(f"Could not preload {name}: {e}")
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+        with _state_lock:
+            _state.update(status="failed", error=str(e))
+        return
+    seconds = time.perf_counter() - start
+    metrics.STARTUP_DURATION.labels("warmup").set(seconds)
+    with _state_lock:
+        _state.update(status="ready", error=None, seconds=round(seconds, 3))
+    logger.info(f"Warm-up finished in {seconds:.2f}s")
+
+
+def warmup_state() -> dict:
+    with _state_lock:
+        return dict(_state)
+
+
+def register_routes(app, mode: Optional[str] = None):
+    """Warm up on startup (WARMUP) and add the /ready endpoint"""
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import JSONResponse
+
+    mode = mode or get_settings().warmup
+
+    @app.on_event("startup")
+    async def start_warm_up():
+        if mode == "blocking":
+            await run_in_threadpool(warm_up)
+        elif mode == "background":
+            threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+    @app.get("/ready", include_in_schema=False)
+    def ready():
+        """200 once warmed up (always with WARMUP=off), 503 until then"""
+        state = warmup_state()
+        if mode == "off" or state["status"] == "ready":
+            return {"status": "ready", "warmup": state}
+        return JSONResponse({"status": "not_ready", "warmup": state}, 503)
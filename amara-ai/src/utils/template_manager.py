@@ -1,10 +1,92 @@
-from typing import Dict, Any, Optional, Set
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from functools import lru_cache
 import re
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# {{variable}} placeholders, or {variable} for identifier names as used in
+# the workflow TEMPLATES (so JSON braces are never mistaken for variables)
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(.*?)\}\}|\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+class CompiledTemplate:
+    """Template pre-split into literal and variable segments.
+
+    Rendering fills the variable slots of a copy of the segment list and
+    joins it once, instead of one str.replace pass per variable.
+    """
+
+    __slots__ = ("source", "_parts", "_slots", "variables")
+
+    def __init__(self, source: str):
+        self.source = source
+        parts: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            parts.append(source[position : match.start()])
+            slots.append((len(parts), match.group(1) or match.group(2)))
+            parts.append("")
+            position = match.end()
+        parts.append(source[position:])
+        self._parts = tuple(parts)
+        self._slots = tuple(slots)
+        self.variables: Set[str] = {name for _, name in slots}
+
+    def missing(self, variables: Dict[str, Any]) -> List[str]:
+        return [name for name in self.variables if name not in variables]
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        parts = list(self._parts)
+        for index, name in self._slots:
+            parts[index] = str(variables[name])
+        return "".join(parts)
+
+
+class CompiledJsonTemplate:
+    """CrewAI-style {"response": {"subject", "body"}} template"""
+
+    __slots__ = ("source", "_fields", "_response", "variables")
+
+    def __init__(self, source: str, response: Dict[str, Any]):
+        self.source = source
+        self._response = response
+        self._fields = {
+            key: CompiledTemplate(response[key])
+            for key in ("subject", "body")
+            if isinstance(response.get(key), str)
+        }
+        self.variables: Set[str] = set().union(
+            *(field.variables for field in self._fields.values())
+        )
+
+    def missing(self, variables: Dict[str, Any]) -> List[str]:
+        return [name for name in self.variables if name not in variables]
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        response = dict(self._response)
+        for key, field in self._fields.items():
+            response[key] = field.render(variables)
+        return json.dumps({"response": response})
+
+
+@lru_cache(maxsize=256)
+def compile_template(template: str):
+    """Compile template text; JSON detection happens here, once per text"""
+    if template.strip().startswith("{"):
+        try:
+            template_dict = json.loads(template)
+        except json.JSONDecodeError:
+            template_dict = None
+        # Handle CrewAI response format
+        if isinstance(template_dict, dict) and isinstance(
+            template_dict.get("response"), dict
+        ):
+            return CompiledJsonTemplate(template, template_dict["response"])
+    return CompiledTemplate(template)
+
 
 # Example: Template manager for dynamic response templates
 class TemplateManager:
@@ -23,6 +105,10 @@ Best regards,
 Powered by agentamara.com
 """
         )
+        # Template versions, bumped by set_template; compiled templates are
+        # cached per (inquiry type, version)
+        self._versions: Dict[str, int] = {}
+        self._compiled: Dict[Tuple[str, int], Any] = {}
 
     def get_template(self, inquiry_type: str) -> str:
         """Get template for inquiry type, or fallback to default."""
@@ -36,63 +122,54 @@ Powered by agentamara.com
         self.logger.debug(f"Selected template: {template}")
         return template
 
+    def set_template(self, inquiry_type: str, template: str):
+        """Add or replace a template, invalidating its compiled form"""
+        self.templates[inquiry_type] = template
+        self._versions[inquiry_type] = self._versions.get(inquiry_type, 0) + 1
+
+    def compiled_template(self, inquiry_type: str):
+        """Compiled template for an inquiry type, cached by id and version"""
+        key = (inquiry_type, self._versions.get(inquiry_type, 0))
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = compile_template(self.get_template(inquiry_type))
+            self._compiled[key] = compiled
+        return compiled
+
     def required_variables(self, template: str) -> Set[str]:
-        """Find all {{variable}} placeholders in the template."""
-        variables = set(re.findall(r"\{\{(.*?)\}\}", template))
+        """Find all {{variable}} and {variable} placeholders in the template."""
+        variables = set(compile_template(template).variables)
         self.logger.debug(f"Required variables: {variables}")
         return variables
 
+    def _render(self, compiled, variables: Dict[str, Any]) -> str:
+        # Validate all required variables are present
+        missing = compiled.missing(variables)
+        if missing:
+            error_msg = f"Missing template variables: {', '.join(missing)}"
+            self.logger.error(error_msg)
+            raise ValueError(error_msg)
+        return compiled.render(variables)
+
     def render_template(self, template: str, variables: Dict[str, Any]) -> str:
         """Render template with variables, handling both string and JSON responses."""
         try:
-            self.logger.info("Starting template rendering...")
-            self.logger.debug(f"Template: {template}")
-            self.logger.debug(f"Variables: {variables}")
-
-            # Validate all required variables are present
-            required = self.required_variables(template)
-            missing = [var for var in required if var not in variables]
-            if missing:
-                error_msg = f"Missing template variables: {', '.join(missing)}"
-                self.logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            # Handle both string and JSON responses
-            if isinstance(template, str) and template.strip().startswith("{"):
-                try:
-                    # Try to parse as JSON first
-                    template_dict = json.loads(template)
-                    if isinstance(template_dict, dict) and "response" in template_dict:
-                        # Handle CrewAI response format
-                        response = template_dict["response"]
-                        if isinstance(response, dict):
-                            # Substitute variables in both subject and body
-                            for key, value in variables.items():
-                                if "subject" in response:
-                                    response["subject"] = response["subject"].replace(
-                                        f"{{{{{key}}}}}", str(value)
-                                    )
-                                if "body" in response:
-                                    response["body"] = response["body"].replace(
-                                        f"{{{{{key}}}}}", str(value)
-                                    )
-                            return json.dumps({"response": response})
-                except json.JSONDecodeError:
-                    # If not valid JSON, treat as regular template
-                    pass
-
-            # Regular template substitution
-            result = template
-            for key, value in variables.items():
-                result = result.replace(f"{{{{{key}}}}}", str(value))
-
-            self.logger.info("Template rendered successfully")
-            return result
-
+            return self._render(compile_template(template), variables)
         except Exception as e:
             self.logger.error(f"Error rendering template: {str(e)}")
             raise
 
+    def render(self, inquiry_type: str, variables: Dict[str, Any]) -> str:
+        """Render the template registered for an inquiry type"""
+        return self._render(self.compiled_template(inquiry_type), variables)
+
+    def render_many(
+        self, template: str, variables_list: Iterable[Dict[str, Any]]
+    ) -> List[str]:
+        """Render one template for many recipients, compiling it once"""
+        compiled = compile_template(template)
+        return [self._render(compiled, variables) for variables in variables_list]
+
     def validate_template(self, template: str) -> bool:
         """Validate template format and placeholders."""
         try:
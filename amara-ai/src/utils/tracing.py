@@ -0,0 +1,253 @@
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from src.settings import get_settings
+from src.utils import startup
+
+logger = logging.getLogger(__name__)
+
+# The global tracer provider is left alone: crewai installs its own telemetry
+# provider there, and our spans should not be sent to it
+_provider = None
+_tracer: trace.Tracer = trace.NoOpTracer()
+_setup_lock = threading.Lock()
+# Open task and LLM call spans on this thread, innermost last
+_local = threading.local()
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_settings().tracing.file
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        self._file.close()
+
+
+def _create_exporter(name: str) -> SpanExporter:
+    if name == "file":
+        return FileSpanExporter()
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter()
+    if name == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER: {name}")
+
+
+def setup_tracing(app=None, exporter: Optional[SpanExporter] = None):
+    """Start exporting spans and instrument `app` (no-op when disabled).
+
+    Incoming `traceparent` headers (or whatever OTEL_PROPAGATORS selects)
+    continue the caller's trace, so a request from the Supabase edge
+    function shows up under the edge function's span.
+    """
+    global _provider, _tracer
+    settings = get_settings().tracing
+    if exporter is None and settings.exporter == "none":
+        return None
+    with _setup_lock:
+        if _provider is None:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            from opentelemetry.sdk.trace.sampling import (
+                ParentBased,
+                TraceIdRatioBased,
+            )
+
+            _provider = TracerProvider(
+                resource=Resource.create(
+                    {"service.name": settings.service_name}
+                ),
+                sampler=ParentBased(TraceIdRatioBased(settings.sample_rate)),
+            )
+            _provider.add_span_processor(
+                BatchSpanProcessor(exporter or _create_exporter(settings.exporter))
+            )
+            _tracer = _provider.get_tracer("amara-ai")
+            # crewai is imported on first use or during warm-up
+            startup.on_crewai_loaded(_install_crewai_hooks)
+            logger.info(f"Tracing enabled ({settings.exporter} exporter)")
+    if app is not None:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+        FastAPIInstrumentor.instrument_app(
+            app,
+            tracer_provider=_provider,
+            excluded_urls=settings.excluded_urls,
+            exclude_spans=["receive", "send"],
+        )
+    return _provider
+
+
+def shutdown_tracing():
+    """Export the remaining spans"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """Child span of the current span for the enclosed block"""
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def _open_spans() -> List[Dict[str, Any]]:
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+    return _local.spans
+
+
+def _push(kind: str, name: str, attributes: Dict[str, Any], **extra):
+    current = _tracer.start_span(name, attributes=attributes)
+    token = otel_context.attach(trace.set_span_in_context(current))
+    entry = {"kind": kind, "span": current, "token": token, **extra}
+    _open_spans().append(entry)
+    return entry
+
+
+def _pop(kind: str, match=None) -> Optional[Dict[str, Any]]:
+    """Close spans down to the innermost `kind` entry accepted by `match`"""
+    spans = _open_spans()
+    index = len(spans) - 1
+    while index >= 0 and not (
+        spans[index]["kind"] == kind and (match is None or match(spans[index]))
+    ):
+        index -= 1
+    if index < 0:
+        return None
+    entry = spans[index]
+    # Anything opened inside it and never closed ends with it
+    for inner in reversed(spans[index + 1 :]):
+        inner["span"].end()
+        otel_context.detach(inner["token"])
+    del spans[index:]
+    otel_context.detach(entry["token"])
+    return entry
+
+
+def record_llm_event(name: str):
+    """Note a retry or rate limit against the LLM call in progress"""
+    spans = _open_spans()
+    if spans and spans[-1]["kind"] == "llm":
+        counts = spans[-1]["counts"]
+        counts[name] = counts.get(name, 0) + 1
+    trace.get_current_span().add_event(name)
+
+
+def _token_summary(task):
+    process = getattr(getattr(task, "agent", None), "_token_process", None)
+    return process.get_summary() if process is not None else None
+
+
+def _install_crewai_hooks():
+    from crewai.utilities.events import (
+        LLMCallCompletedEvent,
+        LLMCallFailedEvent,
+        LLMCallStartedEvent,
+        TaskCompletedEvent,
+        TaskFailedEvent,
+        TaskStartedEvent,
+        crewai_event_bus,
+    )
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def on_task_started(source, event):
+        task = event.task or source
+        name = getattr(task, "name", None) or "unnamed"
+        role = getattr(getattr(task, "agent", None), "role", None)
+        _push(
+            "task",
+            f"task {name}",
+            {"crewai.task.name": name, "crewai.agent.role": role or ""},
+            task=task,
+        )
+
+    def finish_task(source, event, error: Optional[str] = None):
+        task = event.task or source
+        entry = _pop("task", lambda e: e["task"] is task)
+        if entry is None:
+            return
+        if error:
+            entry["span"].set_status(trace.Status(trace.StatusCode.ERROR, error))
+        entry["span"].end()
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def on_task_completed(source, event):
+        finish_task(source, event)
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def on_task_failed(source, event):
+        finish_task(source, event, event.error)
+
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def on_llm_call_started(source, event):
+        model = getattr(source, "model", None) or "unknown"
+        tasks = [e for e in _open_spans() if e["kind"] == "task"]
+        task = tasks[-1]["task"] if tasks else None
+        _push(
+            "llm",
+            "llm_call",
+            {
+                "gen_ai.system": model.split("/", 1)[0] if "/" in model else "",
+                "gen_ai.request.model": model,
+            },
+            task=task,
+            tokens_before=_token_summary(task),
+            counts={},
+        )
+
+    def finish_call(error: Optional[str] = None):
+        entry = _pop("llm")
+        if entry is None:
+            return
+        current = entry["span"]
+        before, after = entry["tokens_before"], _token_summary(entry["task"])
+        if before is not None and after is not None:
+            current.set_attribute(
+                "gen_ai.usage.input_tokens", after.prompt_tokens - before.prompt_tokens
+            )
+            current.set_attribute(
+                "gen_ai.usage.output_tokens",
+                after.completion_tokens - before.completion_tokens,
+            )
+        current.set_attribute("llm.retries", entry["counts"].get("retry", 0))
+        current.set_attribute(
+            "llm.rate_limited", entry["counts"].get("rate_limited", 0)
+        )
+        if error:
+            current.set_status(trace.Status(trace.StatusCode.ERROR, error))
+        current.end()
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_llm_call_completed(source, event):
+        finish_call()
+
+    @crewai_event_bus.on(LLMCallFailedEvent)
+    def on_llm_call_failed(source, event):
+        finish_call(event.error or "LLM call failed")
@@ -0,0 +1,156 @@
+import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from enum import IntEnum
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+EPOCH = datetime.date(1970, 1, 1)
+# Statement and API date formats, most common first
+DATE_FORMATS = ("%d/%m/%Y", "%d %b %Y", "%d %B %Y", "%Y-%m-%d")
+
+
+class TransactionType(IntEnum):
+    CREDIT = 0
+    DEBIT = 1
+
+    @classmethod
+    def parse(cls, value: Any) -> "TransactionType":
+        if isinstance(value, TransactionType):
+            return value
+        return cls.DEBIT if str(value).strip().lower() == "debit" else cls.CREDIT
+
+
+def parse_amount_cents(value: Any) -> int:
+    """Convert a float, int or ZAR string ("R 15 000.00", "-R1,234.50") to cents"""
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, float):
+        return int(round(value * 100))
+    text = str(value).replace("R", "").replace(",", "").replace(" ", "")
+    if not text:
+        return 0
+    try:
+        return int(
+            (Decimal(text) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+        )
+    except InvalidOperation:
+        return 0
+
+
+def parse_epoch_day(value: str) -> Optional[int]:
+    """Days since 1970-01-01 for a supported date string, else None"""
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return (datetime.datetime.strptime(value, fmt).date() - EPOCH).days
+        except ValueError:
+            continue
+    return None
+
+
+def format_zar(cents: int) -> str:
+    """South African Rand format used in prompts, e.g. "R 15000.00" """
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"R {sign}{cents // 100}.{cents % 100:02d}"
+
+
+class TransactionRecord:
+    """Compact transaction shared by the API, parsers and crew.
+
+    Amounts are integer cents and dates are epoch days; ZAR strings are only
+    produced when building prompts (see `to_prompt_dict`).
+    """
+
+    __slots__ = ("description", "amount_cents", "date_days", "type", "date_raw")
+
+    def __init__(
+        self,
+        description: str,
+        amount_cents: int,
+        date_days: Optional[int],
+        type: TransactionType,
+        date_raw: Optional[str] = None,
+    ):
+        self.description = description
+        self.amount_cents = amount_cents
+        self.date_days = date_days
+        self.type = type
+        # Only kept when the date could not be parsed
+        self.date_raw = date_raw
+
+    @classmethod
+    def from_values(
+        cls, description: Any, amount: Any, date: Any, type: Any
+    ) -> "TransactionRecord":
+        date_text = str(date or "")
+        date_days = parse_epoch_day(date_text) if date_text else None
+        return cls(
+            description=str(description or ""),
+            amount_cents=parse_amount_cents(amount),
+            date_days=date_days,
+            type=TransactionType.parse(type),
+            date_raw=date_text if date_days is None and date_text else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TransactionRecord":
+        return cls.from_values(
+            data.get("description"),
+            data.get("amount", 0),
+            data.get("date"),
+            data.get("type", ""),
+        )
+
+    @property
+    def amount(self) -> float:
+        return self.amount_cents / 100
+
+    @property
+    def date(self) -> str:
+        """DD/MM/YYYY (South African format), or the unparsed source date"""
+        if self.date_days is None:
+            return self.date_raw or ""
+        return (EPOCH + datetime.timedelta(days=self.date_days)).strftime("%d/%m/%Y")
+
+    def is_outgoing(self) -> bool:
+        """Outgoing: debit, description with '-' prefix, or 'R' in a negative line"""
+        return (
+            self.type == TransactionType.DEBIT
+            or self.description.strip().startswith("-")
+            or ("R" in self.description and self.amount_cents < 0)
+        )
+
+    def to_prompt_dict(self) -> Dict[str, Any]:
+        return {
+            "description": self.description,
+            "amount": format_zar(self.amount_cents),
+            "date": self.date,
+            "type": "debit" if self.type == TransactionType.DEBIT else "credit",
+        }
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, TransactionRecord):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (
+            f"TransactionRecord({self.date!r}, {self.description!r}, "
+            f"{format_zar(self.amount_cents)!r}, {self.type.name})"
+        )
+
+
+def coerce_transactions(
+    transactions: Optional[Iterable[Union[TransactionRecord, Dict[str, Any]]]],
+) -> List[TransactionRecord]:
+    """Normalise legacy dict transactions (float or ZAR string amounts)"""
+    return [
+        t if isinstance(t, TransactionRecord) else TransactionRecord.from_dict(t)
+        for t in (transactions or [])
+    ]
+
+
+def format_for_prompt(transactions: Iterable[TransactionRecord]) -> List[Dict[str, Any]]:
+    return [t.to_prompt_dict() for t in transactions]
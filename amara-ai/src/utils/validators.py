@@ -1,8 +1,75 @@
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, Iterable, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Completeness checks
+REQUIRED_KEYWORDS = {
+    "viewing_request": [
+        "view",
+        "application",
+        "contact",
+        "regards",
+        "schedule",
+    ],
+    "availability_check": ["available", "status", "application", "contact"],
+    "general_info": ["information", "details", "contact", "regards"],
+}
+DEFAULT_KEYWORDS = ["application", "contact", "regards"]
+
+# Tone check (enhanced)
+PROHIBITED_PHRASES = [
+    "scam",
+    "fake",
+    "guaranteed approval",
+    "pay now",
+    "urgent",
+    "limited time",
+    "act now",
+    "exclusive offer",
+]
+
+COURTESY_PHRASES = ["thank you", "best regards"]
+# Additional points for inquiry type specific elements
+BONUS_KEYWORDS = {
+    "viewing_request": "schedule",
+    "availability_check": "available",
+    "general_info": "information",
+}
+
+
+class ValidationPlan:
+    """Deduplicated set of every term one validation looks for.
+
+    Terms are probed with `in` against text normalized once: CPython's
+    substring search beats a combined regex alternation (overlapping
+    terms included) at reply-sized inputs.
+    """
+
+    __slots__ = ("terms",)
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = tuple(dict.fromkeys(t for t in terms if t))
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """Terms occurring anywhere in `text`"""
+        return frozenset([term for term in self.terms if term in text])
+
+
+@lru_cache(maxsize=1024)
+def compile_plan(inquiry_type: str, fields: Tuple[str, ...]) -> ValidationPlan:
+    """Plan for an inquiry type plus a property's required fields"""
+    terms = [
+        *fields,
+        *REQUIRED_KEYWORDS.get(inquiry_type, DEFAULT_KEYWORDS),
+        *PROHIBITED_PHRASES,
+        *COURTESY_PHRASES,
+    ]
+    if inquiry_type in BONUS_KEYWORDS:
+        terms.append(BONUS_KEYWORDS[inquiry_type])
+    return ValidationPlan(terms)
+
 
 # Multi-level validation for AI-generated responses
 class ResponseValidator:
@@ -18,11 +85,8 @@ class ResponseValidator:
         - Tone: must be professional and not contain prohibited phrases
         - Confidence: score based on rule coverage
         """
+        inquiry_type = context.get("inquiry_type", "")
         try:
-            self.logger.info("Starting response validation...")
-            self.logger.debug(f"Response to validate: {response}")
-            self.logger.debug(f"Validation context: {context}")
-
             # Handle both string and dict responses
             response_text = response
             if isinstance(response, dict):
@@ -48,73 +112,32 @@ class ResponseValidator:
                 }
 
             property_ctx = context.get("property", {})
-            email_ctx = context.get("email", {})
-            inquiry_type = context.get("inquiry_type", "")
-
-            # Log validation parameters
-            self.logger.info(f"Validating response for inquiry type: {inquiry_type}")
-            self.logger.info(f"Property context: {property_ctx}")
-
             required_fields = [
-                property_ctx.get("address"),
-                property_ctx.get("application_link"),
-                property_ctx.get("web_reference"),
+                field
+                for field in (
+                    property_ctx.get("address"),
+                    property_ctx.get("application_link"),
+                    property_ctx.get("web_reference"),
+                )
+                if field and field.strip()  # Only check non-empty fields
             ]
+            normalized_fields = tuple(f.lower().strip() for f in required_fields)
 
-            # Normalize strings for comparison
-            response_normalized = response_text.lower().strip()
-            missing = []
-
-            for field in required_fields:
-                if field and field.strip():  # Only check non-empty fields
-                    field_normalized = field.lower().strip()
-                    if field_normalized not in response_normalized:
-                        missing.append(field)
-                        self.logger.debug(f"Missing field: {field}")
-                    else:
-                        self.logger.debug(f"Found field: {field}")
+            # Normalize once and scan once for every field, keyword and phrase
+            plan = compile_plan(inquiry_type, normalized_fields)
+            found = plan.scan(response_text.lower().strip())
 
             # Factual checks
-            factual_pass = not missing
-            self.logger.info(
-                f"Factual validation {'passed' if factual_pass else 'failed'}"
-            )
-            if missing:
-                self.logger.warning(f"Missing required fields: {missing}")
-
-            # Completeness checks
-            required_keywords = {
-                "viewing_request": [
-                    "view",
-                    "application",
-                    "contact",
-                    "regards",
-                    "schedule",
-                ],
-                "availability_check": ["available", "status", "application", "contact"],
-                "general_info": ["information", "details", "contact", "regards"],
-            }
-            keywords = required_keywords.get(
-                inquiry_type, ["application", "contact", "regards"]
-            )
-            completeness_pass = all(kw in response.lower() for kw in keywords)
-            self.logger.info(
-                f"Completeness validation {'passed' if completeness_pass else 'failed'}"
-            )
-
-            # Tone check (enhanced)
-            prohibited = [
-                "scam",
-                "fake",
-                "guaranteed approval",
-                "pay now",
-                "urgent",
-                "limited time",
-                "act now",
-                "exclusive offer",
+            missing = [
+                field
+                for field, normalized in zip(required_fields, normalized_fields)
+                if normalized not in found
             ]
-            tone_pass = not any(p in response.lower() for p in prohibited)
-            self.logger.info(f"Tone validation {'passed' if tone_pass else 'failed'}")
+            factual_pass = not missing
+
+            keywords = REQUIRED_KEYWORDS.get(inquiry_type, DEFAULT_KEYWORDS)
+            completeness_pass = all(kw in found for kw in keywords)
+            tone_pass = not any(p in found for p in PROHIBITED_PHRASES)
 
             # Confidence score: weighted with inquiry type consideration
             score = 0.0
@@ -124,22 +147,12 @@ class ResponseValidator:
                 score += 0.3
             if tone_pass:
                 score += 0.2
-            if "thank you" in response.lower() or "best regards" in response.lower():
-                score += 0.1
-
-            # Additional points for inquiry type specific elements
-            if inquiry_type == "viewing_request" and "schedule" in response.lower():
+            if any(p in found for p in COURTESY_PHRASES):
                 score += 0.1
-            elif (
-                inquiry_type == "availability_check" and "available" in response.lower()
-            ):
-                score += 0.1
-            elif inquiry_type == "general_info" and "information" in response.lower():
+            if BONUS_KEYWORDS.get(inquiry_type) in found:
                 score += 0.1
 
             score = min(score, 1.0)
-            self.logger.info(f"Final confidence score: {score}")
-
             validation_result = {
                 "pass": score >= self.min_confidence,
                 "confidence": round(score, 2),
@@ -151,8 +164,6 @@ class ResponseValidator:
                     "inquiry_type": inquiry_type,
                 },
             }
-
-            self.logger.info(f"Validation complete. Result: {validation_result}")
             return validation_result
 
         except Exception as e:
@@ -169,3 +180,9 @@ class ResponseValidator:
                     "inquiry_type": inquiry_type,
                 },
             }
+
+    def validate_many(
+        self, items: Iterable[Tuple[Any, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Validate (response, context) pairs, e.g. every draft in a batch"""
+        return [self.validate(response, context) for response, context in items]
@@ -1,22 +1,125 @@
-import re
-from typing import Optional, Dict
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Iterable, List
+
+# The `regex` engine scans a combined alternation in roughly constant time per
+# character regardless of branch count, unlike the stdlib `re` engine
+import regex
+
+
+@dataclass(frozen=True)
+class PortalPattern:
+    """Web reference format used by a property listing portal"""
+
+    name: str
+    pattern: str
+    # How sure we are that a match really is this portal's listing reference
+    confidence: float = 0.5
+
 
 # Multi-pattern web reference extractor for property listing sites
-WEB_REF_PATTERNS = {
-    "site_1": r"RR\d{7}",  # e.g. RR4379658
-    "site_2": r"(?<!RR)\b\d{9}\b",  # e.g. 114025265
-}
+DEFAULT_PORTALS = [
+    PortalPattern("site_1", r"RR\d{7}", 0.95),  # e.g. RR4379658
+    PortalPattern("site_2", r"(?<!RR)\b\d{9}\b", 0.7),  # e.g. 114025265
+]
 
 
-def extract_web_ref(subject: str, body: str) -> Dict[str, Optional[str]]:
-    """Extract web reference from subject or body using known patterns."""
-    for text, found_in in [(subject, "subject"), (body, "body")]:
-        for site, pattern in WEB_REF_PATTERNS.items():
-            matches = re.findall(pattern, text)
-            if matches:
-                return {
-                    "web_ref": matches[0],
-                    "source_site": site,
-                    "found_in": found_in,
+class WebRefMatcher:
+    """Registry of portal patterns compiled into one alternation.
+
+    Subject and body are scanned once with the combined pattern, so adding
+    portals does not add a pass over the email per pattern.
+    """
+
+    def __init__(self, portals: Iterable[PortalPattern] = ()):
+        self._lock = threading.Lock()
+        self._portals: List[PortalPattern] = list(portals)
+        self._regex: Optional[regex.Pattern] = None
+        self._compile()
+
+    @property
+    def portals(self) -> List[PortalPattern]:
+        return list(self._portals)
+
+    def _compile(self):
+        self._by_group = {f"_p{i}": p for i, p in enumerate(self._portals)}
+        if not self._portals:
+            self._regex = None
+            return
+        self._regex = regex.compile(
+            "|".join(
+                f"(?P<_p{i}>{portal.pattern})" for i, portal in enumerate(self._portals)
+            )
+        )
+
+    def register(self, portal: PortalPattern):
+        """Add or replace a portal pattern (by name) and recompile"""
+        regex.compile(portal.pattern)  # Fail fast on invalid patterns
+        with self._lock:
+            self._portals = [p for p in self._portals if p.name != portal.name]
+            self._portals.append(portal)
+            self._compile()
+
+    def scan(self, subject: str, body: str) -> List[Dict[str, Any]]:
+        """Return every candidate reference, best first.
+
+        Candidates are ranked subject before body, then by portal confidence,
+        then by position.
+        """
+        compiled, by_group = self._regex, self._by_group
+        if compiled is None:
+            return []
+        subject = subject or ""
+        text = f"{subject}\n{body or ''}"
+        body_start = len(subject) + 1
+        candidates = []
+        for match in compiled.finditer(text):
+            # The portal's group encloses any inner groups, so it closes last
+            portal = by_group[match.lastgroup]
+            in_subject = match.start() < body_start
+            offset = 0 if in_subject else body_start
+            candidates.append(
+                {
+                    "web_ref": match.group(),
+                    "source_site": portal.name,
+                    "found_in": "subject" if in_subject else "body",
+                    "start": match.start() - offset,
+                    "end": match.end() - offset,
+                    "confidence": portal.confidence,
                 }
-    return {"web_ref": None, "source_site": None, "found_in": None}
+            )
+        candidates.sort(
+            key=lambda c: (c["found_in"] != "subject", -c["confidence"], c["start"])
+        )
+        return candidates
+
+
+WEB_REF_MATCHER = WebRefMatcher(DEFAULT_PORTALS)
+# Name -> pattern view of the registered portals
+WEB_REF_PATTERNS = {p.name: p.pattern for p in DEFAULT_PORTALS}
+
+
+def register_portal(name: str, pattern: str, confidence: float = 0.5):
+    """Register a portal's web reference pattern with the default matcher"""
+    WEB_REF_MATCHER.register(PortalPattern(name, pattern, confidence))
+    WEB_REF_PATTERNS[name] = pattern
+
+
+def extract_web_ref(subject: str, body: str) -> Dict[str, Any]:
+    """Extract web reference from subject or body using known patterns."""
+    candidates = WEB_REF_MATCHER.scan(subject, body)
+    if not candidates:
+        return {
+            "web_ref": None,
+            "source_site": None,
+            "found_in": None,
+            "candidates": [],
+        }
+    best = candidates[0]
+    return {
+        "web_ref": best["web_ref"],
+        "source_site": best["source_site"],
+        "found_in": best["found_in"],
+        "confidence": best["confidence"],
+        "candidates": candidates,
+    }
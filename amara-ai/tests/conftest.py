@@ -0,0 +1,22 @@
+from dataclasses import replace
+
+import pytest
+
+from src.settings import get_settings, set_settings
+
+
+@pytest.fixture
+def override_settings():
+    """Replace fields of a settings section for one test:
+    override_settings("pdf", pages_per_task=2)"""
+
+    def override(section: str, **changes):
+        settings = get_settings()
+        set_settings(
+            replace(
+                settings, **{section: replace(getattr(settings, section), **changes)}
+            )
+        )
+
+    yield override
+    set_settings(None)
@@ -0,0 +1,62 @@
+from src.email_response_workflow import match_property_by_address
+from src.utils.address_matcher import AddressIndex, split_street
+
+PROPERTIES = [
+    {"web_reference": "LONG1", "address": "1 Long Street, Cape Town"},
+    {"web_reference": "MAIN12", "address": "12 Main Road, Green Point"},
+    {"web_reference": "KLOOF15", "address": "15 Kloof Road", "suburb": "Sea Point"},
+    {"web_reference": "BEACH30", "address": "Unit 4, 30 Beach Rd, Mouille Point"},
+]
+
+
+def accepted(body: str):
+    index = AddressIndex(PROPERTIES)
+    prop = match_property_by_address({"subject": "", "body": body}, index)["property"]
+    return prop and prop["web_reference"]
+
+
+def test_split_street():
+    assert split_street(PROPERTIES[1]) == ("12", ["main", "road"], "green point")
+    assert split_street(PROPERTIES[3]) == ("30", ["beach", "road"], "mouille point")
+    assert split_street(PROPERTIES[2]) == ("15", ["kloof", "road"], "sea point")
+
+
+def test_scattered_street_words_do_not_match():
+    body = (
+        "Hi, I have been looking for a long time for a 1 bedroom place in "
+        "Cape Town with street parking"
+    )
+    assert AddressIndex(PROPERTIES).match(body) == []
+    assert accepted(body) is None
+
+
+def test_street_without_suburb_matches():
+    assert accepted("Is 12 Main Rd still available?") == "MAIN12"
+
+
+def test_street_without_number_matches_with_suburb():
+    candidates = AddressIndex(PROPERTIES).match("Kloof Rd flat in Sea Point")
+    assert candidates[0]["property"]["web_reference"] == "KLOOF15"
+    assert candidates[0]["score"] >= 90
+    assert accepted("Kloof Rd flat in Sea Point") == "KLOOF15"
+
+
+def test_other_street_number_does_not_match():
+    assert AddressIndex(PROPERTIES).match("Is 14 Main Road available?") == []
+
+
+def test_misspelt_street_name_matches():
+    assert accepted("Viewing at 15 Kloff Road please") == "KLOOF15"
+
+
+def test_unit_prefix_and_abbreviation():
+    assert accepted("Is 30 Beach Road still on the market?") == "BEACH30"
+
+
+def test_same_street_is_ambiguous_without_number():
+    index = AddressIndex(
+        PROPERTIES + [{"web_reference": "KLOOF20", "address": "20 Kloof Road"}]
+    )
+    result = match_property_by_address({"subject": "", "body": "Kloof Rd flat"}, index)
+    assert result["property"] is None
+    assert len(result["candidates"]) == 2
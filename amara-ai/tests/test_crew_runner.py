@@ -0,0 +1,38 @@
+import threading
+import time
+
+from src.utils import crew_runner
+
+
+class FakeCrew:
+    running = 0
+    overlap = False
+    lock = threading.Lock()
+
+    def kickoff(self, **inputs):
+        with FakeCrew.lock:
+            FakeCrew.running += 1
+            FakeCrew.overlap |= FakeCrew.running > 1
+        time.sleep(0.02)
+        with FakeCrew.lock:
+            FakeCrew.running -= 1
+        return inputs
+
+
+def test_run_crew_returns_crew_and_result():
+    crew, result = crew_runner.run_crew(FakeCrew, rent=8000)
+    assert isinstance(crew, FakeCrew)
+    assert result == {"rent": 8000}
+
+
+def test_kickoffs_never_overlap_with_one_slot():
+    assert crew_runner.crew_max_concurrency() == 1
+    threads = [
+        threading.Thread(target=crew_runner.run_crew, args=(FakeCrew,))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not FakeCrew.overlap
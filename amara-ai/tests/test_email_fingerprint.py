@@ -0,0 +1,54 @@
+from src.utils.email_fingerprint import (
+    SkeletonClassificationStore,
+    fingerprint,
+    skeleton,
+)
+
+
+def test_skeleton_masks_variable_tokens():
+    a = skeleton(
+        "Viewing RR1234567",
+        "Hi, I am Thandi Mokoena. Can I view on Saturday at 10:00? "
+        "Call 082 555 1234 or thandi@example.com",
+    )
+    b = skeleton(
+        "Viewing RR7654321",
+        "Hi, I am Peter Smith. Can I view on Monday at 14:30? "
+        "Call 071 222 3333 or peter@example.org",
+    )
+    assert a == b
+    assert "<num>" in a and "<email>" in a and "<date>" in a
+
+
+def test_different_questions_get_different_fingerprints():
+    assert fingerprint("", "Is it still available?") != fingerprint(
+        "", "Are pets allowed?"
+    )
+
+
+def test_store_round_trip_and_hits():
+    store = SkeletonClassificationStore(":memory:", lru_size=1)
+    fp = fingerprint("", "Is it still available?")
+    assert store.get(fp) is None
+    store.put(fp, "availability_check", "is it still available?")
+    store.put("other", "general_info", "other")  # evicts fp from the LRU
+    assert store.get(fp) == "availability_check"
+    assert store.get(fp) == "availability_check"
+    stats = store.stats()
+    assert stats["skeletons"] == 2
+    assert stats["total_hits"] == 2
+    assert stats["process_lookups"] == 3
+    assert stats["top"][0]["fingerprint"] == fp
+
+
+def test_hits_are_batched_until_flush(tmp_path):
+    db = str(tmp_path / "fp.db")
+    store = SkeletonClassificationStore(db, flush_seconds=3600)
+    store.put("fp", "general_info", "skeleton")
+    for _ in range(3):
+        store.get("fp")
+    other = SkeletonClassificationStore(db)
+    assert other.stats()["total_hits"] == 0
+    store.flush()
+    assert other.stats()["total_hits"] == 3
+    store.close()
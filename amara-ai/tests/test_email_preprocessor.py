@@ -0,0 +1,54 @@
+from src.utils.email_preprocessor import clean_email_body, preprocess_email
+
+
+def test_single_trailing_boilerplate_match_is_kept():
+    body = (
+        "Hello\nI would like to view it.\n"
+        "Privacy policy matters to me, do you store data?"
+    )
+    assert clean_email_body(body) == body
+
+
+def test_footer_after_separator_is_dropped():
+    body = (
+        "Hi, is the flat still available?\n\n"
+        "-----\n"
+        "This enquiry was sent via Property24.\n"
+        "Some more portal text."
+    )
+    assert clean_email_body(body) == "Hi, is the flat still available?"
+
+
+def test_two_consecutive_boilerplate_lines_are_dropped():
+    body = (
+        "Can I view it on Saturday?\n"
+        "Unsubscribe\n"
+        "Privacy policy"
+    )
+    assert clean_email_body(body) == "Can I view it on Saturday?"
+
+
+def test_disclaimer_paragraph_opening_with_boilerplate_is_dropped():
+    body = (
+        "Can I view it on Saturday?\n\n"
+        "This email is confidential and intended for the named recipient.\n"
+        "If you are not the intended recipient, delete it.\n"
+        "Any views expressed are the sender's own."
+    )
+    assert clean_email_body(body) == "Can I view it on Saturday?"
+
+
+def test_quotes_signatures_and_html_are_stripped():
+    body = (
+        "<p>Is it pet friendly?</p><br>Thanks\n"
+        "--\nJane\n"
+        "On Mon, 1 Jan 2024, Agent wrote:\n> old text"
+    )
+    assert clean_email_body(body) == "Is it pet friendly?\n\nThanks"
+
+
+def test_long_bodies_are_truncated():
+    result = preprocess_email("word " * 100, max_chars=50)
+    assert result.truncated
+    assert result.text.endswith(" ...")
+    assert len(result.text) <= 54
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.utils.idempotency import (
+    COMPLETED,
+    IN_PROGRESS,
+    NEW,
+    SQLiteIdempotencyStore,
+    run_once,
+)
+
+
+class RecordingStore(SQLiteIdempotencyStore):
+    """Records which threads the store was called from"""
+
+    def __init__(self):
+        super().__init__(":memory:")
+        self.threads = set()
+
+    def claim(self, key):
+        self.threads.add(threading.get_ident())
+        return super().claim(key)
+
+    def complete(self, key, result):
+        self.threads.add(threading.get_ident())
+        super().complete(key, result)
+
+
+def test_claim_complete_release():
+    store = SQLiteIdempotencyStore(":memory:")
+    assert store.claim("a") == (NEW, None)
+    assert store.claim("a") == (IN_PROGRESS, None)
+    store.complete("a", {"ok": 1})
+    assert store.claim("a") == (COMPLETED, {"ok": 1})
+    assert store.claim("b") == (NEW, None)
+    store.release("b")
+    assert store.claim("b") == (NEW, None)
+
+
+def test_run_once_replays_and_keeps_store_off_the_loop():
+    store = RecordingStore()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"n": len(calls)}
+
+    async def main():
+        loop_thread = threading.get_ident()
+        results = await asyncio.gather(
+            run_once(store, "key", run), run_once(store, "key", run)
+        )
+        return loop_thread, results
+
+    loop_thread, results = asyncio.run(main())
+    assert calls == [1]
+    assert sorted(replayed for _, replayed in results) == [False, True]
+    assert all(result == {"n": 1} for result, _ in results)
+    assert loop_thread not in store.threads
+
+
+def test_run_once_releases_the_key_on_failure():
+    store = SQLiteIdempotencyStore(":memory:")
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_once(store, "key", fail))
+    assert store.claim("key") == (NEW, None)
@@ -0,0 +1,52 @@
+from src.utils.lead_parser import parse_portal_lead, portal_for_sender
+from src.utils.web_ref_extractor import extract_web_ref
+
+LEAD = (
+    "You have a new lead\n"
+    "Name: Thandi Mokoena\n"
+    "Email: thandi@example.com\n"
+    "Cell: 082 555 1234\n"
+    "Listing ID: 114567890\n"
+    "Enquiry type: Viewing\n"
+    "Message: Hi, can I view the flat on Saturday?\n"
+)
+
+
+def test_known_portals_are_matched_by_default():
+    assert portal_for_sender("Leads <noreply@mail.property24.com>") == "site_2"
+    assert portal_for_sender("leads@privateproperty.co.za") == "site_1"
+    assert portal_for_sender("someone@example.com") is None
+    assert portal_for_sender(None) is None
+
+
+def test_configured_domains_add_and_override(override_settings):
+    override_settings(
+        "email", portal_sender_domains={"leads.example": "site_1", "property24.com": ""}
+    )
+    assert portal_for_sender("a@leads.example") == "site_1"
+    assert portal_for_sender("noreply@property24.com") is None
+
+
+def test_parses_a_portal_lead():
+    lead = parse_portal_lead(
+        LEAD, extract_web_ref("", LEAD), sender="noreply@property24.com"
+    )
+    assert lead.portal == "site_2"
+    assert lead.name == "Thandi Mokoena"
+    assert lead.email == "thandi@example.com"
+    assert lead.phone == "0825551234"
+    assert lead.web_ref == "114567890"
+    assert lead.inquiry_type == "viewing_request"
+    assert lead.message == "Hi, can I view the flat on Saturday?"
+    assert lead.sender() == "Thandi Mokoena <thandi@example.com>"
+
+
+def test_applicant_quoting_a_listing_is_not_a_lead():
+    # Same layout and a recognised listing reference, but sent by the applicant
+    extraction = extract_web_ref("", LEAD)
+    assert parse_portal_lead(LEAD, extraction, "thandi@example.com") is None
+
+
+def test_signature_alone_is_not_a_lead():
+    body = "Thanks!\nName: Thandi\nCell: 082 555 1234"
+    assert parse_portal_lead(body, None, sender="noreply@property24.com") is None
@@ -0,0 +1,40 @@
+import io
+
+import pypdfium2 as pdfium
+import pytest
+
+from src.utils import pdf_ingestion
+
+
+@pytest.fixture(scope="module")
+def blank_pdf():
+    doc = pdfium.PdfDocument.new()
+    for _ in range(7):
+        doc.new_page(200, 200)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    doc.close()
+    yield buffer.getvalue()
+    pdf_ingestion.shutdown_executor()
+
+
+def test_pages_come_in_order_from_the_pool(override_settings, blank_pdf):
+    override_settings("pdf", pages_per_task=2)
+    pages = list(pdf_ingestion.iter_pdf_pages(blank_pdf, parallel=True))
+    assert [p.page_number for p in pages] == list(range(1, 8))
+    assert all(p.error is None for p in pages)
+
+
+def test_inline_and_pool_extraction_agree(blank_pdf):
+    inline = list(pdf_ingestion.iter_pdf_pages(blank_pdf, parallel=False))
+    pooled = list(pdf_ingestion.iter_pdf_pages(blank_pdf, parallel=True))
+    assert [(p.page_number, p.text) for p in inline] == [
+        (p.page_number, p.text) for p in pooled
+    ]
+
+
+def test_tables_only_on_request(blank_pdf):
+    assert pdf_ingestion.ingest_pdf(blank_pdf)["tables"] == []
+    report = pdf_ingestion.ingest_pdf(blank_pdf, extract_tables=True)
+    assert len(report["pages"]) == 7
+    assert all(page["error"] is None for page in report["pages"])
@@ -0,0 +1,55 @@
+from src.utils.response_cache import (
+    SemanticResponseCache,
+    applicant_terms,
+    is_template_shaped,
+    personalize,
+    property_fingerprint,
+)
+
+PROPERTY = {"address": "1 Long Street", "monthly_rent": 8500}
+REPLY = {"subject": "Re: Flat", "body": "Hi Thandi,\nThe flat is available."}
+
+
+def test_lookup_returns_similar_inquiries_only():
+    cache = SemanticResponseCache(":memory:", threshold=0.6)
+    key = property_fingerprint(PROPERTY)
+    cache.store("agent", key, "availability_check", "Is the flat available?", REPLY)
+    hit = cache.lookup("agent", key, "availability_check", "is the flat available")
+    assert hit["reply"] == REPLY
+    assert cache.lookup("agent", key, "availability_check", "Are pets allowed?") is None
+    other_type = cache.lookup("agent", key, "viewing_request", "Is the flat available?")
+    assert other_type is None
+
+
+def test_store_keeps_max_entries():
+    cache = SemanticResponseCache(":memory:", threshold=0.99, max_entries=2)
+    for i, text in enumerate(["one flat", "two flat", "three flat"]):
+        cache.store("agent", "key", "general_info", text, {"body": str(i)})
+    assert cache.lookup("agent", "key", "general_info", "one flat") is None
+    assert cache.lookup("agent", "key", "general_info", "three flat") is not None
+
+
+def test_purge_stale_drops_outdated_property_details():
+    cache = SemanticResponseCache(":memory:", threshold=0.6)
+    cache.store("agent", "p1:old", "general_info", "Is it furnished?", REPLY)
+    assert cache.purge_stale("agent", "p1:", "p1:new", ttl_seconds=0) == 1
+    assert cache.lookup("agent", "p1:old", "general_info", "Is it furnished?") is None
+
+
+def test_personalize_swaps_greeting_and_subject():
+    reply = personalize(
+        REPLY, {"from": "Peter Smith <peter@example.com>", "subject": "Long St"}
+    )
+    assert reply["subject"] == "Re: Long St"
+    assert reply["body"].startswith("Hi Peter,")
+
+
+def test_replies_naming_the_applicant_are_not_template_shaped():
+    terms = applicant_terms(
+        {"from": "Thandi Mokoena <thandi@example.com>"},
+        "Can I view on the 12th?",
+        PROPERTY,
+    )
+    assert "mokoena" in terms and "12th" in terms
+    assert is_template_shaped(REPLY, terms)
+    assert not is_template_shaped({"body": "Hi,\nSee you on the 12th."}, terms)
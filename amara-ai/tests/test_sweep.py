@@ -0,0 +1,52 @@
+import pytest
+
+from src.affordability_crew.sweep import resolve_rents, sweep_rents
+
+
+class FakeIndex:
+    def __init__(self, listings):
+        self.listings = listings
+
+    def get(self, agent_id, web_ref):
+        return self.listings.get((agent_id, web_ref))
+
+
+def test_sweep_ranks_by_headroom():
+    sweep = sweep_rents(
+        {"total_income": 20000.0},
+        [
+            {"property_id": "a", "rent": 7000},
+            {"property_id": "b", "rent": 4000},
+            {"property_id": "c", "rent": 6000},
+        ],
+    )
+    assert sweep["max_affordable_rent"] == 6000.0
+    assert sweep["affordable_count"] == 2
+    assert [r["property_id"] for r in sweep["results"]] == ["b", "c", "a"]
+    assert sweep["results"][0]["headroom"] == 2000.0
+    assert sweep["results"][0]["rent_to_income_ratio"] == 0.2
+    assert not sweep["results"][2]["can_afford"]
+
+
+def test_sweep_without_income_affords_nothing():
+    sweep = sweep_rents({}, [{"property_id": "a", "rent": 1000}])
+    assert sweep["affordable_count"] == 0
+    assert sweep["results"][0]["rent_to_income_ratio"] is None
+
+
+def test_resolve_rents_looks_up_the_index():
+    index = FakeIndex({("agent-1", "RR1"): {"monthly_rent": 8500}})
+    resolved = resolve_rents(
+        [{"property_id": "RR1", "rent": None}, {"property_id": "x", "rent": 4000}],
+        "agent-1",
+        index,
+    )
+    assert [p["rent"] for p in resolved] == [8500.0, 4000.0]
+
+
+def test_resolve_rents_rejects_unknown_properties():
+    index = FakeIndex({})
+    with pytest.raises(ValueError, match="RR2"):
+        resolve_rents([{"property_id": "RR2", "rent": None}], "agent-1", index)
+    with pytest.raises(ValueError, match="RR3"):
+        resolve_rents([{"property_id": "RR3", "rent": None}])
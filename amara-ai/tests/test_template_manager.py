@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from src.utils.template_manager import TemplateManager, compile_template
+
+
+def test_renders_both_placeholder_styles():
+    manager = TemplateManager({})
+    text = manager.render_template(
+        'Hi {{name}}, see {web_ref}. {"json": 1}', {"name": "Thandi", "web_ref": "RR1"}
+    )
+    assert text == 'Hi Thandi, see RR1. {"json": 1}'
+
+
+def test_missing_variables_raise():
+    manager = TemplateManager({"general_info": "Hi {name}"})
+    with pytest.raises(ValueError, match="name"):
+        manager.render("general_info", {})
+
+
+def test_json_templates_render_subject_and_body():
+    template = json.dumps({"response": {"subject": "Re: {ref}", "body": "Hi {name}"}})
+    assert compile_template(template).variables == {"ref", "name"}
+    rendered = json.loads(
+        TemplateManager({}).render_template(template, {"ref": "RR1", "name": "Jo"})
+    )
+    assert rendered == {"response": {"subject": "Re: RR1", "body": "Hi Jo"}}
+
+
+def test_set_template_invalidates_the_compiled_form():
+    manager = TemplateManager({"general_info": "Old {name}"})
+    assert manager.render("general_info", {"name": "Jo"}).startswith("Old Jo")
+    manager.set_template("general_info", "New {name}")
+    assert manager.render("general_info", {"name": "Jo"}).startswith("New Jo")
+
+
+def test_footer_and_default_template():
+    manager = TemplateManager({})
+    template = manager.get_template("unknown")
+    assert template.endswith("Powered by agentamara.com\n")
+    assert manager.required_variables(template) == {"agent_name", "agent_contact"}
+    assert manager.render_many("Hi {n}", [{"n": "a"}, {"n": "b"}]) == ["Hi a", "Hi b"]
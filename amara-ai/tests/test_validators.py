@@ -0,0 +1,40 @@
+from src.utils.validators import ResponseValidator
+
+CONTEXT = {
+    "inquiry_type": "viewing_request",
+    "property": {
+        "address": "1 Long Street",
+        "application_link": "https://apply.example.com/1",
+        "web_reference": "RR1234567",
+    },
+}
+GOOD = (
+    "Thank you for your interest in 1 Long Street (RR1234567). We can "
+    "schedule a view this week. Please submit an application at "
+    "https://apply.example.com/1 and contact us with questions.\n"
+    "Best regards"
+)
+
+
+def test_complete_reply_passes():
+    result = ResponseValidator().validate(GOOD, CONTEXT)
+    assert result["pass"]
+    assert result["confidence"] == 1.0
+    assert result["details"]["missing_fields"] == []
+
+
+def test_missing_facts_and_pushy_tone_fail():
+    reply = GOOD.replace("RR1234567", "").replace("this week", "now, act now")
+    result = ResponseValidator().validate(reply, CONTEXT)
+    assert not result["pass"]
+    assert result["details"]["missing_fields"] == ["RR1234567"]
+    assert not result["details"]["tone_pass"]
+
+
+def test_dict_and_empty_responses():
+    validator = ResponseValidator()
+    assert validator.validate({"body": GOOD}, CONTEXT)["pass"]
+    assert validator.validate({"response": {"body": GOOD}}, CONTEXT)["pass"]
+    empty = validator.validate("", CONTEXT)
+    assert not empty["pass"] and empty["confidence"] == 0.0
+    assert len(validator.validate_many([(GOOD, CONTEXT), ("", CONTEXT)])) == 2